@@ -50,44 +50,33 @@ their public speaking skills?\n\nI’m looking forward to your insights on these
 }
 
 """
-import boto3
+import os
+import uuid
 from dotenv import load_dotenv
 
-from typing import TypedDict, Annotated, Sequence
-import operator
-from langchain_aws import ChatBedrock
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from typing import TypedDict
+from bedrock_client import get_chat_model
+from message_history import MessageHistory
+from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from rich import print
-from langgraph.checkpoint.memory import InMemorySaver
+from graph_diagram import show_diagram
+from sqlite_checkpointer import make_checkpointer
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
-
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
-
 # --- Example 1: Basic Message State ---
 # This graph manages a sequence of messages, simulating a simple thought-response flow.
 
 # Defines the state for the agent, which is a sequence of messages.
 class BasicAgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]  # Appends new messages to the list.
+    messages: MessageHistory  # Appends new messages to the list (see message_history.py).
 
 # Node to simulate the agent "thinking."
 def think_node(state: BasicAgentState) -> BasicAgentState:
     """Adds an AI message representing the agent's thought process."""
 
     # Use .invoke() and pass a list of messages
-    new_message = AIMessage(content=llm_aws.invoke([HumanMessage(content="I'm thinking about your query...")]).content)
+    new_message = AIMessage(content=get_chat_model().invoke([HumanMessage(content="I'm thinking about your query...")]).content)
     return {'messages': [new_message]}
 
 # Node to simulate the agent "responding."
@@ -96,35 +85,45 @@ def respond_node(state: BasicAgentState) -> BasicAgentState:
 
     last_message = state['messages'][-1].content if state['messages'] else ''
     # Use .invoke() and pass a list of messages
-    response = AIMessage(content=llm_aws.invoke([HumanMessage(content=f'Response to: {last_message}')]).content)
+    response = AIMessage(content=get_chat_model().invoke([HumanMessage(content=f'Response to: {last_message}')]).content)
     return {'messages': [response]}
 
 # Build the graph using StateGraph.
-basic_workflow = StateGraph(state_schema=BasicAgentState)
+def build_basic_graph(checkpointer=None):
+    """Compile the think -> respond graph; nodes use the shared, pooled Bedrock chat model."""
+    basic_workflow = StateGraph(state_schema=BasicAgentState)
+
+    # Add nodes to the graph.
+    basic_workflow.add_node('think', think_node)
+    basic_workflow.add_node('respond', respond_node)
+
+    # Define the flow: 'think' node leads to 'respond' node.
+    basic_workflow.add_edge('think', 'respond')
+    # The 'respond' node leads to the end of the graph execution.
+    basic_workflow.add_edge('respond', END)
 
-# Add nodes to the graph.
-basic_workflow.add_node('think', think_node)
-basic_workflow.add_node('respond', respond_node)
+    # Set 'think' as the starting point of the graph.
+    basic_workflow.set_entry_point('think')
 
-# Define the flow: 'think' node leads to 'respond' node.
-basic_workflow.add_edge('think', 'respond')
-# The 'respond' node leads to the end of the graph execution.
-basic_workflow.add_edge('respond', END)
+    # Compile the graph for execution.
+    return basic_workflow.compile(checkpointer=checkpointer)
 
-# Set 'think' as the starting point of the graph.
-basic_workflow.set_entry_point('think')
+def main():
+    # Add memory to the graph to persist state across invocations (SQLite file, see sqlite_checkpointer.py).
+    basic_graph = build_basic_graph(checkpointer=make_checkpointer())
 
-# Add memory to the graph to persist state across invocations.
-basic_workflow.checkpointer = InMemorySaver()
+    # display the graph
+    show_diagram(basic_graph)  # Prints the diagram with --diagram[=ascii|mermaid|png], see graph_diagram.py.
 
-# Compile the graph for execution.
-basic_graph = basic_workflow.compile()
+    initial_state = {'messages': [HumanMessage(content='Hello!')]}
+    print('Example 1 Output - Basic Message State:')
 
-# display the graph
-print(basic_graph.get_graph().draw_ascii())  # Prints an ASCII representation to console.
+    # Invoke the graph with an initial message and print the final state.
+    # Checkpoints are stored per thread; set THREAD_ID to continue an earlier conversation.
+    config = {'configurable': {'thread_id': os.getenv('THREAD_ID', str(uuid.uuid4()))}}
+    print(basic_graph.invoke(initial_state, config))
 
-initial_state = {'messages': [HumanMessage(content='Hello!')]}
-print('Example 1 Output - Basic Message State:')
+if __name__ == "__main__":
+    from rich import print  # only the demos print with rich
 
-# Invoke the graph with an initial message and print the final state.
-print(basic_graph.invoke(initial_state))
+    main()
@@ -103,31 +103,30 @@ format and integrity.\n   - **Solution**: Try opening the file with different so
     'is_complete': True
 }
 """
-import boto3
+import os
+import uuid
 from dotenv import load_dotenv
 
 from typing import TypedDict, Annotated, Sequence
 import operator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from rich import print
+from graph_diagram import show_diagram
 from typing import TypedDict, Annotated, Sequence
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain_aws import ChatBedrock
+from sqlite_checkpointer import make_checkpointer
+from bedrock_client import get_chat_model, DEFAULT_MODEL_ID
+from message_history import MessageHistory
+from context_compaction import make_compaction_node, llm_summarizer
+from resilience import bedrock_retry_policy, count_node_retry, get_circuit_breaker, resilience_metrics
+from instrumentation import get_instrumentation
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
-
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
+# Calls go through the model's circuit breaker: while Bedrock is degraded they fail fast
+# with CircuitOpenError instead of piling up more requests (see resilience.py).
+# The chat model is the shared, pooled one from bedrock_client.py.
+def invoke_llm(prompt):
+    return get_circuit_breaker(DEFAULT_MODEL_ID).call(get_chat_model().invoke, prompt)
 
 # --- Example 1: State with Task Tracking ---
 # Implements task tracking, retries, and completion status.
@@ -139,11 +138,11 @@ class TaskAgentState(TypedDict):
     # ANNOTATED EXPLANATION:
     # Annotated[Type, metadata] allows you to add metadata to type hints
     # Here we're telling LangGraph HOW to handle state updates for this field
-    messages: Annotated[Sequence[BaseMessage], operator.add]  # Chat message history.
-    # - Type: Sequence[BaseMessage] (a sequence of chat messages)
-    # - Metadata: operator.add (when updating this field, ADD/APPEND new messages to existing ones)
+    messages: MessageHistory  # Chat message history.
+    # - MessageHistory = Annotated[MessageLog, DeltaChannel(append_messages)] (see message_history.py)
+    # - Same semantics as Annotated[Sequence[BaseMessage], operator.add]: new messages get APPENDED
     # - Without Annotated: new messages would REPLACE old ones
-    # - With operator.add: new messages get APPENDED to the existing sequence
+    # - Appends are O(1) amortized (no list copy per step) and checkpoints store only the new messages
 
     task_id: str  # Unique identifier for the task.
     retries: Annotated[int, operator.add]  # Number of retries for the task.
@@ -152,22 +151,23 @@ class TaskAgentState(TypedDict):
 # Node to initialize the task.
 def init_task_node(state: TaskAgentState) -> TaskAgentState:
     """Initializes task_id, retries, and sets is_complete to False."""
-    return {'task_id': 'task_123', 'retries': 0, 'is_complete': False, 'messages': [llm_aws.invoke('Task initialized.')]}
+    count_node_retry()
+    return {'task_id': 'task_123', 'retries': 0, 'is_complete': False, 'messages': [invoke_llm('Task initialized.')]}
 
 # Node to process the task, including a retry mechanism.
 def process_node(state: TaskAgentState, num: int = 2) -> TaskAgentState:
     """Simulates task processing with up to 2 retries before completion."""
-
+    count_node_retry()  # a Bedrock retry of this node, not one of the simulated ones
     print(f'Retries: {state["retries"]}')
     if state['retries'] < num:
         # Simulate failure and increment retries.
         return {
             'retries': state['retries'] + 1,
-            'messages': [llm_aws.invoke(f'Processing... Retry {state["retries"] + 1}')],
+            'messages': [invoke_llm(f'Processing... Retry {state["retries"] + 1}')],
         }
     else:
         # Task completes after retries.
-        return {'is_complete': True, 'messages': [llm_aws.invoke('Task completed!')]}
+        return {'is_complete': True, 'messages': [invoke_llm('Task completed!')]}
 
 # Conditional edge function to decide next step based on task completion.
 def check_complete(state: TaskAgentState) -> str:
@@ -175,32 +175,63 @@ def check_complete(state: TaskAgentState) -> str:
     return END if state['is_complete'] else 'process'
 
 ################ Building the State Graph for Task Management ################
-workflow = StateGraph(state_schema=TaskAgentState)
-
-# Add nodes.
-workflow.add_node('init', init_task_node)
-workflow.add_node('process', process_node)
-
-# Define edges (transitions).
-workflow.add_edge('init', 'process')
-edge_map = {'process': 'process', END: END}
-workflow.add_conditional_edges('process', check_complete, edge_map)
-# Set the entry point of the graph.
-workflow.set_entry_point('init')
-
-########################## Memory and Compilation ##########################
-# Add memory for persisting state across runs.
-workflow.checkpointer = InMemorySaver()
-
-# Compile the graph.
-task_graph = workflow.compile()
-
-# display the graph
-#print(task_graph.get_graph().draw_ascii()) 
+def build_task_graph(checkpointer=None):
+    """Compile the init -> process -> compact loop."""
+    workflow = StateGraph(state_schema=TaskAgentState)
+
+    # Node to keep the history bounded across retries.
+    # Keeps the last COMPACT_KEEP_LAST messages and folds older ones into a rolling summary
+    # once the history is over COMPACT_MAX_TOKENS (see context_compaction.py).
+    summarizer = llm_summarizer(get_chat_model()) if os.getenv('COMPACT_SUMMARIZER') == 'llm' else None
+    compact_node = make_compaction_node(summarizer=summarizer)
+
+    # Add nodes.
+    # A throttled Bedrock call re-runs the node with jittered exponential backoff;
+    # fatal errors and an open circuit stop the run.
+    workflow.add_node('init', init_task_node, retry_policy=bedrock_retry_policy())
+    workflow.add_node('process', process_node, retry_policy=bedrock_retry_policy())
+    workflow.add_node('compact', compact_node)
+
+    # Define edges (transitions).
+    workflow.add_edge('init', 'process')
+    workflow.add_edge('process', 'compact')
+    edge_map = {'process': 'process', END: END}
+    workflow.add_conditional_edges('compact', check_complete, edge_map)
+    # Set the entry point of the graph.
+    workflow.set_entry_point('init')
+
+    # Compile the graph.
+    return workflow.compile(checkpointer=checkpointer)
+
+def main():
+    ########################## Memory and Compilation ##########################
+    # Add memory for persisting state across runs (SQLite file, see sqlite_checkpointer.py).
+    task_graph = build_task_graph(checkpointer=make_checkpointer())
+
+    # display the graph
+    show_diagram(task_graph)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
+
+    ########################## Execution and Output ##########################
+    initial_state = {'messages': [HumanMessage(content='Start task')]}
+    print('\nExample 1 Output - Task Status:')
+
+    # Checkpoints are stored per thread; set THREAD_ID to resume a task that stopped mid-way.
+    # Per-node wall time, LLM latency and tokens are collected by the callback (see instrumentation.py).
+    instrumentation = get_instrumentation()
+    config = {
+        'configurable': {'thread_id': os.getenv('THREAD_ID', str(uuid.uuid4()))},
+        'callbacks': [instrumentation],
+    }
+    if task_graph.get_state(config).next:
+        # An earlier run of this thread crashed: continue from its last completed step.
+        print(task_graph.invoke(None, config))
+    else:
+        print(task_graph.invoke(initial_state, config))
+    print('Resilience:', resilience_metrics())
+    print('Per node:', instrumentation.thread_summary(config['configurable']['thread_id']))
+    #print(task_graph.invoke(initial_state, debug=True))
 
-########################## Execution and Output ##########################
-initial_state = {'messages': [HumanMessage(content='Start task')]}
-print('\nExample 1 Output - Task Status:')
+if __name__ == "__main__":
+    from rich import print  # only the demos print with rich
 
-print(task_graph.invoke(initial_state))
-#print(task_graph.invoke(initial_state, debug=True))
+    main()
@@ -1,27 +1,18 @@
 
-import boto3
+import os
 from dotenv import load_dotenv
 
-from typing import TypedDict, Annotated, Sequence, Dict, Any
+from typing import TypedDict, Annotated, Sequence, Dict, Any, List
 import operator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from rich import print
-from langchain_aws import ChatBedrock
+from langgraph.types import Send
+from graph_diagram import show_diagram
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
-
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
+# Max subtasks running at the same time (threads for sync nodes, tasks under ainvoke).
+SUBTASK_MAX_CONCURRENCY = int(os.getenv('SUBTASK_MAX_CONCURRENCY', '8'))
 
 ################ Complex State with Nested Data ################
 # Handles nested subtasks and summarizes them.
@@ -32,27 +23,47 @@ class SubTaskState(TypedDict):
     """State for managing a subtask."""
 
     subtask_name: str
+    index: int  # Position in the plan, used to join results in a fixed order.
     result: Dict[str, Any]  # Stores subtask results
 
 
+# Reducer for subtasks: appends like operator.add, then orders by plan position,
+# so the join does not depend on which parallel branch finished first.
+def merge_subtasks(left: Sequence[SubTaskState], right: Sequence[SubTaskState]) -> List[SubTaskState]:
+    return sorted([*left, *right], key=lambda st: st.get('index', 0))
+
+
 # Defines the overall state for the agent.
 class ComplexAgentState(TypedDict):
     """State for managing complex tasks with subtasks."""
 
     messages: Annotated[Sequence[BaseMessage], operator.add]  # Chat history.
-    subtasks: Annotated[Sequence[SubTaskState], operator.add]  # List of subtasks.
+    subtasks: Annotated[Sequence[SubTaskState], merge_subtasks]  # List of subtasks, in plan order.
+    subtask_names: List[str]  # Subtasks to run in parallel.
     overall_summary: str  # Final summary of all subtasks.
 
 
 ################ Define Node Functions ################
-# Node to simulate adding and processing a subtask.
-def subtask_node(state: ComplexAgentState) -> ComplexAgentState:
-    """Adds a new subtask and a message indicating the action."""
+# Node to plan the subtasks; each one then runs in its own branch.
+def plan_node(state: ComplexAgentState) -> ComplexAgentState:
+    """Lists the subtasks to run and adds a message indicating the action."""
+    return {'subtask_names': ['subtask1', 'subtask2'], 'messages': [AIMessage(content='Subtask added.')]}
 
-    new_subtask = SubTaskState(subtask_name='subtask1', result={'data': 'Processed data'})
-    new_subtask2 = SubTaskState(subtask_name='subtask1', result={'data': 'Processed data'})
 
-    return {'subtasks': [new_subtask, new_subtask2], 'messages': [AIMessage(content='Subtask added.')]}
+# Conditional edge: one Send per subtask (map step), all run in the same superstep.
+def fan_out_subtasks(state: ComplexAgentState) -> List[Send]:
+    """Sends every planned subtask to subtask_node as its own SubTaskState."""
+    return [
+        Send('subtask', SubTaskState(subtask_name=name, index=index, result={}))
+        for index, name in enumerate(state['subtask_names'])
+    ]
+
+
+# Node to process one subtask (I/O-bound work such as LLM or DB calls goes here).
+def subtask_node(state: SubTaskState) -> ComplexAgentState:
+    """Processes a single subtask and returns it for the join."""
+    done = SubTaskState(subtask_name=state['subtask_name'], index=state['index'], result={'data': 'Processed data'})
+    return {'subtasks': [done]}
 
 
 # Node to summarize completed subtasks.
@@ -63,31 +74,49 @@ def summarize_node(state: ComplexAgentState) -> ComplexAgentState:
 
 
 ################ Building the State Graph for Task Management ################
-# Build the graph.
-graph = StateGraph(state_schema=ComplexAgentState)
+def build_complex_graph():
+    """Compile the plan -> parallel subtasks -> summarize graph."""
+    # Build the graph.
+    graph = StateGraph(state_schema=ComplexAgentState)
 
-# Add nodes to the graph.
-graph.add_node('subtask', subtask_node)
-graph.add_node('summarize', summarize_node)
+    # Add nodes to the graph.
+    graph.add_node('plan', plan_node)
+    graph.add_node('subtask', subtask_node)
+    graph.add_node('summarize', summarize_node)
 
-# Define transitions between nodes.
-graph.add_edge('subtask', 'summarize')
-graph.add_edge('summarize', END)
+    # Define transitions between nodes.
+    # plan fans out to parallel subtask branches; summarize runs once all of them are done (reduce step).
+    graph.add_conditional_edges('plan', fan_out_subtasks, ['subtask'])
+    graph.add_edge('subtask', 'summarize')
+    graph.add_edge('summarize', END)
 
-# Set the starting point of the graph.
-graph.set_entry_point('subtask')
+    # Set the starting point of the graph.
+    graph.set_entry_point('plan')
 
-# Compile the graph for execution.
-complex_graph = graph.compile()
+    # Compile the graph for execution.
+    return graph.compile()
+
+# Run config for the graph: max_concurrency bounds how many subtask branches run at once.
+def complex_graph_config() -> dict:
+    return {'max_concurrency': SUBTASK_MAX_CONCURRENCY}
 
 # Add nodes to the graph.
-################ Displaying and Executing the Complex State Graph ################
-# Display the graph.
-diagram = complex_graph.get_graph().draw_mermaid_png()
-print(complex_graph.get_graph().draw_ascii())
-
-print('Example 2: Complex State with Nested Data')
-initial_state = {'messages': [HumanMessage(content='Run complex task')]}
-print('\nExample 2 Output - Complex State with Nested Data:')
-# print(complex_graph.invoke(initial_state))
-print(complex_graph.invoke(initial_state, debug=True))
+
+def main():
+    complex_graph = build_complex_graph()
+
+    ################ Displaying and Executing the Complex State Graph ################
+    # Display the graph (rendered locally and cached, only with --diagram[=ascii|mermaid|png]).
+    show_diagram(complex_graph)
+
+    print('Example 2: Complex State with Nested Data')
+    initial_state = {'messages': [HumanMessage(content='Run complex task')]}
+    print('\nExample 2 Output - Complex State with Nested Data:')
+    config = complex_graph_config()
+    # print(complex_graph.invoke(initial_state, config))
+    print(complex_graph.invoke(initial_state, config, debug=True))
+
+if __name__ == "__main__":
+    from rich import print  # only the demos print with rich
+
+    main()
@@ -0,0 +1,80 @@
+# Vectorized kernels for the batch tools in tools_02.py
+# convert_temperatures
+# calculate_many
+#
+# convert_temperature and advanced_calculator take one value per call, so converting a
+# table of readings costs the model one tool round trip (and one LLM turn) per value.
+# The batch tools take whole arrays and compute them here in one NumPy pass. The
+# formulas and the operation order are those of the scalar tools, so every element
+# comes out exactly as the scalar tool would compute it.
+#
+#   BATCH_MAX_VALUES   max values per batch call (100000)
+
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPERATIONS = ("add", "subtract", "multiply", "divide")
+
+def max_batch_values() -> int:
+    return int(os.getenv("BATCH_MAX_VALUES", "100000"))
+
+def _check_size(count: int) -> None:
+    limit = max_batch_values()
+    if count > limit:
+        raise ValueError(f"{count} values is more than the batch limit of {limit}; split the request")
+
+def convert_temperatures(temperatures: Sequence[float], from_unit: str, to_unit: str) -> np.ndarray:
+    """Convert an array of temperatures between celsius, fahrenheit and kelvin."""
+    _check_size(len(temperatures))
+    values = np.asarray(temperatures, dtype=np.float64)
+    from_unit = from_unit.lower()
+    to_unit = to_unit.lower()
+
+    with np.errstate(over="ignore", invalid="ignore"):  # Python floats give inf/nan too
+        # same branches as convert_temperature: any other unit is taken as celsius
+        if from_unit == "fahrenheit":
+            celsius = (values - 32) * 5 / 9
+        elif from_unit == "kelvin":
+            celsius = values - 273.15
+        else:
+            celsius = values
+
+        if to_unit == "fahrenheit":
+            return celsius * 9 / 5 + 32
+        if to_unit == "kelvin":
+            return celsius + 273.15
+        return celsius
+
+def calculate_many(
+    operations: Sequence[str], xs: Sequence[float], ys: Sequence[float]
+) -> Tuple[np.ndarray, List[Tuple[int, str]]]:
+    """Apply (operation, x, y) triples; returns results (NaN where failed) and (index, error) pairs."""
+    if not len(operations) == len(xs) == len(ys):
+        raise ValueError("operations, xs and ys must have the same length")
+    _check_size(len(operations))
+    ops = np.array([operation.lower() for operation in operations], dtype=object)
+    x = np.asarray(xs, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64)
+    results = np.full(len(ops), np.nan)
+
+    with np.errstate(over="ignore", invalid="ignore"):  # Python floats give inf/nan too
+        for name, kernel in (("add", np.add), ("subtract", np.subtract), ("multiply", np.multiply)):
+            mask = ops == name
+            results[mask] = kernel(x[mask], y[mask])
+        divide = ops == "divide"
+        by_zero = divide & (y == 0)
+        mask = divide & ~by_zero
+        results[mask] = x[mask] / y[mask]
+
+    errors = [(int(i), "Cannot divide by zero!") for i in np.flatnonzero(by_zero)]
+    for i in np.flatnonzero(~np.isin(ops, OPERATIONS)):
+        errors.append(
+            (int(i), f"Unknown operation '{ops[i]}'. Supported: {', '.join(OPERATIONS)}")
+        )
+    errors.sort()
+    return results, errors
@@ -0,0 +1,118 @@
+# Shared Bedrock client factory
+# get_bedrock_client
+# get_chat_model
+#
+# Every agent/tool module used to build its own boto3 client and ChatBedrock at import
+# time with the default botocore settings (10 pooled connections, legacy retries).
+# This module builds ONE client per (region, model), lazily and thread-safely, with a
+# larger keep-alive connection pool, adaptive retries and explicit timeouts.
+#
+# boto3/botocore are imported on first use, so importing this module is cheap.
+#
+# Settings can be overridden with environment variables (or a .env file):
+#   BEDROCK_REGION              default region (us-east-1)
+#   BEDROCK_MODEL_ID            default model id (amazon.nova-pro-v1:0)
+#   BEDROCK_MAX_POOL            max pooled HTTP connections per client (50)
+#   BEDROCK_MAX_ATTEMPTS        total attempts for the adaptive retry mode (4)
+#   BEDROCK_CONNECT_TIMEOUT     connect timeout in seconds (5)
+#   BEDROCK_READ_TIMEOUT        read timeout in seconds (120)
+#   BEDROCK_ENDPOINT_URL        bedrock-runtime endpoint, e.g. a local fake_bedrock.py (AWS)
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_REGION = os.getenv("BEDROCK_REGION", "us-east-1")
+DEFAULT_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "amazon.nova-pro-v1:0")
+
+_clients = {}  # region -> boto3 bedrock-runtime client
+_chat_models = {}  # (region, model_id, default LLM cache or None) -> ChatBedrock
+_lock = threading.Lock()
+
+def client_config():
+    """Build the botocore Config used by every pooled Bedrock client."""
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=int(os.getenv("BEDROCK_MAX_POOL", "50")),
+        tcp_keepalive=True,
+        retries={
+            "mode": "adaptive",
+            "total_max_attempts": int(os.getenv("BEDROCK_MAX_ATTEMPTS", "4")),
+        },
+        connect_timeout=float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("BEDROCK_READ_TIMEOUT", "120")),
+    )
+
+def get_bedrock_client(region_name: str = DEFAULT_REGION):
+    """Return the shared bedrock-runtime client for a region, creating it on first use.
+
+    boto3 clients are thread-safe, so the same client (and its connection pool) is
+    reused by every graph invocation in the process.
+    """
+    client = _clients.get(region_name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(region_name)
+        if client is None:
+            # boto3.client() uses a global session that is not thread-safe, so the
+            # client is built under the lock with its own session.
+            import boto3
+
+            session = boto3.session.Session()
+            client = session.client(
+                "bedrock-runtime",
+                region_name=region_name,
+                endpoint_url=os.getenv("BEDROCK_ENDPOINT_URL") or None,
+                config=client_config(),
+            )
+            _clients[region_name] = client
+    return client
+
+def get_chat_model(model_id: str = DEFAULT_MODEL_ID, region_name: str = DEFAULT_REGION, cache=None):
+    """Return the shared ChatBedrock for (region, model), backed by the pooled client.
+
+    cache is an optional LangChain BaseCache; when omitted the LLM_CACHE_PATH response
+    cache from llm_cache.py is used if it is enabled. A model with a caller's cache is
+    built on each call (it still shares the pooled client): memoizing it would keep
+    the cache alive for the life of the process.
+    """
+    if cache is not None:
+        return _build_chat_model(model_id, region_name, cache)
+
+    from llm_cache import default_llm_cache
+
+    cache = default_llm_cache()  # a process-wide singleton, safe to hold in the key
+    key = (region_name, model_id, cache)
+    llm = _chat_models.get(key)
+    if llm is not None:
+        return llm
+
+    client = get_bedrock_client(region_name)
+    with _lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            llm = _build_chat_model(model_id, region_name, cache, client)
+            _chat_models[key] = llm
+    return llm
+
+def _build_chat_model(model_id: str, region_name: str, cache, client=None):
+    from langchain_aws import ChatBedrock
+
+    return ChatBedrock(
+        model=model_id,
+        region_name=region_name,
+        client=client or get_bedrock_client(region_name),
+        cache=cache,
+    )
+
+def reset_clients() -> None:
+    """Drop every cached client and chat model (e.g. after changing settings)."""
+    with _lock:
+        _clients.clear()
+        _chat_models.clear()
@@ -0,0 +1,360 @@
+# End-to-end benchmarks for the example graphs, agents and tools
+# BENCHMARKS / benchmark
+# run_benchmark
+# compare_results
+#
+# Numbers to check hot-path changes against. Groups:
+#   graph        pure graph throughput: lang_graph_01 linear chain, lang_graph_03 single
+#                node, lang_graph_04 conditional router, lang_graph_05 loop
+#   agent        ReAct loops of tools_01/02/03 (one tool call, then the answer) against
+#                the local fake Bedrock with zero latency (fake_bedrock.py), so the time
+#                is our graph, tool node and client overhead, not the model
+#   db           query_database on generated tables of BENCH_DB_ROWS sizes, result
+#                cache off (db_sqllite_mock.create_synthetic_database)
+#   checkpoint   agent_02/agent_03 graphs without a checkpointer, with InMemorySaver
+#                and with SqliteCheckpointSaver, one new thread per round
+# Each benchmark runs in its own interpreter, so its peak RSS is its own and no cache or
+# pool is shared between benchmarks. Output goes to stdout as a table in the
+# pytest-benchmark layout; --json saves the run and --compare diffs the medians
+# against a saved run, exiting with 1 on a regression.
+#
+#   python benchmarks.py                            # every benchmark
+#   python benchmarks.py graph db --rounds 200      # names containing "graph" or "db"
+#   python benchmarks.py --json bench.json
+#   python benchmarks.py --compare bench.json [--json bench-new.json]
+#
+#   BENCH_ROUNDS       timed rounds per benchmark (100)
+#   BENCH_WARMUP       untimed rounds before them (5)
+#   BENCH_DB_ROWS      table sizes for the db group (1000,100000)
+#   BENCH_REGRESSION   median slowdown --compare reports as a regression (0.10)
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# name -> (group, setup); setup is a generator that prepares and yields the operation
+BENCHMARKS = {}
+
+def benchmark(name: str, group: str):
+    """Register a setup generator yielding the zero-argument operation to time."""
+
+    def decorate(setup: Callable[[], Iterator[Callable[[], object]]]):
+        BENCHMARKS[name] = (group, contextlib.contextmanager(setup))
+        return setup
+
+    return decorate
+
+def db_sizes() -> List[int]:
+    return [int(rows) for rows in os.getenv("BENCH_DB_ROWS", "1000,100000").split(",") if rows.strip()]
+
+@contextlib.contextmanager
+def _stub_model():
+    # zero-latency fake Bedrock: every model call is a local HTTP round trip
+    from fake_bedrock import fake_bedrock
+
+    with fake_bedrock(latency="0", token_latency="0", throttle_rate=0.0, seed=0):
+        yield
+
+def _cycle(values: list) -> Callable[[], object]:
+    iterator = iter(range(1 << 62))
+    return lambda: values[next(iterator) % len(values)]
+
+# ############### graph ###############
+
+@benchmark("graph/lang_graph_01_linear", "graph")
+def _lang_graph_01():
+    from lang_graph_01 import build_app
+
+    app = build_app()
+    yield lambda: app.invoke({"user_input": "add 4 to 4", "steps": []})
+
+@benchmark("graph/lang_graph_03_single_node", "graph")
+def _lang_graph_03():
+    from lang_graph_03 import build_app
+
+    app = build_app()
+    state = {"scores": [88.5, 92.0, 85.5, 94.0, 87.5], "student_name": "Ana Silva", "course_name": "Go"}
+    yield lambda: app.invoke(dict(state))
+
+@benchmark("graph/lang_graph_04_router", "graph")
+def _lang_graph_04():
+    from lang_graph_04 import build_app
+
+    app = build_app()
+    number = _cycle([-3, 0, 5])  # every branch in turn
+    yield lambda: app.invoke({"number": number(), "result": 0})
+
+@benchmark("graph/lang_graph_05_loop", "graph")
+def _lang_graph_05():
+    import random
+
+    from lang_graph_05 import build_app
+
+    app = build_app()
+    random.seed(0)  # the loop length depends on the random numbers it adds
+    yield lambda: app.invoke({"numbers": [], "total": 0})
+
+# ############### agent ###############
+
+def _agent_benchmark(build: Callable[[], object], prompt: str):
+    with _stub_model():
+        agent = build()
+        yield lambda: agent.invoke({"messages": [{"role": "user", "content": prompt}]})
+
+@benchmark("agent/tools_01_math", "agent")
+def _tools_01_agent():
+    from tools_01 import build_math_agent
+
+    yield from _agent_benchmark(build_math_agent, "use multiply_numbers on 8 and 6")
+
+@benchmark("agent/tools_01_database", "agent")
+def _tools_01_database_agent():
+    from tools_01 import build_database_agent
+
+    yield from _agent_benchmark(build_database_agent, "use query_database to count the employees")
+
+@benchmark("agent/tools_02_schema", "agent")
+def _tools_02_agent():
+    from tools_02 import build_schema_agent
+
+    yield from _agent_benchmark(build_schema_agent, "use advanced_calculator to divide 15.5 by 3.2")
+
+@benchmark("agent/tools_03_tool_node", "agent")
+def _tools_03_agent():
+    from tools_03 import build_sequential_agent
+
+    yield from _agent_benchmark(build_sequential_agent, "use slow_calculation on 7")
+
+# ############### db ###############
+
+def _db_benchmark(rows: int, sql: Callable[[], str]):
+    from db_sqllite_mock import create_synthetic_database
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "company.db")
+        create_synthetic_database(rows, seed=42, path=path)
+        os.environ.update(COMPANY_DB_PATH=path, QUERY_CACHE_SIZE="0", INDEX_ADVISOR_DB="")
+        from tools_01 import query_database
+
+        yield lambda: query_database.invoke({"sql_query": sql()})
+
+def _register_db_benchmarks() -> None:
+    aggregate = "SELECT department, COUNT(*), AVG(salary) FROM employees GROUP BY department"
+    for rows in db_sizes():
+        lookup = _cycle([f"SELECT * FROM employees WHERE id = {i}" for i in range(1, min(rows, 1000) + 1)])
+        benchmark(f"db/query_database_aggregate_{rows}", "db")(
+            lambda rows=rows: (yield from _db_benchmark(rows, lambda: aggregate))
+        )
+        benchmark(f"db/query_database_lookup_{rows}", "db")(
+            lambda rows=rows, lookup=lookup: (yield from _db_benchmark(rows, lookup))
+        )
+
+_register_db_benchmarks()
+
+# ############### checkpoint ###############
+
+def _checkpointer(kind: str, directory: str):
+    if kind == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        return InMemorySaver()
+    if kind == "sqlite":
+        from sqlite_checkpointer import SqliteCheckpointSaver
+
+        return SqliteCheckpointSaver(os.path.join(directory, "checkpoints.db"), max_checkpoints_per_thread=50)
+    return None
+
+def _checkpoint_benchmark(build_graph: Callable, kind: str, state: dict):
+    from langchain_core.messages import HumanMessage
+
+    with _stub_model(), tempfile.TemporaryDirectory() as directory:
+        graph = build_graph(checkpointer=_checkpointer(kind, directory))
+
+        def run():
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            return graph.invoke({**state, "messages": [HumanMessage(content="Start task")]}, config)
+
+        yield run
+
+def _register_checkpoint_benchmarks() -> None:
+    for kind in ("none", "memory", "sqlite"):
+        def agent_02(kind=kind):
+            from agent_02 import build_basic_graph
+
+            yield from _checkpoint_benchmark(build_basic_graph, kind, {})
+
+        def agent_03(kind=kind):
+            from agent_03 import build_task_graph
+
+            yield from _checkpoint_benchmark(build_task_graph, kind, {})
+
+        benchmark(f"checkpoint/agent_02_{kind}", "checkpoint")(agent_02)
+        benchmark(f"checkpoint/agent_03_{kind}", "checkpoint")(agent_03)
+
+_register_checkpoint_benchmarks()
+
+# ############### Runner ###############
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+def summarize(times: List[float]) -> dict:
+    """pytest-benchmark style statistics of per-round times in seconds."""
+    percentiles = statistics.quantiles(times, n=100, method="inclusive") if len(times) > 1 else times * 99
+    mean = statistics.fmean(times)
+    return {
+        "min": min(times),
+        "max": max(times),
+        "mean": mean,
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "median": statistics.median(times),
+        "p95": percentiles[94],
+        "p99": percentiles[98],
+        "ops": 1 / mean if mean else 0.0,
+        "rounds": len(times),
+    }
+
+def run_benchmark(name: str, rounds: int, warmup: int) -> dict:
+    """Run one benchmark in this process; its output (node prints) is discarded."""
+    group, setup = BENCHMARKS[name]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), setup() as operation:
+        setup_rss_mb = _peak_rss_mb()
+        for _ in range(warmup):
+            operation()
+        times = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            operation()
+            times.append(time.perf_counter() - started)
+    return {
+        "name": name,
+        "group": group,
+        "stats": summarize(times),
+        "setup_rss_mb": round(setup_rss_mb, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+def run_isolated(name: str, rounds: int, warmup: int) -> dict:
+    """Run one benchmark in a fresh interpreter."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", name, "--rounds", str(rounds), "--warmup", str(warmup)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        error = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"name": name, "group": BENCHMARKS[name][0], "error": error}
+    return json.loads(lines[-1])
+
+def machine_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+def compare_results(old: dict, new: dict, threshold: Optional[float] = None) -> List[dict]:
+    """Median change per benchmark present in both runs; regression past threshold."""
+    threshold = float(os.getenv("BENCH_REGRESSION", "0.10")) if threshold is None else threshold
+    baseline = {result["name"]: result for result in old["benchmarks"] if "stats" in result}
+    rows = []
+    for result in new["benchmarks"]:
+        before = baseline.get(result["name"])
+        if before is None or "stats" not in result:
+            continue
+        change = result["stats"]["median"] / before["stats"]["median"] - 1
+        rows.append({
+            "name": result["name"],
+            "old_median": before["stats"]["median"],
+            "new_median": result["stats"]["median"],
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+def print_table(results: List[dict]) -> None:
+    columns = ("min", "max", "mean", "stddev", "median", "p95", "p99")
+    width = max([len(result["name"]) for result in results] + [20])
+    print(f"{'Name (time in ms)':<{width}} " + " ".join(f"{column.title():>9}" for column in columns)
+          + f" {'OPS':>10} {'Rounds':>7} {'Peak RSS MB':>12}")
+    print("-" * (width + 10 * len(columns) + 32))
+    group = None
+    for result in results:
+        if result["group"] != group:
+            group = result["group"]
+            print(f"-- {group}")
+        if "error" in result:
+            print(f"{result['name']:<{width}} ERROR {result['error']}")
+            continue
+        stats = result["stats"]
+        print(f"{result['name']:<{width}} " + " ".join(f"{stats[column] * 1000:9.3f}" for column in columns)
+              + f" {stats['ops']:10.1f} {stats['rounds']:7d} {result['peak_rss_mb']:12.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks for the example graphs, agents and tools.")
+    parser.add_argument("filters", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BENCH_ROUNDS", "100")))
+    parser.add_argument("--warmup", type=int, default=int(os.getenv("BENCH_WARMUP", "5")))
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="compare medians with a saved results file")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # internal: run one benchmark, print JSON
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_benchmark(args.worker, args.rounds, args.warmup)))
+        sys.exit(0)
+
+    names = [name for name in BENCHMARKS if not args.filters or any(text in name for text in args.filters)]
+    if args.list:
+        print("\n".join(names))
+        sys.exit(0)
+
+    results = []
+    for name in names:
+        print(f"running {name}...", file=sys.stderr)
+        results.append(run_isolated(name, args.rounds, args.warmup))
+    run = {"machine_info": machine_info(), "benchmarks": results}
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(run, file, indent=2)
+        print(f"\nSaved {args.json}")
+
+    failed = any("error" in result for result in results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            rows = compare_results(json.load(file), run)
+        print(f"\nMedian vs {args.compare}:")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"  {row['name']:<40} {row['old_median'] * 1000:9.3f} -> {row['new_median'] * 1000:9.3f} ms"
+                  f" ({row['change']:+.1%}){flag}")
+        failed = failed or any(row["regression"] for row in rows)
+    sys.exit(1 if failed else 0)
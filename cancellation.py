@@ -0,0 +1,51 @@
+# Deadlines shared between a caller and the work it started
+# Deadline
+# deadline_scope
+# current_deadline
+#
+# tool_executor.py opens a deadline_scope() around every tool call. Code that can stop
+# early looks it up with current_deadline(): company_db.py interrupts the running SQLite
+# statement through its progress handler, long loops can poll deadline.expired().
+# The scope is a context variable, so it follows the call into worker threads started
+# with contextvars.copy_context().
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class Deadline:
+    """Point in time (time.monotonic) after which the work should stop, plus a cancel flag."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def expired(self) -> bool:
+        return self._cancelled.is_set() or time.monotonic() >= self.expires_at
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """The innermost active deadline, or None."""
+    return _current.get()
+
+@contextmanager
+def deadline_scope(deadline: Deadline):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,130 @@
+# Import-time budget check
+# measure_import
+# check_imports
+#
+# Workers import the tool and graph modules on every cold start, so importing them must
+# be cheap and must not do anything: no Bedrock clients, no agent runs, no diagrams, no
+# output. Each module is imported in a fresh interpreter with `python -X importtime`
+# and fails the check when
+#   - its cumulative import time (best of --repeat runs) is over its budget,
+#   - it writes anything to stdout while importing,
+#   - it pulls in a module only the demos or the first real call need (LAZY_MODULES).
+#
+#   python check_import_time.py                     # every module in this directory
+#   python check_import_time.py tools_01 agent_04 --budget-ms 500 [--json]
+#
+#   IMPORT_BUDGET_MS   default budget per module in milliseconds (1500)
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = pathlib.Path(__file__).parent.resolve()
+
+# modules that only build helpers: no langchain/langgraph on import
+BUDGETS_MS = {
+    "bedrock_client": 150,
+    "cancellation": 50,
+    "company_db": 150,
+    "db_sqllite_mock": 150,
+    "fake_bedrock": 150,
+    "prompt_cache": 150,
+    "graph_diagram": 150,
+    "index_advisor": 150,
+    "query_cache": 150,
+    "tool_executor": 150,
+    "batch_math": 300,
+    "text_analysis": 300,
+}
+
+# imported on first use (clients, chat models, prebuilt agents) or by __main__ only (rich)
+LAZY_MODULES = ("boto3", "langchain_aws", "langchain.chat_models", "rich")
+
+def default_budget_ms() -> float:
+    return float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+def all_modules() -> List[str]:
+    return sorted(path.stem for path in ROOT.glob("*.py") if path.stem != pathlib.Path(__file__).stem)
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    # "import time: self [us] | cumulative | imported package", nested imports are indented
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        if total.strip().isdigit():
+            cumulative.setdefault(name.strip(), int(total))
+    return cumulative
+
+def measure_import(module: str, python: str = sys.executable) -> dict:
+    """Import a module in a fresh interpreter: import time in ms, stdout and modules loaded."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.getenv("PYTHONPATH")]))}
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    cumulative = _parse_importtime(completed.stderr)
+    errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+    return {
+        "module": module,
+        "ok": completed.returncode == 0,
+        "ms": cumulative.get(module, 0) / 1000,
+        "stdout": completed.stdout,
+        "loaded": set(cumulative),
+        "error": "\n".join(errors[-5:]) if completed.returncode else "",
+    }
+
+def check_imports(
+    modules: Sequence[str], budget_ms: Optional[float] = None, repeat: int = 3
+) -> List[dict]:
+    """Measure every module against its budget; one result dict per module."""
+    results = []
+    for module in modules:
+        runs = [measure_import(module) for _ in range(max(repeat, 1))]
+        best = min(runs, key=lambda run: run["ms"])
+        budget = budget_ms if budget_ms is not None else BUDGETS_MS.get(module, default_budget_ms())
+
+        problems = []
+        if not best["ok"]:
+            problems.append(f"import failed: {best['error']}")
+        elif best["ms"] > budget:
+            problems.append(f"{best['ms']:.0f}ms is over the {budget:.0f}ms budget")
+        if any(run["stdout"] for run in runs):
+            problems.append(f"writes to stdout on import: {best['stdout'][:80]!r}")
+        eager = sorted(
+            name for name in LAZY_MODULES
+            if any(loaded == name or loaded.startswith(name + ".") for loaded in best["loaded"])
+        )
+        if eager:
+            problems.append(f"imports {', '.join(eager)} eagerly")
+
+        results.append({"module": module, "ms": round(best["ms"], 1), "budget_ms": budget, "problems": problems})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that modules import quickly and without side effects.")
+    parser.add_argument("modules", nargs="*", help="modules to check (default: every module in this directory)")
+    parser.add_argument("--budget-ms", type=float, help="budget for every module (default BUDGETS_MS / IMPORT_BUDGET_MS)")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per module, the fastest one counts")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = check_imports(args.modules or all_modules(), args.budget_ms, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            status = "FAIL" if result["problems"] else "ok"
+            print(f"{status:4} {result['module']:22} {result['ms']:8.1f}ms / {result['budget_ms']:.0f}ms")
+            for problem in result["problems"]:
+                print(f"       {problem}")
+    sys.exit(1 if any(result["problems"] for result in results) else 0)
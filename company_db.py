@@ -0,0 +1,306 @@
+# Read-only, pooled access to the company database
+# ReadOnlyConnectionPool
+# QueryTimeoutError / PoolExhaustedError
+# encode_rows
+# get_company_db
+#
+# query_database used to open, query and close a new connection on every tool call,
+# paying connection setup and a cold page cache each time. The pool opens up to
+# COMPANY_DB_POOL_SIZE read-only connections once (file URI with mode=ro, query_only)
+# and hands them out to one thread at a time; the most recently used connection is
+# reused first so its page cache stays warm. Each query gets a deadline enforced by
+# SQLite's progress handler, so a runaway LLM-written query cannot hold a connection.
+# When every connection is in use, a caller waits at most COMPANY_DB_POOL_WAIT seconds
+# (less if its tool call's deadline is sooner) and then gets PoolExhaustedError.
+# Readers do not block a writer when the file is in WAL mode; create_mock_database sets
+# it, because a mode=ro connection cannot change the journal mode.
+#
+#   COMPANY_DB_PATH           database file (company.db next to this module)
+#   COMPANY_DB_POOL_SIZE      max open connections (8)
+#   COMPANY_DB_QUERY_TIMEOUT  seconds per query, 0 = no limit (5)
+#   COMPANY_DB_POOL_WAIT      seconds to wait for a free connection (5)
+#   COMPANY_DB_CACHE_KIB      page cache per connection in KiB (16384)
+#   COMPANY_DB_MMAP_BYTES     memory-mapped I/O size in bytes (268435456)
+#   QUERY_MAX_ROWS            rows returned by query_json before truncating (200)
+#   QUERY_MAX_BYTES           encoded result bytes before truncating (32768)
+#   QUERY_RESULT_FORMAT       "rows" (list of dicts) or "columnar" (columns once) (rows)
+#   QUERY_FETCH_BATCH         rows per fetchmany call (256)
+#   QUERY_COUNT_LIMIT         stop counting rows past the budget after this many (100000)
+
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from cancellation import current_deadline
+
+load_dotenv()
+
+DEFAULT_DB_PATH = str(pathlib.Path(__file__).parent.resolve() / "company.db")
+PROGRESS_OPS = 1000  # SQLite VM instructions between deadline checks
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query runs past its deadline and is interrupted."""
+
+class PoolExhaustedError(TimeoutError):
+    """Raised when no connection becomes free in time."""
+
+class ReadOnlyConnectionPool:
+    """Thread-safe pool of read-only SQLite connections to one database file."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        size: int = 8,
+        query_timeout: float = 5.0,
+        cache_kib: int = 16384,
+        mmap_bytes: int = 256 * 1024 * 1024,
+        pool_wait: float = 5.0,
+    ):
+        self.path = str(pathlib.Path(path).resolve())
+        self.size = size
+        self.query_timeout = query_timeout
+        self.pool_wait = pool_wait
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+
+        self._idle = queue.LifoQueue()  # LIFO: reuse the connection with the warmest cache
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    # ############### Connections ###############
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"{pathlib.Path(self.path).as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self, wait: float) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if not can_open:
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                raise PoolExhaustedError(
+                    f"all {self.size} connections to {self.path} stayed in use for {round(wait, 3)}s"
+                ) from None
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    @contextmanager
+    def connection(self, wait: Optional[float] = None):
+        """Borrow a connection; blocks up to `wait` seconds (pool_wait) when all are in use.
+
+        The wait never outlasts the current tool call's deadline.
+        """
+        wait = self.pool_wait if wait is None else wait
+        scope = current_deadline()
+        if scope is not None:
+            wait = 0.0 if scope.cancelled else min(wait, scope.remaining())
+        conn = self._acquire(wait)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    # ############### Queries ###############
+    @contextmanager
+    def cursor(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        timeout: Optional[float] = None,
+        authorizer: Optional[Callable] = None,
+    ):
+        """Execute a read-only query and yield its cursor; the deadline covers fetching too.
+
+        authorizer, if given, is installed with set_authorizer while the statement is
+        prepared (query_cache.py uses it to learn which tables a query reads).
+        """
+        timeout = self.query_timeout if timeout is None else timeout
+        # a tool call's deadline (see tool_executor.py) can cut the query short too
+        scope = current_deadline()
+        with self.connection() as conn:
+            started = time.monotonic()
+            deadline = started + timeout if timeout else None
+            if scope is not None:
+                deadline = scope.expires_at if deadline is None else min(deadline, scope.expires_at)
+
+            def interrupted() -> bool:
+                return time.monotonic() > deadline or (scope is not None and scope.cancelled)
+
+            if deadline is not None:
+                # a non-zero return makes SQLite abort the statement with "interrupted"
+                conn.set_progress_handler(interrupted, PROGRESS_OPS)
+            try:
+                if authorizer is not None:
+                    conn.set_authorizer(authorizer)
+                    try:
+                        cursor = conn.execute(sql, params)
+                    finally:
+                        conn.set_authorizer(None)
+                else:
+                    cursor = conn.execute(sql, params)
+                yield cursor
+            except sqlite3.OperationalError as e:
+                if deadline is not None and interrupted():
+                    raise QueryTimeoutError(
+                        f"query exceeded {round(deadline - started, 3)}s and was interrupted"
+                    ) from e
+                raise
+            finally:
+                if deadline is not None:
+                    conn.set_progress_handler(None, PROGRESS_OPS)
+
+    def query(
+        self, sql: str, params: Sequence[Any] = (), timeout: Optional[float] = None
+    ) -> Tuple[List[str], List[tuple]]:
+        """Run a read-only query and return (column names, rows)."""
+        with self.cursor(sql, params, timeout) as cursor:
+            return _columns(cursor), cursor.fetchall()
+
+    def query_json(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        *,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        columnar: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        authorizer: Optional[Callable] = None,
+    ) -> str:
+        """Run a query and return compact JSON, truncated to max_rows/max_bytes."""
+        max_rows, max_bytes, columnar = result_options(max_rows, max_bytes, columnar)
+        batch_size = int(os.getenv("QUERY_FETCH_BATCH", "256"))
+        count_limit = int(os.getenv("QUERY_COUNT_LIMIT", "100000"))
+
+        with self.cursor(sql, params, timeout, authorizer) as cursor:
+            columns = _columns(cursor)
+            rows = _fetch_batches(cursor, batch_size)
+            encoded, count = encode_rows(rows, columns, max_rows, max_bytes, columnar, count_limit)
+            count_is_exact = next(rows, None) is None
+
+        returned = len(encoded)
+        payload = {"query": sql, "count": count, "returned": returned, "truncated": returned < count}
+        if not count_is_exact:
+            payload["count_is_lower_bound"] = True
+        if columnar:
+            payload["columns"] = columns
+        if returned < count:
+            payload["note"] = (
+                f"showing the first {returned} of {count}{'' if count_is_exact else '+'} rows; "
+                "narrow the query (WHERE, LIMIT, GROUP BY) to see the rest"
+            )
+        # the (possibly large) encoded rows are spliced in, never decoded again
+        head = json.dumps(payload, separators=(",", ":"), default=str)
+        key = "rows" if columnar else "results"
+        return f'{head[:-1]},"{key}":[{",".join(encoded)}]}}'
+
+def result_options(
+    max_rows: Optional[int] = None, max_bytes: Optional[int] = None, columnar: Optional[bool] = None
+) -> Tuple[int, int, bool]:
+    """Fill unset query_json options from the environment."""
+    if max_rows is None:
+        max_rows = int(os.getenv("QUERY_MAX_ROWS", "200"))
+    if max_bytes is None:
+        max_bytes = int(os.getenv("QUERY_MAX_BYTES", "32768"))
+    if columnar is None:
+        columnar = os.getenv("QUERY_RESULT_FORMAT", "rows") == "columnar"
+    return max_rows, max_bytes, columnar
+
+def _columns(cursor: sqlite3.Cursor) -> List[str]:
+    return [description[0] for description in cursor.description or ()]
+
+def _fetch_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[tuple]:
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield from batch
+
+def encode_rows(
+    rows: Iterator[tuple],
+    columns: List[str],
+    max_rows: int,
+    max_bytes: int,
+    columnar: bool = False,
+    count_limit: Optional[int] = None,
+) -> Tuple[List[str], int]:
+    """JSON-encode rows until a budget is hit; returns (encoded rows, row count).
+
+    Rows past the budget are only counted (up to count_limit), so memory stays
+    bounded by the budget.
+    """
+    encoded = []
+    size = 0
+    count = 0
+    full = False
+    for row in rows:
+        count += 1
+        if full:
+            if count_limit is not None and count >= count_limit:
+                break
+            continue
+        value = list(row) if columnar else dict(zip(columns, row))
+        text = json.dumps(value, separators=(",", ":"), default=str)
+        size += len(text) + 1
+        if len(encoded) >= max_rows or size > max_bytes:
+            full = True
+            continue
+        encoded.append(text)
+    return encoded, count
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_company_db(path: Optional[str] = None) -> ReadOnlyConnectionPool:
+    """Process-wide pool for the company database (COMPANY_DB_PATH)."""
+    path = str(pathlib.Path(path or os.getenv("COMPANY_DB_PATH", DEFAULT_DB_PATH)).resolve())
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = ReadOnlyConnectionPool(
+                path,
+                size=int(os.getenv("COMPANY_DB_POOL_SIZE", "8")),
+                query_timeout=float(os.getenv("COMPANY_DB_QUERY_TIMEOUT", "5")),
+                cache_kib=int(os.getenv("COMPANY_DB_CACHE_KIB", "16384")),
+                mmap_bytes=int(os.getenv("COMPANY_DB_MMAP_BYTES", str(256 * 1024 * 1024))),
+                pool_wait=float(os.getenv("COMPANY_DB_POOL_WAIT", "5")),
+            )
+            _pools[path] = pool
+        return pool
@@ -0,0 +1,144 @@
+# Context-window compaction for long-running message loops
+# CompactionConfig
+# extractive_summarizer
+# llm_summarizer
+# make_compaction_node
+#
+# A retry loop such as process <-> check_complete in agent_03.py appends a full
+# AIMessage on every pass, so the history (and whatever is sent back to the model)
+# grows without bound. The compaction node keeps the last `keep_last` messages
+# verbatim and folds everything older into a single rolling summary message at the
+# head of the history, as soon as the history goes over its budget:
+#
+#     [summary, m1, m2, ..., m(n-k), ..., mn]  ->  [summary', m(n-k+1), ..., mn]
+#
+# The summary itself is capped at `summary_max_tokens`, so the state size, the
+# per-step checkpoint write and the summarizer prompt all stay bounded.
+# It needs a channel that understands RemoveMessage (MessageHistory or add_messages).
+#
+#   COMPACT_KEEP_LAST        messages kept verbatim (4)
+#   COMPACT_MAX_TOKENS       budget for the whole history before compacting (2000)
+#   COMPACT_SUMMARY_TOKENS   budget for the rolling summary (500)
+#   COMPACT_BUDGET_UNIT      "tokens" (estimated) or "chars" (tokens)
+#   COMPACT_SUMMARIZER       "extractive" (no model call) or "llm" (extractive)
+
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, get_buffer_string
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+load_dotenv()
+
+SUMMARY_ID = "context-summary"  # id of the rolling summary message
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+CHARS_PER_TOKEN = 4  # same ratio count_tokens_approximately uses
+SNIPPET_CHARS = 240  # per-message excerpt kept by the extractive summarizer
+
+# (previous_summary, messages_to_fold, max_chars) -> new summary text
+Summarizer = Callable[[str, Sequence[BaseMessage], int], str]
+
+@dataclass(frozen=True)
+class CompactionConfig:
+    """How much history to keep and when to compact it."""
+
+    keep_last: int = 4
+    max_tokens: int = 2000
+    summary_max_tokens: int = 500
+    unit: str = "tokens"  # "tokens" (estimated) or "chars"
+
+    @classmethod
+    def from_env(cls) -> "CompactionConfig":
+        return cls(
+            keep_last=int(os.getenv("COMPACT_KEEP_LAST", "4")),
+            max_tokens=int(os.getenv("COMPACT_MAX_TOKENS", "2000")),
+            summary_max_tokens=int(os.getenv("COMPACT_SUMMARY_TOKENS", "500")),
+            unit=os.getenv("COMPACT_BUDGET_UNIT", "tokens"),
+        )
+
+    def size(self, messages: Sequence[BaseMessage]) -> int:
+        """Size of messages in the configured unit."""
+        if self.unit == "chars":
+            return sum(len(_text(m)) for m in messages)
+        return count_tokens_approximately(messages)
+
+    def summary_chars(self) -> int:
+        if self.unit == "chars":
+            return self.summary_max_tokens
+        return self.summary_max_tokens * CHARS_PER_TOKEN
+
+# ############### Summarizers ###############
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+def _clip_tail(text: str, max_chars: int) -> str:
+    # the rolling summary drops its oldest lines first
+    if len(text) <= max_chars:
+        return text
+    text = text[-max_chars:]
+    newline = text.find("\n")
+    return text[newline + 1:] if 0 <= newline < len(text) - 1 else text
+
+def extractive_summarizer(previous: str, messages: Sequence[BaseMessage], max_chars: int) -> str:
+    """Append a one-line excerpt per folded message; no model call."""
+    lines = [previous] if previous else []
+    for message in messages:
+        snippet = " ".join(_text(message).split())
+        if len(snippet) > SNIPPET_CHARS:
+            snippet = snippet[:SNIPPET_CHARS].rstrip() + "..."
+        lines.append(f"- {message.type}: {snippet}")
+    return _clip_tail("\n".join(lines), max_chars)
+
+def llm_summarizer(llm: Any, input_max_chars: int = 12000) -> Summarizer:
+    """Summarizer that asks `llm` to update the summary; its prompt is capped too."""
+
+    def summarize(previous: str, messages: Sequence[BaseMessage], max_chars: int) -> str:
+        transcript = _clip_tail(get_buffer_string(messages), input_max_chars)
+        prompt = (
+            f"Update the running summary of a conversation in at most {max_chars} characters. "
+            "Keep facts, decisions and open issues; drop pleasantries and examples.\n\n"
+            f"Current summary:\n{previous or '(empty)'}\n\nNew messages:\n{transcript}"
+        )
+        return _clip_tail(_text(llm.invoke([HumanMessage(content=prompt)])).strip(), max_chars)
+
+    return summarize
+
+# ############### Node ###############
+def _split_summary(messages: Sequence[BaseMessage]) -> tuple:
+    if messages and getattr(messages[0], "id", None) == SUMMARY_ID:
+        return _text(messages[0])[len(SUMMARY_PREFIX):], list(messages[1:])
+    return "", list(messages)
+
+def make_compaction_node(
+    config: Optional[CompactionConfig] = None,
+    summarizer: Optional[Summarizer] = None,
+    key: str = "messages",
+) -> Callable[[dict], dict]:
+    """Build a graph node that folds old messages into a rolling summary when over budget."""
+    config = config or CompactionConfig.from_env()
+    summarizer = summarizer or extractive_summarizer
+
+    def compact_node(state: dict) -> dict:
+        messages = state.get(key) or []
+        previous, body = _split_summary(messages)
+        older = body[: max(len(body) - config.keep_last, 0)]
+        if not older or config.size(messages) <= config.max_tokens:
+            return {}
+
+        summary = summarizer(previous, older, config.summary_chars())
+        kept = body[len(older):]
+        return {
+            key: [
+                RemoveMessage(id=REMOVE_ALL_MESSAGES),
+                SystemMessage(content=SUMMARY_PREFIX + summary, id=SUMMARY_ID),
+                *kept,
+            ]
+        }
+
+    return compact_node
@@ -1,14 +1,20 @@
+import argparse
+import itertools
+import random
 import sqlite3
 import pathlib
-import os
+import time
+from datetime import date, timedelta
+from query_cache import bump_table_version
 
-# set working directory to the current file's directory
-pathlib.Path(__file__).parent.resolve()
-os.chdir(pathlib.Path(__file__).parent.resolve())
+# company.db next to this file (importing the module no longer changes the working directory)
+DB_PATH = pathlib.Path(__file__).parent.resolve() / 'company.db'
 
-def create_mock_database():
+def create_mock_database(path=DB_PATH):
     """Create a mock SQLite database with fake employee data for testing."""
-    conn = sqlite3.connect('company.db')
+    conn = sqlite3.connect(path)
+    # WAL is stored in the file: the read-only pool in company_db.py can then read while we write
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
 
     # Create employees table
@@ -55,9 +61,119 @@ def create_mock_database():
     ]
 
     cursor.executemany('INSERT OR REPLACE INTO employees VALUES (?, ?, ?, ?, ?)', employees)
+    # lets query_cache.py keep cached results for tables that did not change
+    bump_table_version(conn, 'employees')
     conn.commit()
     conn.close()
 
+# ############### Synthetic data for benchmarking ###############
+# python db_sqllite_mock.py --rows 1000000 --seed 42 [--db bench.db]
+# Same seed, same rows. Departments, salaries and hire dates follow rough real-world shapes.
+
+FIRST_NAMES = [
+    'Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Henry', 'Ivy', 'Jack', 'Kathy', 'Liam',
+    'Mia', 'Noah', 'Olivia', 'Paul', 'Quinn', 'Rita', 'Sam', 'Tina', 'Uma', 'Vera', 'Will', 'Xena',
+    'Yara', 'Zane', 'Aaron', 'Bella', 'Carlos', 'Diana', 'Ethan', 'Fatima', 'Hiro', 'Ana', 'Omar', 'Priya',
+]
+LAST_NAMES = [
+    'Johnson', 'Smith', 'Davis', 'Wilson', 'Brown', 'Miller', 'Lee', 'Taylor', 'Anderson', 'Thomas',
+    'White', 'Harris', 'Clark', 'Lewis', 'Walker', 'Young', 'King', 'Scott', 'Green', 'Adams', 'Baker',
+    'Nelson', 'Carter', 'Mitchell', 'Perez', 'Roberts', 'Turner', 'Phillips', 'Silva', 'Tanaka', 'Khan',
+]
+# department -> (share of headcount, median salary)
+DEPARTMENTS = {
+    'Engineering': (0.35, 98000),
+    'Sales': (0.22, 70000),
+    'Marketing': (0.15, 76000),
+    'Operations': (0.12, 64000),
+    'Finance': (0.08, 85000),
+    'HR': (0.08, 70000),
+}
+FIRST_HIRE_DATE = date(2005, 1, 1)
+LAST_HIRE_DATE = date(2024, 12, 31)
+
+def generate_employees(rows: int, seed: int = 42):
+    """Yield (id, name, department, salary, hire_date) tuples, deterministic for a seed."""
+    rng = random.Random(seed)
+    departments = list(DEPARTMENTS)
+    cum_weights = list(itertools.accumulate(share for share, _ in DEPARTMENTS.values()))
+    span_days = (LAST_HIRE_DATE - FIRST_HIRE_DATE).days
+
+    for employee_id in range(1, rows + 1):
+        department = rng.choices(departments, cum_weights=cum_weights)[0]
+        median = DEPARTMENTS[department][1]
+        # log-normal around the department median, rounded to 500 like real pay bands
+        salary = round(median * rng.lognormvariate(0, 0.18) / 500) * 500
+        # more recent hires than old ones (company growth)
+        hire_date = FIRST_HIRE_DATE + timedelta(days=int(rng.triangular(0, span_days, span_days)))
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        yield employee_id, name, department, float(salary), hire_date.isoformat()
+
+def create_synthetic_database(rows: int, seed: int = 42, path=DB_PATH, chunk_size: int = 50000):
+    """Replace the employees table with `rows` generated employees, tuned for bulk load."""
+    conn = sqlite3.connect(path, isolation_level=None)
+    # bulk load: no journal and no fsync while loading (a crash means re-running the load).
+    # Leaving WAL needs the only connection to the file; while readers have it open (e.g.
+    # the pool in company_db.py) the load stays in WAL, slower but with the same result.
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA cache_size=-262144')
+    conn.execute('PRAGMA temp_store=MEMORY')
+
+    conn.execute('DROP TABLE IF EXISTS employees')
+    conn.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            department TEXT NOT NULL,
+            salary REAL NOT NULL,
+            hire_date TEXT NOT NULL
+        )
+    """)
+
+    # one large transaction per chunk, rows are generated lazily so memory stays flat
+    employees = generate_employees(rows, seed)
+    inserted = 0
+    while inserted < rows:
+        chunk = [row for _, row in zip(range(chunk_size), employees)]
+        conn.execute('BEGIN')
+        conn.executemany('INSERT INTO employees VALUES (?, ?, ?, ?, ?)', chunk)
+        conn.execute('COMMIT')
+        inserted += len(chunk)
+
+    # secondary indexes are cheaper to build once, after the data is in
+    conn.execute('BEGIN')
+    conn.execute('CREATE INDEX employees_department ON employees (department)')
+    conn.execute('CREATE INDEX employees_salary ON employees (salary)')
+    conn.execute('CREATE INDEX employees_hire_date ON employees (hire_date)')
+    bump_table_version(conn, 'employees')
+    conn.execute('COMMIT')
+    conn.execute('ANALYZE')
+
+    # back to the settings readers expect (see company_db.py)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    journal_mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+    conn.close()
+    if journal_mode != 'wal':
+        raise sqlite3.OperationalError(f'{path} is left in journal_mode={journal_mode}, expected wal')
+    return inserted
+
 if __name__ == '__main__':
-    create_mock_database()
-    print('Mock database created with employee data.')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Create company.db with mock or generated employees.')
+    parser.add_argument('--rows', type=int, help='generate this many employees instead of the 28 fixed ones')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for --rows (default 42)')
+    parser.add_argument('--db', default=str(DB_PATH), help='database file (default company.db next to this file)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows per insert transaction')
+    args = parser.parse_args()
+
+    if args.rows:
+        started = time.perf_counter()
+        inserted = create_synthetic_database(args.rows, args.seed, args.db, args.chunk_size)
+        elapsed = time.perf_counter() - started
+        print(f'Generated {inserted} employees in {args.db} in {elapsed:.1f}s ({inserted / elapsed:,.0f} rows/s).')
+    else:
+        create_mock_database(args.db)
+        print('Mock database created with employee data.')
\ No newline at end of file
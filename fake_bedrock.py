@@ -0,0 +1,548 @@
+# Local Bedrock Runtime stand-in for offline load and latency tests
+# FakeBedrock
+# fake_bedrock
+# Latency
+#
+# Every LLM path (ChatBedrock from get_chat_model(), client.converse/converse_stream in
+# lang_graph_02_llm.py) goes through the pooled client in bedrock_client.py, and that
+# client can be pointed at any endpoint with BEDROCK_ENDPOINT_URL. FakeBedrock is a
+# local HTTP server speaking the Converse and ConverseStream wire protocol (JSON and
+# the binary event stream), so botocore serialization, signing, connection pooling and
+# retries run exactly as against AWS. Each request is answered from, in order:
+#   - recordings: a JSONL file of real responses keyed on the full request; with
+#     record=True a miss is forwarded to Bedrock once and appended to the file;
+#   - the script: a JSON list of rules, the first matching rule gives the response
+#         [{"match": "salary", "turn": 0, "tool_use": {"name": "query_database",
+#                                                      "input": {"query": "SELECT ..."}}},
+#          {"match": "", "text": "The average salary is 82,000."}]
+#     "match" is a regex searched in the last message (text and tool results), "turn"
+#     the number of assistant messages already in the conversation;
+#   - a generic responder: with tools configured, the first turn calls the tool named
+#     in the prompt (else the first tool) with arguments built from its schema and the
+#     next turn answers with the tool result; without tools it echoes the prompt.
+# Prompt caching is simulated for generated and scripted responses: the prefix up to
+# each cachePoint block (tools, then system, then messages; tool definitions count as
+# cached for Claude only) is remembered per model once it reaches the minimum, and usage
+# reports it as cacheWriteInputTokens the first time and cacheReadInputTokens
+# afterwards, leaving the rest in inputTokens, as Bedrock does (see prompt_cache.py).
+# Latency, throttling and streaming are configurable. Every random draw comes from a
+# generator seeded with (seed, request, attempt), so a run is reproducible no matter
+# how concurrent requests interleave; a throttled request retried by botocore or a
+# retry policy is a new attempt.
+#
+#   python fake_bedrock.py --port 8765 --latency lognormal:400,0.5 --throttle-rate 0.05
+#   BEDROCK_ENDPOINT_URL=http://127.0.0.1:8765 python lang_graph_02_llm.py --stream
+#
+# or in-process (points bedrock_client at the server for the block):
+#     with fake_bedrock(latency="const:50", script="script.json") as server:
+#         build_app().invoke(...)
+#         print(server.stats())
+#
+#   FAKE_BEDROCK_LATENCY        time to first token, see Latency (lognormal:300,0.3)
+#   FAKE_BEDROCK_TOKEN_LATENCY  time per streamed chunk (const:5)
+#   FAKE_BEDROCK_THROTTLE_RATE  share of requests answered with ThrottlingException (0)
+#   FAKE_BEDROCK_CHUNK_CHARS    characters per streamed text delta (12)
+#   FAKE_BEDROCK_SEED           seed of the latency and throttling draws (0)
+#   FAKE_BEDROCK_SCRIPT         JSON file of scripted responses (none)
+#   FAKE_BEDROCK_RECORDINGS     JSONL file of recorded responses (none)
+#   FAKE_BEDROCK_CACHE_MIN_TOKENS  shortest prefix that is cached, as on Bedrock (1024)
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class Latency:
+    """Delay distribution in milliseconds, e.g. "const:50", "uniform:20,80",
+    "normal:100,15", "lognormal:300,0.4" (median, sigma) or "0" for none."""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower() or "const"
+        self.params = [float(value) for value in params.split(",") if value.strip()]
+        if self.kind not in ("const", "uniform", "normal", "lognormal"):
+            # a bare number is a constant delay
+            self.kind, self.params = "const", [float(kind or 0)]
+        expected = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2}[self.kind]
+        if len(self.params) != expected:
+            raise ValueError(f"latency '{spec}': {self.kind} takes {expected} parameter(s)")
+
+    def sample(self, rng: random.Random) -> float:
+        """One delay in seconds."""
+        a, b = (self.params + [0.0])[:2]
+        if self.kind == "const":
+            ms = a
+        elif self.kind == "uniform":
+            ms = rng.uniform(a, b)
+        elif self.kind == "normal":
+            ms = rng.gauss(a, b)
+        else:
+            ms = a * math.exp(rng.gauss(0, b))
+        return max(ms, 0.0) / 1000
+
+    def __repr__(self) -> str:
+        return f"Latency({self.spec!r})"
+
+# ############### Event stream encoding ###############
+# vnd.amazon.eventstream: prelude (total length, headers length, CRC), headers, payload, CRC
+
+def _string_header(name: str, value: str) -> bytes:
+    name_bytes, value_bytes = name.encode(), value.encode()
+    return struct.pack("!B", len(name_bytes)) + name_bytes + struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+
+def encode_event(event_type: str, payload: dict) -> bytes:
+    """One ConverseStream event message."""
+    headers = b"".join(
+        _string_header(name, value)
+        for name, value in ((":event-type", event_type), (":content-type", "application/json"), (":message-type", "event"))
+    )
+    body = json.dumps(payload).encode()
+    prelude = struct.pack("!II", 12 + len(headers) + len(body) + 4, len(headers))
+    message = prelude + struct.pack("!I", zlib.crc32(prelude)) + headers + body
+    return message + struct.pack("!I", zlib.crc32(message))
+
+# ############### Responses ###############
+
+def _message_text(message: dict) -> str:
+    parts = []
+    for block in message.get("content", []):
+        if "text" in block:
+            parts.append(block["text"])
+        elif "toolResult" in block:
+            for item in block["toolResult"].get("content", []):
+                parts.append(item["text"] if "text" in item else json.dumps(item.get("json")))
+    return "\n".join(parts)
+
+def _has_tool_result(message: dict) -> bool:
+    return any("toolResult" in block for block in message.get("content", []))
+
+def _example_value(schema: dict) -> Any:
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    return {"string": "test", "integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}}.get(
+        schema.get("type"), "test"
+    )
+
+def _tool_arguments(input_schema: dict) -> dict:
+    properties = input_schema.get("properties", {})
+    required = input_schema.get("required", list(properties))
+    return {name: _example_value(properties.get(name, {})) for name in required}
+
+def _tool_use(name: str, arguments: dict, key: str, index: int) -> dict:
+    return {"toolUse": {"toolUseId": f"tooluse_{key[:12]}_{index}", "name": name, "input": arguments}}
+
+class FakeBedrock:
+    """Converse/ConverseStream HTTP server with scripted or recorded responses."""
+
+    def __init__(
+        self,
+        latency: Optional[str] = None,
+        token_latency: Optional[str] = None,
+        throttle_rate: Optional[float] = None,
+        chunk_chars: Optional[int] = None,
+        seed: Optional[int] = None,
+        cache_min_tokens: Optional[int] = None,
+        script: Optional[str] = None,
+        recordings: Optional[str] = None,
+        record: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = Latency(latency or os.getenv("FAKE_BEDROCK_LATENCY", "lognormal:300,0.3"))
+        self.token_latency = Latency(token_latency or os.getenv("FAKE_BEDROCK_TOKEN_LATENCY", "const:5"))
+        self.throttle_rate = (
+            float(os.getenv("FAKE_BEDROCK_THROTTLE_RATE", "0")) if throttle_rate is None else throttle_rate
+        )
+        self.chunk_chars = chunk_chars or int(os.getenv("FAKE_BEDROCK_CHUNK_CHARS", "12"))
+        self.seed = int(os.getenv("FAKE_BEDROCK_SEED", "0")) if seed is None else seed
+        self.cache_min_tokens = (
+            int(os.getenv("FAKE_BEDROCK_CACHE_MIN_TOKENS", "1024")) if cache_min_tokens is None else cache_min_tokens
+        )
+
+        script = script or os.getenv("FAKE_BEDROCK_SCRIPT")
+        self.rules = self._load_script(script) if script else []
+        self.recordings_path = recordings or os.getenv("FAKE_BEDROCK_RECORDINGS")
+        self.recordings = self._load_recordings(self.recordings_path) if self.recordings_path else {}
+        self.record = record
+        if record and not self.recordings_path:
+            raise ValueError("record=True needs a recordings file")
+
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+        self._upstream = None
+        self._attempts = Counter()  # request key -> attempts seen
+        self._prompt_cache = set()  # hashes of cached prompt prefixes
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    # ---- configuration files ----
+    @staticmethod
+    def _load_script(path: str) -> List[dict]:
+        with open(path, encoding="utf-8") as file:
+            rules = json.load(file)
+        for rule in rules:
+            rule["_pattern"] = re.compile(rule.get("match", ""), re.IGNORECASE)
+        return rules
+
+    @staticmethod
+    def _load_recordings(path: str) -> Dict[str, dict]:
+        recordings = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recordings[entry["key"]] = entry["response"]
+        return recordings
+
+    # ---- server ----
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeBedrock":
+        """Serve on a background thread (port 0 picks a free port)."""
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bedrock", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeBedrock":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        """Request counters: requests, streamed, throttled, replayed, recorded, scripted, generated,
+        cache_reads, cache_writes."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    # ---- responses ----
+    @staticmethod
+    def request_key(model_id: str, body: dict) -> str:
+        payload = json.dumps({"modelId": model_id, **body}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _rng(self, key: str) -> random.Random:
+        with self._lock:
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    def _get_upstream(self):
+        # the real Bedrock endpoint, whatever BEDROCK_ENDPOINT_URL says
+        if self._upstream is None:
+            import boto3
+
+            from bedrock_client import DEFAULT_REGION, client_config
+
+            self._upstream = boto3.session.Session().client(
+                "bedrock-runtime", region_name=DEFAULT_REGION, config=client_config()
+            )
+        return self._upstream
+
+    def _record(self, key: str, model_id: str, body: dict) -> dict:
+        response = self._get_upstream().converse(modelId=model_id, **body)
+        response = {name: response[name] for name in ("output", "stopReason", "usage") if name in response}
+        with self._lock:
+            self.recordings[key] = response
+            with open(self.recordings_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({"key": key, "model_id": model_id, "response": response}) + "\n")
+        return response
+
+    def _scripted(self, model_id: str, body: dict, key: str) -> Optional[List[dict]]:
+        messages = body.get("messages", [])
+        text = _message_text(messages[-1]) if messages else ""
+        turn = sum(message.get("role") == "assistant" for message in messages)
+        for rule in self.rules:
+            if rule.get("turn", turn) != turn or rule.get("model", "") not in model_id:
+                continue
+            if not rule["_pattern"].search(text):
+                continue
+            content = [{"text": rule["text"]}] if "text" in rule else []
+            tool_uses = rule.get("tool_use", [])
+            for index, call in enumerate(tool_uses if isinstance(tool_uses, list) else [tool_uses]):
+                content.append(_tool_use(call["name"], call.get("input", {}), key, index))
+            return content
+        return None
+
+    @staticmethod
+    def _generated(body: dict, key: str) -> List[dict]:
+        messages = body.get("messages", [])
+        last = messages[-1] if messages else {}
+        text = _message_text(last)
+        tools = [tool["toolSpec"] for tool in body.get("toolConfig", {}).get("tools", []) if "toolSpec" in tool]
+        if _has_tool_result(last):
+            return [{"text": f"Here is the result: {text[:300]}"}]
+        if tools:
+            lowered = text.lower()
+            spec = next(
+                (tool for tool in tools if tool["name"].lower() in lowered or tool["name"].replace("_", " ") in lowered),
+                tools[0],
+            )
+            return [_tool_use(spec["name"], _tool_arguments(spec.get("inputSchema", {}).get("json", {})), key, 0)]
+        return [{"text": f"This is a fake response to: {text[:200]}"}]
+
+    def respond(self, model_id: str, body: dict, key: Optional[str] = None) -> dict:
+        """Converse response (output, stopReason, usage) for a request, without any delay."""
+        key = key or self.request_key(model_id, body)
+        if key in self.recordings:
+            self._count("replayed")
+            return self.recordings[key]
+        if self.record:
+            self._count("recorded")
+            return self._record(key, model_id, body)
+
+        content = self._scripted(model_id, body, key)
+        self._count("generated" if content is None else "scripted")
+        if content is None:
+            content = self._generated(body, key)
+        output_chars = sum(len(block.get("text", "")) + len(json.dumps(block.get("toolUse", ""))) for block in content)
+        input_tokens, cache_read, cache_write = self._prompt_tokens(model_id, body)
+        output_tokens = max(output_chars // 4, 1)
+        usage = {"inputTokens": input_tokens, "outputTokens": output_tokens}
+        if cache_read or cache_write:
+            usage.update(cacheReadInputTokens=cache_read, cacheWriteInputTokens=cache_write)
+        usage["totalTokens"] = input_tokens + cache_read + cache_write + output_tokens
+        return {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": "tool_use" if any("toolUse" in block for block in content) else "end_turn",
+            "usage": usage,
+        }
+
+    def _prompt_tokens(self, model_id: str, body: dict) -> Tuple[int, int, int]:
+        """(uncached input, cache read, cache write) tokens, about 4 characters per token."""
+        tools = body.get("toolConfig", {}).get("tools", [])
+        blocks = list(body.get("system", []))
+        for message in body.get("messages", []):
+            blocks += [{"role": message.get("role")}] + list(message.get("content", []))
+
+        # the tools are part of the prefix either way, but only Claude caches them
+        prefix = hashlib.sha256((model_id + json.dumps(tools, sort_keys=True)).encode())
+        tool_tokens = len(json.dumps(tools)) // 4 if tools else 0
+        tokens = 0
+        if "anthropic.claude" in model_id:
+            tokens, tool_tokens = tool_tokens, 0
+        checkpoints = []  # (prefix hash, tokens before the cachePoint)
+        for block in blocks:
+            if "cachePoint" in block:
+                if tokens >= self.cache_min_tokens:
+                    checkpoints.append((prefix.hexdigest(), tokens))
+                continue
+            serialized = json.dumps(block, sort_keys=True)
+            prefix.update(serialized.encode())
+            tokens += len(serialized) // 4
+        if not checkpoints:
+            return tool_tokens + tokens, 0, 0
+
+        with self._lock:
+            read = max((count for digest, count in checkpoints if digest in self._prompt_cache), default=0)
+            self._prompt_cache.update(digest for digest, _ in checkpoints)
+            write = checkpoints[-1][1] - read
+            if read:
+                self._stats["cache_reads"] += 1
+            if write:
+                self._stats["cache_writes"] += 1
+        return tool_tokens + tokens - read - write, read, write
+
+    def _chunks(self, text: str) -> List[str]:
+        return [text[start:start + self.chunk_chars] for start in range(0, len(text), self.chunk_chars)] or [""]
+
+    def serve(self, handler: "_Handler", model_id: str, body: dict, stream: bool) -> None:
+        started = time.perf_counter()
+        key = self.request_key(model_id, body)
+        rng = self._rng(key)
+        self._count("requests")
+        if self.throttle_rate and rng.random() < self.throttle_rate:
+            self._count("throttled")
+            handler.send_error_json(429, "ThrottlingException", "Too many requests, please wait before trying again.")
+            return
+        try:
+            response = self.respond(model_id, body, key)
+        except Exception as e:  # a failed recording call
+            handler.send_error_json(500, "InternalServerException", str(e))
+            return
+
+        first_token = self.latency.sample(rng)
+        if not stream:
+            # a non-streamed call takes as long as the whole stream would have
+            chunks = sum(
+                len(self._chunks(block["text"])) if "text" in block else 1
+                for block in response["output"]["message"]["content"]
+            )
+            time.sleep(first_token + sum(self.token_latency.sample(rng) for _ in range(chunks)))
+            latency_ms = int((time.perf_counter() - started) * 1000)
+            handler.send_json(200, {**response, "metrics": {"latencyMs": latency_ms}})
+            return
+
+        self._count("streamed")
+        handler.start_event_stream()
+        time.sleep(first_token)
+        handler.send_event("messageStart", {"role": "assistant"})
+        for index, block in enumerate(response["output"]["message"]["content"]):
+            if "toolUse" in block:
+                tool_use = block["toolUse"]
+                handler.send_event("contentBlockStart", {
+                    "contentBlockIndex": index,
+                    "start": {"toolUse": {"toolUseId": tool_use["toolUseId"], "name": tool_use["name"]}},
+                })
+                deltas = [{"toolUse": {"input": part}} for part in self._chunks(json.dumps(tool_use["input"]))]
+            else:
+                deltas = [{"text": part} for part in self._chunks(block.get("text", ""))]
+            for delta in deltas:
+                handler.send_event("contentBlockDelta", {"contentBlockIndex": index, "delta": delta})
+                time.sleep(self.token_latency.sample(rng))
+            handler.send_event("contentBlockStop", {"contentBlockIndex": index})
+        handler.send_event("messageStop", {"stopReason": response["stopReason"]})
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        handler.send_event("metadata", {"usage": response["usage"], "metrics": {"latencyMs": latency_ms}})
+        handler.end_event_stream()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+    disable_nagle_algorithm = True  # headers and body are separate writes: no 40ms delayed-ACK stall
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # /model/{modelId}/converse or /model/{modelId}/converse-stream
+        parts = self.path.split("?")[0].split("/")
+        if len(parts) != 4 or parts[1] != "model" or parts[3] not in ("converse", "converse-stream"):
+            self.send_error_json(404, "UnknownOperationException", f"unsupported operation {self.path}")
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            self.send_error_json(400, "ValidationException", "request body is not JSON")
+            return
+        try:
+            self.server.fake.serve(self, unquote(parts[2]), request, stream=parts[3] == "converse-stream")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client closed the stream early
+
+    def send_json(self, status: int, payload: dict, error_type: Optional[str] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", error_type)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, error_type: str, message: str) -> None:
+        self.send_json(status, {"message": message}, error_type)
+
+    def start_event_stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_event(self, event_type: str, payload: dict) -> None:
+        data = encode_event(event_type, payload)
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_event_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # one line per request would dominate a load test
+
+@contextmanager
+def fake_bedrock(**options: Any):
+    """Run a FakeBedrock and point bedrock_client (clients and chat models) at it."""
+    from bedrock_client import reset_clients
+
+    server = FakeBedrock(**options).start()
+    # requests are still signed, so botocore needs some credentials
+    overrides = {"BEDROCK_ENDPOINT_URL": server.endpoint_url}
+    if not os.getenv("AWS_ACCESS_KEY_ID"):
+        overrides.update(AWS_ACCESS_KEY_ID="fake", AWS_SECRET_ACCESS_KEY="fake")
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    reset_clients()
+    try:
+        yield server
+    finally:
+        server.stop()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reset_clients()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Bedrock Runtime stand-in (Converse and ConverseStream).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", help="time to first token, e.g. lognormal:300,0.3 (FAKE_BEDROCK_LATENCY)")
+    parser.add_argument("--token-latency", help="time per streamed chunk, e.g. const:5 (FAKE_BEDROCK_TOKEN_LATENCY)")
+    parser.add_argument("--throttle-rate", type=float, help="share of requests throttled (FAKE_BEDROCK_THROTTLE_RATE)")
+    parser.add_argument("--chunk-chars", type=int, help="characters per text delta (FAKE_BEDROCK_CHUNK_CHARS)")
+    parser.add_argument("--seed", type=int, help="seed of the random draws (FAKE_BEDROCK_SEED)")
+    parser.add_argument("--cache-min-tokens", type=int, help="shortest cached prefix (FAKE_BEDROCK_CACHE_MIN_TOKENS)")
+    parser.add_argument("--script", help="JSON file of scripted responses (FAKE_BEDROCK_SCRIPT)")
+    parser.add_argument("--recordings", help="JSONL file of recorded responses (FAKE_BEDROCK_RECORDINGS)")
+    parser.add_argument("--record", action="store_true", help="forward unrecorded requests to Bedrock and record them")
+    args = parser.parse_args()
+
+    server = FakeBedrock(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        throttle_rate=args.throttle_rate,
+        chunk_chars=args.chunk_chars,
+        seed=args.seed,
+        cache_min_tokens=args.cache_min_tokens,
+        script=args.script,
+        recordings=args.recordings,
+        record=args.record,
+        host=args.host,
+        port=args.port,
+    ).start()
+    print(f"Fake Bedrock on {server.endpoint_url} (BEDROCK_ENDPOINT_URL={server.endpoint_url})")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print("Stats:", server.stats())
@@ -0,0 +1,108 @@
+# Offline, cached graph diagrams
+# topology_hash
+# render_diagram
+# show_diagram
+#
+# draw_mermaid_png() posts the graph to a remote Mermaid renderer and draw_ascii() runs
+# a grandalf layout, so calling them on every start costs seconds and fails without
+# network. Diagrams here are rendered locally and only on demand:
+#   python agent_04.py --diagram            # ascii (default)
+#   python agent_04.py --diagram=mermaid    # mermaid source text, paste into any viewer
+#   python agent_04.py --diagram=png        # local graphviz render (needs pygraphviz)
+# or render_diagram(app, "mermaid") from code.
+#
+# Output is cached in memory and under DIAGRAM_CACHE_DIR (.diagram_cache), keyed on a
+# hash of the graph topology, so an unchanged graph is never laid out twice.
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import List, Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FORMATS = {"ascii": "txt", "mermaid": "mmd", "png": "png"}
+
+_memory_cache = {}
+_memory_cache_lock = threading.Lock()
+
+def topology_hash(app) -> str:
+    """SHA-256 of the compiled graph's nodes and edges."""
+    graph = app.get_graph()
+    payload = {
+        "nodes": sorted((node.id, node.name) for node in graph.nodes.values()),
+        "edges": sorted(
+            (edge.source, edge.target, bool(edge.conditional), str(edge.data or ""))
+            for edge in graph.edges
+        ),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _render(app, fmt: str) -> Union[str, bytes]:
+    graph = app.get_graph()
+    if fmt == "ascii":
+        return graph.draw_ascii()
+    if fmt == "mermaid":
+        return graph.draw_mermaid()
+    # draw_png lays out with graphviz in-process, unlike draw_mermaid_png which calls an API
+    try:
+        import pygraphviz  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("png diagrams need pygraphviz; use 'ascii' or 'mermaid' instead") from e
+    return graph.draw_png()
+
+def render_diagram(app, fmt: str = "ascii", cache_dir: Optional[str] = None) -> Union[str, bytes]:
+    """Return the diagram of a compiled graph as text (ascii/mermaid) or PNG bytes."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown diagram format '{fmt}', expected one of {sorted(FORMATS)}")
+    cache_dir = cache_dir or os.getenv("DIAGRAM_CACHE_DIR", ".diagram_cache")
+    key = f"{topology_hash(app)}.{FORMATS[fmt]}"
+
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            return _memory_cache[key]
+
+    path = os.path.join(cache_dir, key)
+    binary = fmt == "png"
+    if os.path.exists(path):
+        with open(path, "rb" if binary else "r", encoding=None if binary else "utf-8") as f:
+            diagram = f.read()
+    else:
+        diagram = _render(app, fmt)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write then rename, so a concurrent reader never sees half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+            f.write(diagram)
+        os.replace(tmp_path, path)
+
+    with _memory_cache_lock:
+        _memory_cache[key] = diagram
+    return diagram
+
+def diagram_format(argv: Optional[List[str]] = None) -> Optional[str]:
+    """Format requested with --diagram[=ascii|mermaid|png], or None."""
+    for arg in sys.argv[1:] if argv is None else argv:
+        if arg == "--diagram":
+            return "ascii"
+        if arg.startswith("--diagram="):
+            return arg.split("=", 1)[1]
+    return None
+
+def show_diagram(app, argv: Optional[List[str]] = None) -> None:
+    """Print (or save, for png) the diagram if --diagram was passed on the command line."""
+    fmt = diagram_format(argv)
+    if fmt is None:
+        return
+    diagram = render_diagram(app, fmt)
+    if fmt == "png":
+        path = f"graph_{topology_hash(app)[:12]}.png"
+        with open(path, "wb") as f:
+            f.write(diagram)
+        print(f"diagram written to {path}")
+    else:
+        print(diagram)
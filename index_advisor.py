@@ -0,0 +1,346 @@
+# Index advisor for the SQL the LLM writes against company.db
+# IndexAdvisor
+# get_index_advisor
+#
+# query_database reports every query it runs against the database here (cache hits
+# cost nothing, so they are not recorded). The first time a query shape is seen, the
+# advisor runs EXPLAIN QUERY PLAN (prepare only, nothing is executed) and, through an
+# SQLite authorizer, learns which columns of which tables it reads. Queries whose plan
+# has a full table scan or a temp B-tree for GROUP BY/ORDER BY get a candidate index:
+#     equality filter columns, then one range column (or the GROUP BY/ORDER BY columns),
+#     then the other columns the query reads, if that keeps it within the column limit,
+#     so the index also covers the query.
+# The workload (one row per normalized query with its plan, candidate and count) is
+# persisted in INDEX_ADVISOR_DB so recommendations build up across runs; counts are
+# kept in memory and written every FLUSH_EVERY observations and at exit. Recommendations
+# skip candidates that an existing index or a longer candidate already serves.
+#
+#   python index_advisor.py report                 # scans per table, top query shapes
+#   python index_advisor.py recommend [--min-count N] [--limit N]
+#   python index_advisor.py apply [--min-count N] [--limit N]   # creates the indexes
+#
+#   INDEX_ADVISOR_DB           workload file, e.g. index_workload.db; unset = advisor off (unset)
+#   INDEX_ADVISOR_MAX_COLUMNS  max columns in a recommended index (4)
+
+import argparse
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from company_db import ReadOnlyConnectionPool, get_company_db
+from query_cache import normalize_sql
+
+load_dotenv()
+
+# "SCAN employees", "SCAN e" (alias only, SQLite >= 3.36), "SCAN TABLE employees AS e" (older)
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_TABLE_ALIAS = re.compile(r"(?:\bfrom|\bjoin|,)\s+\"?(\w+)\"?(?:\s+as)?\s+\"?(\w+)\"?")
+_NOT_ALIAS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "natural", "outer", "on", "using",
+    "group", "order", "having", "limit", "union", "except", "intersect", "window",
+}
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (GROUP BY|ORDER BY|DISTINCT)")
+FLUSH_EVERY = 100  # observations kept in memory before they are written
+
+_CLAUSE = re.compile(r"\b(where|group by|order by|having|limit)\b")
+
+def _clauses(sql: str) -> Dict[str, str]:
+    """Split normalized SQL into its WHERE / GROUP BY / ORDER BY text (rough, no parser)."""
+    parts = _CLAUSE.split(sql)
+    clauses = defaultdict(str)
+    for keyword, text in zip(parts[1::2], parts[2::2]):
+        clauses[keyword] += " " + text
+    return clauses
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """alias -> table for the FROM/JOIN items of normalized SQL (rough, no parser)."""
+    return {
+        alias: table for table, alias in _TABLE_ALIAS.findall(sql)
+        if alias not in _NOT_ALIAS and alias != table
+    }
+
+def candidate_index(sql: str, columns: Sequence[str], max_columns: int) -> Tuple[str, ...]:
+    """Index columns that would let SQLite search (and ideally cover) this query."""
+    clauses = _clauses(sql)
+    where = clauses["where"]
+    equality = [c for c in columns if re.search(rf"\b{re.escape(c)}\s*(=|==|\bin\b|\bis\b)", where)]
+    ranges = [
+        c for c in columns
+        if c not in equality and re.search(rf"\b{re.escape(c)}\s*(<|>|\bbetween\b|\blike\b)", where)
+    ]
+    grouping = [c for c in columns if re.search(rf"\b{re.escape(c)}\b", clauses["group by"])]
+    ordering = [c for c in columns if re.search(rf"\b{re.escape(c)}\b", clauses["order by"])]
+
+    key = sorted(equality)
+    if ranges:
+        key.append(ranges[0])  # columns after a range cannot be used for the search
+    else:
+        key += [c for c in grouping + ordering if c not in key]
+    if not key:
+        return ()
+    covering = key + sorted(c for c in columns if c not in key)
+    return tuple(covering if len(covering) <= max_columns else key[:max_columns])
+
+class IndexAdvisor:
+    """Collects query plans and recommends indexes for the full scans it sees."""
+
+    def __init__(self, pool: ReadOnlyConnectionPool, workload_path: str = "index_workload.db", max_columns: int = 4):
+        self.pool = pool
+        self.max_columns = max_columns
+        self._seen = set()  # query shapes already explained in this process
+        self._pending = {}  # query shape -> [count, last_seen, explained row or None], not yet written
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(workload_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS workload (
+                db_path TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                table_name TEXT,
+                plan TEXT NOT NULL,
+                full_scan INTEGER NOT NULL,
+                candidate TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (db_path, sql)
+            )
+        """)
+
+    # ############### Capture ###############
+    def observe(self, sql: str, params: Sequence[Any] = ()) -> None:
+        """Record one execution of sql; explains it the first time it is seen."""
+        normalized = normalize_sql(sql)
+        with self._lock:
+            explained = normalized in self._seen
+        row = None if explained else self._explain(sql, normalized, params)
+
+        with self._lock:
+            self._seen.add(normalized)
+            pending = self._pending.setdefault(normalized, [0, 0.0, None])
+            pending[0] += 1
+            pending[1] = time.time()
+            if row is not None:
+                pending[2] = row
+            self._pending_count += 1
+            if self._pending_count >= FLUSH_EVERY:
+                self._flush()
+
+    def flush(self) -> None:
+        """Write the observations still kept in memory to the workload file."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        pending, self._pending, self._pending_count = self._pending, {}, 0
+        if not pending:
+            return
+        explained = [
+            (self.pool.path, sql, table, json.dumps(plan), int(full_scan), json.dumps(candidate), count, last_seen)
+            for sql, (count, last_seen, row) in pending.items() if row is not None
+            for plan, table, full_scan, candidate in [row]
+        ]
+        counted = [
+            (count, last_seen, self.pool.path, sql)
+            for sql, (count, last_seen, row) in pending.items() if row is None
+        ]
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO workload (db_path, sql, table_name, plan, full_scan, candidate, count, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (db_path, sql) DO UPDATE SET plan = excluded.plan, "
+                "full_scan = excluded.full_scan, candidate = excluded.candidate, "
+                "table_name = excluded.table_name, count = count + excluded.count, last_seen = excluded.last_seen",
+                explained,
+            )
+            self._conn.executemany(
+                "UPDATE workload SET count = count + ?, last_seen = ? WHERE db_path = ? AND sql = ?",
+                counted,
+            )
+
+    def _explain(self, sql: str, normalized: str, params: Sequence[Any]):
+        reads = defaultdict(list)  # table -> columns, in first-read order
+
+        def authorizer(action, table, column, db_name, trigger):
+            if action == sqlite3.SQLITE_READ and table and column and not table.startswith("sqlite_"):
+                if column not in reads[table]:
+                    reads[table].append(column)
+            return sqlite3.SQLITE_OK
+
+        with self.pool.connection() as conn:
+            # EXPLAIN never opens a read transaction, so it does not notice a schema change
+            # (e.g. indexes created by apply): a real read reloads the schema, and putting
+            # the schema version in the text keeps a stale cached statement from being reused.
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            conn.set_authorizer(authorizer)
+            try:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN /* schema {version} */ {sql}", params).fetchall()
+            finally:
+                conn.set_authorizer(None)
+        plan = [row[3] for row in rows]
+
+        reads = {table.lower(): columns for table, columns in reads.items()}
+        aliases = table_aliases(normalized)
+        # plans name a table by its alias when it has one
+        scanned = [
+            aliases.get(name, name) for name in
+            (m.group(1).lower() for m in map(_FULL_SCAN.match, plan) if m)
+        ]
+        scanned = [table for table in scanned if table in reads]
+        needs_sort = any(_TEMP_BTREE.search(detail) for detail in plan)
+        # advise on the scanned table, or the only table when the problem is a sort
+        table = scanned[0] if scanned else (next(iter(reads)) if needs_sort and len(reads) == 1 else None)
+        candidate = ()
+        if table is not None:
+            columns = [c.lower() for c in reads[table]]
+            candidate = candidate_index(normalized, columns, self.max_columns)
+        return plan, table, bool(scanned), list(candidate)
+
+    # ############### Advice ###############
+    def report(self) -> dict:
+        """Full scans per table and the most frequent query shapes."""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT sql, table_name, full_scan, count, plan FROM workload WHERE db_path = ? "
+                "ORDER BY count DESC",
+                (self.pool.path,),
+            ).fetchall()
+        scans = defaultdict(int)
+        for _, table, full_scan, count, _ in rows:
+            if full_scan:
+                scans[table] += count
+        return {
+            "queries": sum(row[3] for row in rows),
+            "query_shapes": len(rows),
+            "full_scans_per_table": dict(scans),
+            "top_queries": [
+                {"sql": sql, "count": count, "full_scan": bool(full_scan), "plan": json.loads(plan)}
+                for sql, _, full_scan, count, plan in rows[:10]
+            ],
+        }
+
+    def _existing_indexes(self, table: str) -> List[Tuple[str, ...]]:
+        with self.pool.connection() as conn:
+            names = [row[1] for row in conn.execute(f"PRAGMA index_list({_quote(table)})")]
+            return [
+                tuple(row[2].lower() for row in conn.execute(f"PRAGMA index_info({_quote(name)})") if row[2])
+                for name in names
+            ]
+
+    def recommend(self, min_count: int = 1, limit: int = 5) -> List[dict]:
+        """Candidate indexes by how many observed queries they would serve."""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT table_name, candidate, count FROM workload "
+                "WHERE db_path = ? AND candidate != '[]'",
+                (self.pool.path,),
+            ).fetchall()
+        demand = defaultdict(int)
+        for table, candidate, count in rows:
+            demand[(table, tuple(json.loads(candidate)))] += count
+
+        # longest candidates first: a candidate that is a leading prefix of a longer one
+        # on the same table is served by it, and its queries count for the longer one
+        merged = {}
+        for (table, columns), count in sorted(demand.items(), key=lambda item: (-len(item[0][1]), -item[1])):
+            longer = next(
+                (key for key in merged if key[0] == table and key[1][: len(columns)] == columns), None
+            )
+            merged[longer or (table, columns)] = merged.get(longer, 0) + count
+
+        recommendations = []
+        existing = {}
+        for (table, columns), count in sorted(merged.items(), key=lambda item: -item[1]):
+            if count < min_count:
+                continue
+            if table not in existing:
+                existing[table] = self._existing_indexes(table)
+            # an index starting with the same columns already serves these queries
+            if any(index[: len(columns)] == columns for index in existing[table]):
+                continue
+            name = f"idx_{table}_{'_'.join(columns)}"
+            recommendations.append({
+                "table": table,
+                "columns": list(columns),
+                "queries": count,
+                "sql": f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} "
+                       f"({', '.join(_quote(c) for c in columns)})",
+            })
+            if len(recommendations) >= limit:
+                break
+        return recommendations
+
+    def apply(self, recommendations: List[dict]) -> None:
+        """Create the recommended indexes (needs write access to the database file)."""
+        conn = sqlite3.connect(self.pool.path, isolation_level=None)
+        try:
+            for recommendation in recommendations:
+                conn.execute(recommendation["sql"])
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        with self._lock:
+            # plans change once the indexes exist: explain again next time
+            self._seen.clear()
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+_advisors = {}
+_advisors_lock = threading.Lock()
+
+def get_index_advisor(path: Optional[str] = None) -> Optional[IndexAdvisor]:
+    """Process-wide advisor for get_company_db(path), or None unless INDEX_ADVISOR_DB is set."""
+    workload_path = os.getenv("INDEX_ADVISOR_DB", "")
+    if not workload_path:
+        return None
+    pool = get_company_db(path)
+    with _advisors_lock:
+        advisor = _advisors.get(pool.path)
+        if advisor is None:
+            advisor = IndexAdvisor(
+                pool,
+                workload_path=workload_path,
+                max_columns=int(os.getenv("INDEX_ADVISOR_MAX_COLUMNS", "4")),
+            )
+            _advisors[pool.path] = advisor
+            atexit.register(advisor.flush)
+        return advisor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index advice from the queries query_database has run.")
+    parser.add_argument("command", choices=["report", "recommend", "apply"])
+    parser.add_argument("--db", help="company database (default COMPANY_DB_PATH / company.db)")
+    parser.add_argument("--min-count", type=int, default=1, help="ignore candidates seen fewer times")
+    parser.add_argument("--limit", type=int, default=5, help="max indexes to recommend")
+    args = parser.parse_args()
+
+    advisor = get_index_advisor(args.db)
+    if advisor is None:
+        raise SystemExit("INDEX_ADVISOR_DB is not set: the advisor is disabled")
+
+    if args.command == "report":
+        print(json.dumps(advisor.report(), indent=2))
+    else:
+        recommendations = advisor.recommend(args.min_count, args.limit)
+        if not recommendations:
+            print("No index recommendations.")
+        for recommendation in recommendations:
+            print(f"-- serves {recommendation['queries']} observed queries")
+            print(recommendation["sql"] + ";")
+        if args.command == "apply" and recommendations:
+            advisor.apply(recommendations)
+            print(f"Created {len(recommendations)} index(es).")
@@ -0,0 +1,399 @@
+# Per-node latency and token-usage instrumentation for LangGraph runs
+# GraphInstrumentation
+# get_instrumentation / instrument
+# record_converse
+#
+# A callback handler that follows a graph run and attributes what it sees to the node
+# (metadata langgraph_node) and thread (configurable thread_id) it happened in:
+#   - node runs: wall time, errors, retries (the same node and step run again);
+#   - chat model calls: wall time, Bedrock's metrics.latencyMs, input/output tokens and
+#     cache read/creation tokens (usage_metadata.input_token_details) and the cache hit
+#     rate, cache_read / input tokens, in the summaries;
+#   - tool calls: wall time and errors.
+# Histograms and counters are labelled by node (and model/tool), never by thread, so the
+# export stays small; per-thread totals are kept for the last INSTRUMENTATION_MAX_THREADS
+# threads (thread_summary). Export with prometheus_text() or
+# prometheus_text(openmetrics=True), and optionally log one JSON line per event.
+#
+#     app = instrument(build_task_graph())          # or config={"callbacks": [get_instrumentation()]}
+#     app.invoke(state, config)
+#     get_instrumentation().node_summary()          # {"init": {...}, "process": {...}}
+#
+# Raw boto3 calls (lang_graph_02_llm.py) do not go through callbacks; they report with
+# record_converse(response, seconds) from inside the node.
+#
+#   INSTRUMENTATION_JSONL        JSON-lines event log, unset = no log
+#   INSTRUMENTATION_MAX_THREADS  threads kept for thread_summary (1000)
+
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_TYPES = ("input", "output", "cache_read", "cache_creation")
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate from the buckets, interpolating linearly inside one."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+# metric name -> (type, help, label names)
+METRICS = {
+    "langgraph_node_duration_seconds": ("histogram", "Wall time of a node run.", ("node",)),
+    "langgraph_node_runs": ("counter", "Node runs, retries included.", ("node",)),
+    "langgraph_node_retries": ("counter", "Node runs that repeated a failed run of the same step.", ("node",)),
+    "langgraph_node_errors": ("counter", "Node runs that raised.", ("node",)),
+    "langgraph_llm_duration_seconds": ("histogram", "Wall time of a chat model call.", ("node", "model")),
+    "langgraph_llm_latency_seconds": ("histogram", "Model latency reported by Bedrock (metrics.latencyMs).", ("node", "model")),
+    "langgraph_llm_errors": ("counter", "Chat model calls that raised.", ("node", "model")),
+    "langgraph_llm_tokens": ("counter", "Tokens by type: input, output, cache_read, cache_creation.", ("node", "model", "type")),
+    "langgraph_tool_duration_seconds": ("histogram", "Wall time of a tool call.", ("node", "tool")),
+    "langgraph_tool_errors": ("counter", "Tool calls that raised.", ("node", "tool")),
+}
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _latency_seconds(response_metadata: dict) -> Optional[float]:
+    # ChatBedrock reports {"latencyMs": [680]}, boto3 converse {"latencyMs": 680}
+    latency = (response_metadata or {}).get("metrics", {}).get("latencyMs")
+    if isinstance(latency, list):
+        latency = sum(latency) if latency else None
+    return latency / 1000 if latency is not None else None
+
+def _token_counts(usage: Optional[dict]) -> Dict[str, int]:
+    """usage_metadata (LangChain) or usage (Converse) as TOKEN_TYPES counts."""
+    usage = usage or {}
+    if "inputTokens" in usage:
+        cache_read, cache_creation = usage.get("cacheReadInputTokens", 0), usage.get("cacheWriteInputTokens", 0)
+        return {
+            # Converse leaves cached tokens out of inputTokens, usage_metadata counts them
+            "input": usage.get("inputTokens", 0) + cache_read + cache_creation,
+            "output": usage.get("outputTokens", 0),
+            "cache_read": cache_read,
+            "cache_creation": cache_creation,
+        }
+    details = usage.get("input_token_details") or {}
+    return {
+        "input": usage.get("input_tokens", 0),
+        "output": usage.get("output_tokens", 0),
+        "cache_read": details.get("cache_read", 0),
+        "cache_creation": details.get("cache_creation", 0),
+    }
+
+class GraphInstrumentation(BaseCallbackHandler):
+    """Callback handler collecting per-node and per-thread metrics of graph runs."""
+
+    run_inline = True  # called on the thread that runs the node, not via an executor
+
+    def __init__(self, jsonl_path: Optional[str] = None, max_threads: int = 1000):
+        self.jsonl_path = jsonl_path
+        self.max_threads = max_threads
+
+        self._histograms = {}  # (metric, label values) -> Histogram
+        self._counters = Counter()  # (metric, label values) -> value
+        self._nodes = {}  # node -> Counter of totals
+        self._threads = OrderedDict()  # thread_id -> {node -> Counter of totals}
+        self._runs = {}  # run_id -> (kind, started, node, thread_id, name, step)
+        self._attempts = OrderedDict()  # (thread_id, namespace, step, node) -> runs
+        self._lock = threading.Lock()
+        self._sink = None
+
+    # ---- recording ----
+    def _observe(self, metric: str, labels: Tuple[str, ...], value: float) -> None:
+        histogram = self._histograms.get((metric, labels))
+        if histogram is None:
+            histogram = self._histograms[(metric, labels)] = Histogram()
+        histogram.observe(value)
+
+    def _add(self, node: str, thread_id: Optional[str], **totals: float) -> None:
+        self._nodes.setdefault(node, Counter()).update(totals)
+        if thread_id is None:
+            return
+        nodes = self._threads.get(thread_id)
+        if nodes is None:
+            nodes = self._threads[thread_id] = {}
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(thread_id)
+        nodes.setdefault(node, Counter()).update(totals)
+
+    def _log(self, event: dict) -> None:
+        if not self.jsonl_path:
+            return
+        line = json.dumps({"ts": round(time.time(), 6), **event}, default=str)
+        with self._lock:
+            if self._sink is None:
+                self._sink = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+            self._sink.write(line + "\n")
+
+    def record_llm(
+        self,
+        node: str,
+        thread_id: Optional[str],
+        model: str,
+        seconds: Optional[float],
+        latency: Optional[float],
+        usage: Optional[dict],
+    ) -> None:
+        """Record one model call (wall seconds, Bedrock latency in seconds, token usage)."""
+        tokens = _token_counts(usage)
+        with self._lock:
+            if seconds is not None:
+                self._observe("langgraph_llm_duration_seconds", (node, model), seconds)
+            if latency is not None:
+                self._observe("langgraph_llm_latency_seconds", (node, model), latency)
+            for kind, count in tokens.items():
+                self._counters[("langgraph_llm_tokens", (node, model, kind))] += count
+            self._add(
+                node, thread_id, llm_calls=1, llm_seconds=seconds or 0.0, llm_latency_seconds=latency or 0.0,
+                **{f"{kind}_tokens": count for kind, count in tokens.items()},
+            )
+        self._log({"event": "llm", "node": node, "thread_id": thread_id, "model": model,
+                   "seconds": seconds, "latency_seconds": latency, **{f"{k}_tokens": v for k, v in tokens.items()}})
+
+    def _start(self, run_id, kind: str, metadata: Optional[dict], name: str = "", step: Any = None) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            self._runs[run_id] = (
+                kind, time.perf_counter(), metadata.get("langgraph_node", ""), metadata.get("thread_id"), name, step,
+            )
+
+    def _finish(self, run_id) -> Optional[tuple]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        kind, started, node, thread_id, name, step = run
+        return kind, time.perf_counter() - started, node, thread_id, name, step
+
+    # ---- callbacks ----
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        step = metadata.get("langgraph_step")
+        # the node's own run is tagged graph:step:N; runnables inside the node are not
+        if node is None or f"graph:step:{step}" not in (tags or ()):
+            return
+        key = (metadata.get("thread_id"), metadata.get("langgraph_checkpoint_ns", ""), step, node)
+        with self._lock:
+            attempt = self._attempts.pop(key, 0) + 1
+            self._attempts[key] = attempt
+            while len(self._attempts) > 10000:
+                self._attempts.popitem(last=False)
+            self._counters[("langgraph_node_runs", (node,))] += 1
+            if attempt > 1:
+                self._counters[("langgraph_node_retries", (node,))] += 1
+                self._add(node, metadata.get("thread_id"), retries=1)
+        self._start(run_id, "node", metadata, node, step)
+
+    def _end_node(self, run_id, error: Optional[BaseException]) -> None:
+        run = self._finish(run_id)
+        if run is None:
+            return
+        _, seconds, node, thread_id, _, step = run
+        with self._lock:
+            self._observe("langgraph_node_duration_seconds", (node,), seconds)
+            if error is not None:
+                self._counters[("langgraph_node_errors", (node,))] += 1
+            self._add(node, thread_id, runs=1, errors=int(error is not None), wall_seconds=seconds)
+        self._log({"event": "node", "node": node, "thread_id": thread_id, "step": step, "seconds": seconds,
+                   "error": repr(error) if error is not None else None})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_node(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_node(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", metadata, (metadata or {}).get("ls_model_name", ""))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", metadata, (metadata or {}).get("ls_model_name", ""))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        _, seconds, node, thread_id, model, _ = run
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        self.record_llm(
+            node, thread_id, model, seconds,
+            _latency_seconds(getattr(message, "response_metadata", None)),
+            getattr(message, "usage_metadata", None),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        _, seconds, node, thread_id, model, _ = run
+        with self._lock:
+            self._counters[("langgraph_llm_errors", (node, model))] += 1
+            self._add(node, thread_id, llm_errors=1)
+        self._log({"event": "llm", "node": node, "thread_id": thread_id, "model": model, "seconds": seconds,
+                   "error": repr(error)})
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", metadata, (serialized or {}).get("name") or kwargs.get("name") or "")
+
+    def _end_tool(self, run_id, error: Optional[BaseException]) -> None:
+        run = self._finish(run_id)
+        if run is None:
+            return
+        _, seconds, node, thread_id, tool, _ = run
+        with self._lock:
+            self._observe("langgraph_tool_duration_seconds", (node, tool), seconds)
+            if error is not None:
+                self._counters[("langgraph_tool_errors", (node, tool))] += 1
+            self._add(node, thread_id, tool_calls=1, tool_errors=int(error is not None), tool_seconds=seconds)
+        self._log({"event": "tool", "node": node, "thread_id": thread_id, "tool": tool, "seconds": seconds,
+                   "error": repr(error) if error is not None else None})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id, None)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, error)
+
+    # ---- reading ----
+    @staticmethod
+    def _summary(totals: Counter) -> dict:
+        summary = {name: round(value, 6) if isinstance(value, float) else value for name, value in sorted(totals.items())}
+        if totals.get("input_tokens"):
+            # share of the prompt served from Bedrock's prompt cache (see prompt_cache.py)
+            summary["cache_hit_rate"] = round(totals.get("cache_read_tokens", 0) / totals["input_tokens"], 4)
+        return summary
+
+    def node_summary(self) -> Dict[str, dict]:
+        """Totals per node over every thread, with p50/p95 wall time."""
+        with self._lock:
+            summary = {node: self._summary(totals) for node, totals in self._nodes.items()}
+            for node, values in summary.items():
+                histogram = self._histograms.get(("langgraph_node_duration_seconds", (node,)))
+                if histogram is not None:
+                    values["wall_p50"] = round(histogram.quantile(0.5), 6)
+                    values["wall_p95"] = round(histogram.quantile(0.95), 6)
+        return summary
+
+    def thread_summary(self, thread_id: str) -> Dict[str, dict]:
+        """Totals per node for one thread (empty if unknown or no longer kept)."""
+        with self._lock:
+            return {node: self._summary(totals) for node, totals in self._threads.get(thread_id, {}).items()}
+
+    def prometheus_text(self, openmetrics: bool = False) -> str:
+        """Prometheus text exposition (0.0.4), or OpenMetrics 1.0 with openmetrics=True."""
+        with self._lock:
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for metric, (kind, help_text, label_names) in METRICS.items():
+            family = metric if kind == "histogram" or openmetrics else f"{metric}_total"
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            if kind == "counter":
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric:
+                        lines.append(f"{metric}_total{_labels(label_names, labels)} {value}")
+                continue
+            for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{metric}_bucket{_labels(label_names, labels, le)} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(label_names, labels)} {total}")
+                lines.append(f"{metric}_count{_labels(label_names, labels)} {count}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._nodes.clear()
+            self._threads.clear()
+            self._attempts.clear()
+
+_instrumentation = None
+_instrumentation_lock = threading.Lock()
+
+def get_instrumentation() -> GraphInstrumentation:
+    """Process-wide handler (INSTRUMENTATION_JSONL, INSTRUMENTATION_MAX_THREADS)."""
+    global _instrumentation
+    with _instrumentation_lock:
+        if _instrumentation is None:
+            _instrumentation = GraphInstrumentation(
+                jsonl_path=os.getenv("INSTRUMENTATION_JSONL") or None,
+                max_threads=int(os.getenv("INSTRUMENTATION_MAX_THREADS", "1000")),
+            )
+        return _instrumentation
+
+def instrument(app, handler: Optional[GraphInstrumentation] = None):
+    """The compiled graph with the handler attached to every run."""
+    return app.with_config(callbacks=[handler or get_instrumentation()])
+
+def record_converse(response: dict, seconds: Optional[float], model_id: str = "") -> None:
+    """Report a raw boto3 converse()/converse_stream() result from inside a graph node.
+
+    response holds "usage" and "metrics" as Bedrock returns them; outside a graph run
+    the call is recorded under node "".
+    """
+    try:
+        from langgraph.config import get_config
+
+        metadata = get_config().get("metadata", {})
+    except RuntimeError:  # not called from a node
+        metadata = {}
+    get_instrumentation().record_llm(
+        metadata.get("langgraph_node", ""),
+        metadata.get("thread_id"),
+        model_id,
+        seconds,
+        _latency_seconds(response),
+        response.get("usage"),
+    )
@@ -1,6 +1,6 @@
 from typing import List, TypedDict
 from langgraph.graph import StateGraph, END
-from rich import print
+from graph_diagram import show_diagram
 
 # Define the state structure
 class WorkFlowState(TypedDict):
@@ -21,23 +21,27 @@ def mode_step2(state: WorkFlowState) -> dict:
     return {"steps":state["steps"] + ["step2"]}
 
 # Build the graph
-builder = StateGraph(WorkFlowState)
+def build_app():
+    builder = StateGraph(WorkFlowState)
 
-# Add nodes
-builder.add_node("start", start)
-builder.add_node("node_step1", node_step1)
-builder.add_node("mode_step2", mode_step2)   
+    # Add nodes
+    builder.add_node("start", start)
+    builder.add_node("node_step1", node_step1)
+    builder.add_node("mode_step2", mode_step2)   
 
-# Define edges
-builder.add_edge("start", "node_step1")
-builder.add_edge("node_step1", "mode_step2")
-builder.add_edge("mode_step2", END)
+    # Define edges
+    builder.add_edge("start", "node_step1")
+    builder.add_edge("node_step1", "mode_step2")
+    builder.add_edge("mode_step2", END)
 
-builder.set_entry_point("start")
+    builder.set_entry_point("start")
+    return builder.compile()
 
 # Compile and run the graph
 if __name__ == "__main__":
-    app = builder.compile()
+    from rich import print  # only the demo prints with rich
+
+    app = build_app()
 
     initial_state: WorkFlowState = {
         "user_input": "Hello, World!",
@@ -46,5 +50,5 @@ if __name__ == "__main__":
 
     final_state = app.invoke(initial_state)
 
-    print(app.get_graph().draw_ascii())
+    show_diagram(app)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
     print("Final State:", final_state)
\ No newline at end of file
@@ -1,137 +1,449 @@
-# use langgraph to build a simple workflow with LLM calls
-"""
-start: add 4 to 4 and show the result in a sentence
-node_step1
-ask_llm: add 4 to 4 and show the result in a sentence
-mode_step2
-+-----------+
-| __start__ |
-+-----------+
-       *
-       *
-       *
-  +-------+
-  | start |
-  +-------+
-       *
-       *
-       *
-+------------+
-| node_step1 |
-+------------+
-       *
-       *
-       *
-+------------+
-| mode_step2 |
-+------------+
-       *
-       *
-       *
-  +---------+
-  | __end__ |
-  +---------+
-Final State:
-{
-    'user_input': 'add 4 to 4 and show the result in a sentence',
-    'steps': ['start', 'step1', 'step2'],
-    'llm_response': 'When you add 4 to 4, the result is 8. So, the sentence would be: "The sum of 4 and 4 is 8."'
-}
-"""
-
-import boto3
-from dotenv import load_dotenv
-from typing import List, TypedDict
-from langgraph.graph import StateGraph, END
-from rich import print
-
-load_dotenv()
-
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
-
-# Start a conversation with the user message.
-user_message = ""
-conversation = [
-    {
-        "role": "user",
-        "content": [{"text": user_message}],
-    }
-]
-
-# ask LLM for response
-def ask_llm(user_message: str) -> str:
-    print(f"ask_llm: {user_message}")
-
-    conversation = [
-        {
-            "role": "user",
-            "content": [{"text": user_message}],
-        }
-    ]
-    try:
-        response = client.converse(
-            modelId=model_id,
-            messages=conversation,
-            inferenceConfig={"maxTokens": 512, "temperature": 0.5, "topP": 0.9},
-        )
-        response_text = response["output"]["message"]["content"][0]["text"]
-        return response_text
-    except Exception as e:
-        print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
-        return "Error from LLM"
-
-# Define the state structure
-class WorkFlowState(TypedDict, total=False): #total=False makes fields optional
-    user_input: str
-    steps: List[str]
-    llm_response: str
-
-# Define nodes
-def start(state: WorkFlowState) -> dict:
-    print(f"start: {state['user_input']}")
-    return {"steps":["start"]}
-
-def node_step1(state: WorkFlowState) -> dict:
-    print(f"node_step1")
-    
-    llm_response = ask_llm(state["user_input"])
-
-    return {
-        "steps":state["steps"] + ["step1"],
-        "llm_response": llm_response,
-    }
-
-def mode_step2(state: WorkFlowState) -> dict:
-    print(f"mode_step2")
-    return {"steps":state["steps"] + ["step2"]}
-
-# Build the graph
-builder = StateGraph(WorkFlowState)
-builder.add_node("start", start)
-builder.add_node("node_step1", node_step1)
-builder.add_node("mode_step2", mode_step2)   
-
-# Define edges
-builder.add_edge("start", "node_step1")
-builder.add_edge("node_step1", "mode_step2")
-builder.add_edge("mode_step2", END)
-
-builder.set_entry_point("start")
-
-# Compile and run the graph
-if __name__ == "__main__":
-    app = builder.compile()
-
-    initial_state: WorkFlowState = {
-        "user_input": "add 4 to 4 and show the result in a sentence",
-        "steps": []
-    }
-
-    final_state = app.invoke(initial_state)
-
-    print(app.get_graph().draw_ascii())
-    print("Final State:", final_state)
\ No newline at end of file
+# use langgraph to build a simple workflow with LLM calls
+"""
+start: add 4 to 4 and show the result in a sentence
+node_step1
+ask_llm: add 4 to 4 and show the result in a sentence
+mode_step2
++-----------+
+| __start__ |
++-----------+
+       *
+       *
+       *
+  +-------+
+  | start |
+  +-------+
+       *
+       *
+       *
++------------+
+| node_step1 |
++------------+
+       *
+       *
+       *
++------------+
+| mode_step2 |
++------------+
+       *
+       *
+       *
+  +---------+
+  | __end__ |
+  +---------+
+Final State:
+{
+    'user_input': 'add 4 to 4 and show the result in a sentence',
+    'steps': ['start', 'step1', 'step2'],
+    'llm_response': 'When you add 4 to 4, the result is 8. So, the sentence would be: "The sum of 4 and 4 is 8."'
+}
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from typing import List, TypedDict
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, END
+from graph_diagram import show_diagram
+from bedrock_client import get_bedrock_client, DEFAULT_MODEL_ID
+from instrumentation import record_converse
+from llm_cache import default_llm_cache
+from resilience import bedrock_retry_policy, count_node_retry, get_circuit_breaker, is_retryable, resilience_metrics
+
+load_dotenv()
+
+# Set the model ID, e.g., Amazon Nova Lite.
+# The shared, pooled Bedrock Runtime client (see bedrock_client.py) is created on the
+# first call, so importing this module does not touch AWS.
+model_id = DEFAULT_MODEL_ID
+
+# Limits for the async path: max in-flight Converse calls per process (a timed-out call
+# counts until its thread returns) and per-call timeout, from when the call starts.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+INFERENCE_CONFIG = {"maxTokens": 512, "temperature": 0.5, "topP": 0.9}
+
+# Converse request for a single user message, returns the response text.
+def converse(user_message: str) -> str:
+    conversation = [
+        {
+            "role": "user",
+            "content": [{"text": user_message}],
+        }
+    ]
+    # opt-in response cache (LLM_CACHE_PATH), see llm_cache.py
+    cache = default_llm_cache()
+    if cache is not None:
+        cache_key = cache.make_key(model_id, conversation, INFERENCE_CONFIG)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # fails fast with CircuitOpenError while Bedrock keeps failing, see resilience.py
+    started = time.perf_counter()
+    response = get_circuit_breaker(model_id).call(
+        get_bedrock_client().converse,
+        modelId=model_id,
+        messages=conversation,
+        inferenceConfig=INFERENCE_CONFIG,
+    )
+    response_text = response["output"]["message"]["content"][0]["text"]
+    # latency and token usage per node (see instrumentation.py)
+    record_converse(response, time.perf_counter() - started, model_id)
+
+    if cache is not None:
+        cache.put(cache_key, response_text)
+    return response_text
+
+# ConverseStream request, calls on_delta(text) per chunk and returns (full text, stats).
+# Setting cancelled (a threading.Event) closes the stream; the partial text is returned
+# with {"cancelled": True} and is not cached.
+def converse_stream(user_message: str, on_delta, cancelled: threading.Event = None) -> tuple:
+    conversation = [
+        {
+            "role": "user",
+            "content": [{"text": user_message}],
+        }
+    ]
+    started = time.perf_counter()
+    first_token_at = None
+    parts = []
+    usage = {}
+    metrics = {}
+
+    # a cache hit is replayed as a single delta
+    cache = default_llm_cache()
+    if cache is not None:
+        cache_key = cache.make_key(model_id, conversation, INFERENCE_CONFIG)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            on_delta(cached)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            return cached, {"ttft_ms": elapsed_ms, "total_ms": elapsed_ms, "cache_hit": True}
+
+    def read_stream():
+        nonlocal first_token_at, usage, metrics
+        response = get_bedrock_client().converse_stream(
+            modelId=model_id,
+            messages=conversation,
+            inferenceConfig=INFERENCE_CONFIG,
+        )
+        stream = response["stream"]
+        for event in stream:
+            if cancelled is not None and cancelled.is_set():
+                stream.close()
+                return
+            if "contentBlockDelta" in event:
+                text = event["contentBlockDelta"]["delta"].get("text")
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(text)
+                    on_delta(text)
+            elif "metadata" in event:
+                usage = event["metadata"].get("usage", {})
+                metrics = event["metadata"].get("metrics", {})
+
+    # errors raised mid-stream count against the circuit too
+    get_circuit_breaker(model_id).call(read_stream)
+
+    finished = time.perf_counter()
+    response_text = "".join(parts)
+    if cancelled is not None and cancelled.is_set():
+        return response_text, {"total_ms": round((finished - started) * 1000, 1), "cancelled": True}
+    record_converse({"usage": usage, "metrics": metrics}, finished - started, model_id)
+    if cache is not None:
+        cache.put(cache_key, response_text)
+
+    output_tokens = usage.get("outputTokens", 0)
+    # generation rate is measured from the first token, so it excludes queueing/prefill
+    generation_secs = finished - (first_token_at or started)
+    stats = {
+        "ttft_ms": round(((first_token_at or finished) - started) * 1000, 1),
+        "total_ms": round((finished - started) * 1000, 1),
+        "bedrock_latency_ms": metrics.get("latencyMs"),
+        "input_tokens": usage.get("inputTokens", 0),
+        # prompt-cache reads/writes (see prompt_cache.py), not counted in input_tokens
+        "cache_read_tokens": usage.get("cacheReadInputTokens", 0),
+        "cache_write_tokens": usage.get("cacheWriteInputTokens", 0),
+        "output_tokens": output_tokens,
+        "tokens_per_sec": round(output_tokens / generation_secs, 1) if generation_secs > 0 else None,
+    }
+    return response_text, stats
+
+# ask LLM for response.
+# Throttling and other transient errors are raised so the node's retry policy
+# (bedrock_retry_policy) can back off and run it again; anything else degrades to a message.
+def ask_llm(user_message: str) -> str:
+    print(f"ask_llm: {user_message}")
+
+    try:
+        return converse(user_message)
+    except Exception as e:
+        if is_retryable(e):
+            raise
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
+        return "Error from LLM"
+
+# ask LLM for response, streaming text deltas to on_delta as they arrive.
+# Once a delta has gone out, errors are not retried: a rerun would repeat the deltas.
+def ask_llm_stream(user_message: str, on_delta) -> tuple:
+    print(f"ask_llm_stream: {user_message}")
+    emitted = False
+
+    def forward(text: str) -> None:
+        nonlocal emitted
+        emitted = True
+        on_delta(text)
+
+    try:
+        return converse_stream(user_message, forward)
+    except Exception as e:
+        if is_retryable(e) and not emitted:
+            raise
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
+        return "Error from LLM", {}
+
+# asyncio primitives are bound to an event loop, so keep one semaphore per loop.
+_llm_semaphores = weakref.WeakKeyDictionary()
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
+def _get_llm_executor() -> ThreadPoolExecutor:
+    # boto3 is blocking: run the calls on a dedicated pool sized to the semaphore
+    # instead of the small default executor, which would cap concurrency on its own.
+    global _llm_executor
+    with _llm_executor_lock:
+        if _llm_executor is None:
+            _llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="ask_llm")
+    return _llm_executor
+
+def set_llm_concurrency(max_concurrency: int) -> None:
+    """Change the max number of in-flight Converse calls (applies to new event loops)."""
+    global LLM_MAX_CONCURRENCY, _llm_executor
+    with _llm_executor_lock:
+        LLM_MAX_CONCURRENCY = max_concurrency
+        _llm_semaphores.clear()
+        if _llm_executor is not None:
+            _llm_executor.shutdown(wait=False)
+            _llm_executor = None
+
+# Run fn(*args) on the LLM pool within one of the loop's LLM_MAX_CONCURRENCY slots.
+# A timed-out call cannot be stopped, so its thread keeps the slot until it returns;
+# otherwise abandoned calls would pile up past the limit. The timeout counts from when
+# the thread picks the call up, not from when it started waiting for a slot.
+async def _run_llm_call(fn, *args, timeout: float):
+    semaphore = _get_llm_semaphore()
+    await semaphore.acquire()
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+
+    def run():
+        try:
+            loop.call_soon_threadsafe(started.set)
+            return fn(*args)
+        finally:
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # the loop is closed, and its semaphore with it
+
+    try:
+        future = loop.run_in_executor(_get_llm_executor(), run)
+    except BaseException:
+        semaphore.release()
+        raise
+    # an abandoned call's error has nobody to report to
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    await started.wait()
+    return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+# ask LLM for response without blocking the event loop
+async def ask_llm_async(user_message: str, timeout: float = None) -> str:
+    print(f"ask_llm_async: {user_message}")
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+
+    try:
+        return await _run_llm_call(converse, user_message, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: timed out after {timeout}s")
+        return "Error from LLM"
+    except Exception as e:
+        if is_retryable(e):
+            raise
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
+        return "Error from LLM"
+
+# ask LLM for a streamed response without blocking the event loop.
+# on_delta is called on the event loop thread, in order, before this coroutine returns;
+# after a timeout or cancellation no more deltas are delivered and the stream is closed.
+# As in ask_llm_stream, errors are not retried once a delta has gone out.
+async def ask_llm_stream_async(user_message: str, on_delta, timeout: float = None) -> tuple:
+    print(f"ask_llm_stream_async: {user_message}")
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+
+    loop = asyncio.get_running_loop()
+    # run callbacks in this task's context so LangGraph's stream writer can find its config
+    context = contextvars.copy_context()
+    cancelled = threading.Event()
+    emitted = False
+
+    def deliver(text: str) -> None:
+        if not cancelled.is_set():
+            on_delta(text)
+
+    def forward(text: str) -> None:
+        nonlocal emitted
+        if not cancelled.is_set():
+            emitted = True
+            loop.call_soon_threadsafe(deliver, text, context=context)
+
+    try:
+        return await _run_llm_call(converse_stream, user_message, forward, cancelled, timeout=timeout)
+    except asyncio.TimeoutError:
+        cancelled.set()
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: timed out after {timeout}s")
+        return "Error from LLM", {}
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+    except Exception as e:
+        if is_retryable(e) and not emitted:
+            raise
+        print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
+        return "Error from LLM", {}
+
+# Define the state structure
+class WorkFlowState(TypedDict, total=False): #total=False makes fields optional
+    user_input: str
+    steps: List[str]
+    llm_response: str
+
+# Define nodes
+def start(state: WorkFlowState) -> dict:
+    print(f"start: {state['user_input']}")
+    return {"steps":["start"]}
+
+# Streaming is enabled per run with config={"configurable": {"stream_llm": True}}:
+# text deltas go out as {"llm_delta": ...} and per-call stats as {"llm_stats": ...}
+# on stream_mode="custom", while llm_response still gets the assembled text.
+def stream_llm_enabled(config: RunnableConfig) -> bool:
+    return bool((config or {}).get("configurable", {}).get("stream_llm"))
+
+def node_step1(state: WorkFlowState, config: RunnableConfig) -> dict:
+    print(f"node_step1")
+    count_node_retry()
+
+    if stream_llm_enabled(config):
+        writer = get_stream_writer()
+        llm_response, stats = ask_llm_stream(state["user_input"], lambda text: writer({"llm_delta": text}))
+        writer({"llm_stats": stats})
+        print(f"llm_stats: {stats}")
+    else:
+        llm_response = ask_llm(state["user_input"])
+
+    return {
+        "steps":state["steps"] + ["step1"],
+        "llm_response": llm_response,
+    }
+
+async def anode_step1(state: WorkFlowState, config: RunnableConfig) -> dict:
+    print(f"node_step1")
+    count_node_retry()
+
+    if stream_llm_enabled(config):
+        writer = get_stream_writer()
+        llm_response, stats = await ask_llm_stream_async(state["user_input"], lambda text: writer({"llm_delta": text}))
+        writer({"llm_stats": stats})
+        print(f"llm_stats: {stats}")
+    else:
+        llm_response = await ask_llm_async(state["user_input"])
+
+    return {
+        "steps":state["steps"] + ["step1"],
+        "llm_response": llm_response,
+    }
+
+def mode_step2(state: WorkFlowState) -> dict:
+    print(f"mode_step2")
+    return {"steps":state["steps"] + ["step2"]}
+
+# Build the graph
+def build_graph() -> StateGraph:
+    builder = StateGraph(WorkFlowState)
+    builder.add_node("start", start)
+    # invoke/batch run node_step1, ainvoke/abatch await anode_step1.
+    # Throttled calls are retried with jittered exponential backoff (see resilience.py).
+    builder.add_node(
+        "node_step1",
+        RunnableLambda(node_step1, afunc=anode_step1),
+        retry_policy=bedrock_retry_policy(),
+    )
+    builder.add_node("mode_step2", mode_step2)
+
+    # Define edges
+    builder.add_edge("start", "node_step1")
+    builder.add_edge("node_step1", "mode_step2")
+    builder.add_edge("mode_step2", END)
+
+    builder.set_entry_point("start")
+    return builder
+
+def build_app():
+    return build_graph().compile()
+
+# Run many WorkFlowState runs concurrently on one event loop
+async def run_batch_async(app, user_inputs: List[str]) -> List[WorkFlowState]:
+    states = [{"user_input": user_input, "steps": []} for user_input in user_inputs]
+    return await app.abatch(states)
+
+# Compile and run the graph
+if __name__ == "__main__":
+    from rich import print  # only the demo prints with rich
+
+    app = build_app()
+
+    if "--async" in sys.argv:
+        questions = [f"add {n} to {n} and show the result in a sentence" for n in range(1, 6)]
+        for final_state in asyncio.run(run_batch_async(app, questions)):
+            print("Final State:", final_state)
+        sys.exit(0)
+
+    if "--stream" in sys.argv:
+        initial_state: WorkFlowState = {
+            "user_input": "add 4 to 4 and show the result in a sentence",
+            "steps": []
+        }
+        for chunk in app.stream(initial_state, config={"configurable": {"stream_llm": True}}, stream_mode="custom"):
+            if "llm_delta" in chunk:
+                print(chunk["llm_delta"], end="", flush=True)
+        print()
+        sys.exit(0)
+
+    initial_state: WorkFlowState = {
+        "user_input": "add 4 to 4 and show the result in a sentence",
+        "steps": []
+    }
+
+    final_state = app.invoke(initial_state)
+
+    show_diagram(app)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
+    print("Final State:", final_state)
+    print("Resilience:", resilience_metrics())
\ No newline at end of file
@@ -23,7 +23,7 @@ Final  : B
 """
 from typing import TypedDict, List
 from langgraph.graph import StateGraph
-from rich import print
+from graph_diagram import show_diagram
 
 # Define the state structure
 class StudentState(TypedDict):
@@ -61,22 +61,24 @@ def calculate_grade(state: StudentState) -> StudentState:
     return state
 
 # Create graph
-graph = StateGraph(StudentState)
+def build_app():
+    graph = StateGraph(StudentState)
 
-# Add node
-graph.add_node("grade_calculator", calculate_grade)
+    # Add node
+    graph.add_node("grade_calculator", calculate_grade)
 
-# Define edges
-graph.set_entry_point("grade_calculator")
-graph.set_finish_point("grade_calculator")
+    # Define edges
+    graph.set_entry_point("grade_calculator")
+    graph.set_finish_point("grade_calculator")
 
-# Compile into an executable app
-app = graph.compile()
+    # Compile into an executable app
+    return graph.compile()
 
 # Compile and run the graph
 if __name__ == "__main__":
+    from rich import print  # only the demo prints with rich
 
-    app = graph.compile()
+    app = build_app()
 
     sample_input = {
         "scores": [88.5, 92.0, 85.5, 94.0, 87.5],
@@ -85,5 +87,5 @@ if __name__ == "__main__":
     }
     result = app.invoke(sample_input)
 
-    print(app.get_graph().draw_ascii())
+    show_diagram(app)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
     print(result["grade_report"])
\ No newline at end of file
@@ -28,7 +28,7 @@ Input:  0 → Result: 0
 
 from typing import TypedDict, List
 from langgraph.graph import StateGraph, START, END
-from rich import print
+from graph_diagram import show_diagram
 
 # Define the state structure
 class NumberState(TypedDict):
@@ -63,41 +63,43 @@ def route_by_sign(state: NumberState) -> str:
         return "zero_branch"
 
 # Create graph
-graph = StateGraph(NumberState)
+def build_app():
+    graph = StateGraph(NumberState)
 
-# Add node
-graph.add_node("square_node", square_node)
-graph.add_node("abs_node", abs_node)
-graph.add_node("zero_node", zero_node)
+    # Add node
+    graph.add_node("square_node", square_node)
+    graph.add_node("abs_node", abs_node)
+    graph.add_node("zero_node", zero_node)
 
-# A passthrough router node
-graph.add_node("router", lambda s: s)
+    # A passthrough router node
+    graph.add_node("router", lambda s: s)
 
-# Link start → router
-graph.add_edge(START, "router")
+    # Link start → router
+    graph.add_edge(START, "router")
 
-# Define edges
-graph.add_conditional_edges(
-    "router",
-    route_by_sign,
-    {"positive_branch": "square_node", "negative_branch": "abs_node", "zero_branch": "zero_node"},
-)
+    # Define edges
+    graph.add_conditional_edges(
+        "router",
+        route_by_sign,
+        {"positive_branch": "square_node", "negative_branch": "abs_node", "zero_branch": "zero_node"},
+    )
 
-graph.add_edge("square_node", END)
-graph.add_edge("abs_node", END)
-graph.add_edge("zero_node", END)
+    graph.add_edge("square_node", END)
+    graph.add_edge("abs_node", END)
+    graph.add_edge("zero_node", END)
 
-# Compile into an executable app
-app = graph.compile()
+    # Compile into an executable app
+    return graph.compile()
 
 # Compile and run the graph
 if __name__ == "__main__":
+    from rich import print  # only the demo prints with rich
 
-    app = graph.compile()
+    app = build_app()
 
     for test_number in [5, -3, 0]:
         state: NumberState = {"number": test_number, "result": None}  # type: ignore
         out = app.invoke(state)
         print(f"Input: {test_number:>2} → Result: {out['result']}")
 
-    print(app.get_graph().draw_ascii())
+    show_diagram(app)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
@@ -45,7 +45,7 @@ Reached total 78. Exiting loop.
 import random
 from typing import TypedDict, List
 from langgraph.graph import StateGraph, START, END
-from rich import print
+from graph_diagram import show_diagram
 
 # Define the state structure
 class SumState(TypedDict):
@@ -83,40 +83,42 @@ def check_continue(state: SumState) -> str:
         return "end"  # jump to END
 
 # Create graph
-graph = StateGraph(SumState)
-
-# Add node
-graph.add_node("init", init_node)
-graph.add_node("start", start)
-graph.add_node("add", add_number)
-graph.add_node("decide", decide_node)
-
-graph.add_edge("init", "start")
-graph.add_edge("start", "add")
-graph.add_edge("add", "decide")
-
-# Define edges
-graph.add_conditional_edges(
-    "decide",  # source node name
-    check_continue,  # decision function
-    {
-        "add": "start",  # loop back to the add node
-        "end": END,  # or terminate
-    },
-)
-
-# Set entry and exit points
-graph.set_entry_point("init")
-
-# Compile into an executable app
-app = graph.compile()
+def build_app():
+    graph = StateGraph(SumState)
+
+    # Add node
+    graph.add_node("init", init_node)
+    graph.add_node("start", start)
+    graph.add_node("add", add_number)
+    graph.add_node("decide", decide_node)
+
+    graph.add_edge("init", "start")
+    graph.add_edge("start", "add")
+    graph.add_edge("add", "decide")
+
+    # Define edges
+    graph.add_conditional_edges(
+        "decide",  # source node name
+        check_continue,  # decision function
+        {
+            "add": "start",  # loop back to the add node
+            "end": END,  # or terminate
+        },
+    )
+
+    # Set entry and exit points
+    graph.set_entry_point("init")
+
+    # Compile into an executable app
+    return graph.compile()
 
 # Compile and run the graph
 if __name__ == "__main__":
+    from rich import print  # only the demo prints with rich
 
-    app = graph.compile()
+    app = build_app()
 
-    print(app.get_graph().draw_ascii())
+    show_diagram(app)  # --diagram[=ascii|mermaid|png], see graph_diagram.py
 
     final_state = app.invoke({"numbers": [], "total": 0})
     print("\nFinal state:")
@@ -0,0 +1,213 @@
+# Persistent, content-addressed LLM response cache
+# LLMResponseCache
+# default_llm_cache
+#
+# Two tiers: an in-memory LRU in front of a local SQLite file. Entries are keyed on a
+# SHA-256 of what determines the answer (model id, messages, inference config, bound
+# tools), expire after a TTL and are evicted least-recently-used once a tier is full.
+#
+# The cache is opt-in. Set LLM_CACHE_PATH (e.g. LLM_CACHE_PATH=llm_cache.db) and every
+# chat model from bedrock_client.get_chat_model() plus ask_llm in lang_graph_02_llm.py
+# will use it. Only enable it for deterministic (temperature 0) or replay traffic.
+#   LLM_CACHE_PATH          SQLite file for the disk tier (unset = cache disabled)
+#   LLM_CACHE_MEMORY_SIZE   max entries in the in-memory tier (1024)
+#   LLM_CACHE_DISK_SIZE     max entries in the disk tier (100000)
+#   LLM_CACHE_TTL           seconds an entry stays valid, 0 = never expires (604800)
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+
+load_dotenv()
+
+EVICT_EVERY = 64  # disk writes between eviction passes
+
+# only model outputs are ever revived from the disk tier
+_CACHED_TYPES = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+def _load_generations(text: str) -> list:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LangChainBetaWarning)
+        return loads(text, allowed_objects=_CACHED_TYPES)
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache (for ChatBedrock) that also serves raw Converse calls (for ask_llm)."""
+
+    def __init__(
+        self,
+        path: str = "llm_cache.db",
+        memory_size: int = 1024,
+        disk_size: int = 100_000,
+        ttl: float = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    # ############### Keys ###############
+    @staticmethod
+    def make_key(model_id: str, messages: Any, inference_config: Any = None, tools: Any = None) -> str:
+        """Hash the request fields that determine the model's answer."""
+        payload = json.dumps(
+            [model_id, messages, inference_config, tools],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ############### Raw get/put (JSON values) ###############
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached JSON value for key, or None."""
+        return self._lookup(key, json.loads)
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key."""
+        self._store(key, value, json.dumps(value))
+
+    # ############### LangChain BaseCache interface ###############
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # llm_string already contains the model id, inference params and bound tools
+        return self._lookup(self._langchain_key(prompt, llm_string), _load_generations)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._store(self._langchain_key(prompt, llm_string), list(return_val), dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    # ############### Internals ###############
+    @staticmethod
+    def _langchain_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.ttl if self.ttl else None
+
+    def _lookup(self, key: str, decode) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            value = decode(row[0])
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[1], value)
+            self.disk_hits += 1
+            return value
+
+    def _store(self, key: str, value: Any, encoded: str) -> None:
+        now = time.time()
+        expires_at = self._expires_at(now)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, expires_at, now),
+            )
+            # counting rows is a scan, so the disk tier is trimmed every few writes
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= EVICT_EVERY:
+                self._writes_since_evict = 0
+                self._evict_disk(now)
+
+    def _remember(self, key: str, expires_at: Optional[float], value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.disk_size:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_size,),
+            )
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def default_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide cache configured by LLM_CACHE_PATH, or None if disabled."""
+    global _default_cache
+    path = os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache(
+                path=path,
+                memory_size=int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024")),
+                disk_size=int(os.getenv("LLM_CACHE_DISK_SIZE", "100000")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+    return _default_cache
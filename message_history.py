@@ -0,0 +1,130 @@
+# Append-only message history for LangGraph state
+# MessageLog
+# append_messages
+# MessageHistory
+#
+# `Annotated[Sequence[BaseMessage], operator.add]` builds a brand new list on every
+# step (O(n) per step, O(n^2) per conversation) and the checkpointer stores the whole
+# list again each time. MessageHistory keeps the same "append" semantics but:
+#   - MessageLog is an immutable view (buffer, length) over a shared list, so appending
+#     to the newest view extends the buffer in place: O(1) amortized, no copies.
+#     Older views still see only their first `length` items.
+#   - the channel is a DeltaChannel, so checkpoints store only the appended messages
+#     (plus a full snapshot every SNAPSHOT_FREQUENCY updates).
+#   - RemoveMessage works like in add_messages: RemoveMessage(id=REMOVE_ALL_MESSAGES)
+#     drops everything written before it, RemoveMessage(id=...) drops one message.
+#     context_compaction.py uses this to replace old messages with a summary.
+#
+# Usage:
+#     class TaskAgentState(TypedDict):
+#         messages: MessageHistory
+
+import dataclasses
+import threading
+from collections.abc import Sequence
+from typing import Annotated, Any
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+from langgraph.channels import DeltaChannel
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+SNAPSHOT_FREQUENCY = 50  # channel updates between full snapshots in the checkpointer
+
+# guards the "am I the newest view?" check + in-place extend across channel copies
+_append_lock = threading.Lock()
+
+@dataclasses.dataclass(frozen=True, eq=False, repr=False)
+class MessageLog(Sequence):
+    """Immutable, structurally shared sequence of messages."""
+
+    items: list = dataclasses.field(default_factory=list)
+    length: int = -1  # number of visible items in `items`, -1 = all of them
+
+    def __post_init__(self) -> None:
+        if self.length < 0:
+            object.__setattr__(self, "length", len(self.items))
+
+    def append_all(self, new_items: Sequence[Any]) -> "MessageLog":
+        """Return a log with new_items appended; shares the buffer when possible."""
+        if not new_items:
+            return self
+        with _append_lock:
+            if len(self.items) == self.length:
+                # we are the newest view of this buffer: extend it in place
+                self.items.extend(new_items)
+                return MessageLog(self.items, self.length + len(new_items))
+        # an older view was appended to (e.g. a fork): copy our prefix once
+        return MessageLog(self.items[: self.length] + list(new_items))
+
+    # ############### Sequence protocol ###############
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.items[: self.length][index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("MessageLog index out of range")
+        return self.items[index]
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.items[i]
+
+    def __add__(self, other: Sequence[Any]) -> "MessageLog":
+        return self.append_all(list(other))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MessageLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # mutable contents, like list
+
+    def __copy__(self) -> "MessageLog":
+        # immutable view: the channel's copy() must not pay O(n)
+        return self
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+    def __rich_repr__(self):
+        yield from self
+
+    # ############### Checkpoint serialization ###############
+    def _asdict(self) -> dict:
+        # LangGraph's serializer stores objects exposing _asdict() as constructor kwargs;
+        # only the visible prefix is written.
+        items = self.items if len(self.items) == self.length else self.items[: self.length]
+        return {"items": items}
+
+def _as_list(value: Any) -> list:
+    if isinstance(value, BaseMessage):
+        return [value]
+    return list(value)
+
+def _apply_removals(items: list, new_items: list) -> list:
+    # slow path, only taken when a write contains RemoveMessage
+    for message in new_items:
+        if not isinstance(message, RemoveMessage):
+            items.append(message)
+        elif message.id == REMOVE_ALL_MESSAGES:
+            items.clear()
+        else:
+            items = [m for m in items if getattr(m, "id", None) != message.id]
+    return items
+
+def append_messages(state: Any, writes: Sequence[Any]) -> MessageLog:
+    """DeltaChannel reducer: same result as applying operator.add once per write."""
+    log = state if isinstance(state, MessageLog) else MessageLog(_as_list(state or []))
+    new_items = []
+    for write in writes:
+        new_items.extend(_as_list(write))
+    if any(isinstance(m, RemoveMessage) for m in new_items):
+        return MessageLog(_apply_removals(list(log), new_items))
+    return log.append_all(new_items)
+
+# State annotation replacing Annotated[Sequence[BaseMessage], operator.add].
+MessageHistory = Annotated[MessageLog, DeltaChannel(append_messages, snapshot_frequency=SNAPSHOT_FREQUENCY)]
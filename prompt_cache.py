@@ -0,0 +1,65 @@
+# Bedrock prompt caching for long, static agent instructions
+# supports_prompt_cache
+# cacheable_tokens
+# cached_system_prompt
+#
+# A ReAct loop resends the same prefix on every turn: the tool definitions, the system
+# prompt, then a growing conversation. Bedrock caches the prompt up to a cache
+# checkpoint and bills later calls for that prefix as cache reads (usage
+# cacheReadInputTokens, usage_metadata input_token_details.cache_read), which are
+# cheaper and faster to process. cached_system_prompt(text, tools) ends the system
+# prompt with a checkpoint (a cachePoint block for Converse models such as Nova, a
+# cache_control text block for Claude, which ChatBedrock calls through InvokeModel)
+# when the cached prefix is long enough to be worth one:
+#   - Claude caches the tool definitions and the system prompt before the checkpoint;
+#   - Nova caches the system prompt only (tool definitions are not cacheable there).
+# Bedrock ignores checkpoints after fewer than about 1K tokens, so a shorter prefix is
+# sent as a plain system prompt. Tokens are estimated at 4 characters each. Cache reads
+# and writes, and the hit rate, are reported per node by instrumentation.py.
+#
+#     agent = create_react_agent(model, tools, prompt=cached_system_prompt(instructions, tools))
+#
+#   PROMPT_CACHE             "on" adds a checkpoint where it pays off, "off" never (on)
+#   PROMPT_CACHE_MIN_TOKENS  shortest prefix given a checkpoint (1024)
+
+import json
+import os
+from typing import Any, Sequence
+
+from dotenv import load_dotenv
+
+from bedrock_client import DEFAULT_MODEL_ID
+
+load_dotenv()
+
+def prompt_cache_enabled() -> bool:
+    return os.getenv("PROMPT_CACHE", "on").lower() not in ("off", "0", "false", "no")
+
+def min_cache_tokens() -> int:
+    return int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+def _is_claude(model_id: str) -> bool:
+    return "anthropic.claude" in model_id.lower()
+
+def supports_prompt_cache(model_id: str = DEFAULT_MODEL_ID) -> bool:
+    """Claude and Nova models, inference profiles (us.*) included."""
+    return prompt_cache_enabled() and (_is_claude(model_id) or "amazon.nova" in model_id.lower())
+
+def cacheable_tokens(text: str, tools: Sequence[Any] = (), model_id: str = DEFAULT_MODEL_ID) -> int:
+    """Estimated tokens a checkpoint after this system prompt would cache."""
+    chars = len(text)
+    if _is_claude(model_id) and tools:
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        chars += sum(len(json.dumps(convert_to_openai_tool(tool))) for tool in tools)
+    return chars // 4
+
+def cached_system_prompt(text: str, tools: Sequence[Any] = (), model_id: str = DEFAULT_MODEL_ID):
+    """SystemMessage ending in a cache checkpoint when the model caches and the prefix is long enough."""
+    from langchain_core.messages import SystemMessage
+
+    if not supports_prompt_cache(model_id) or cacheable_tokens(text, tools, model_id) < min_cache_tokens():
+        return SystemMessage(content=text)
+    if _is_claude(model_id):
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+    return SystemMessage(content=[{"type": "text", "text": text}, {"cachePoint": {"type": "default"}}])
@@ -0,0 +1,239 @@
+# Result cache for read-only company database queries
+# normalize_sql
+# bump_table_version
+# QueryResultCache
+# get_query_cache
+#
+# Agents ask the same analytics questions over and over (employee counts, average
+# salary per department). QueryResultCache sits in front of ReadOnlyConnectionPool
+# .query_json() and answers repeats from memory:
+#   - keys are the normalized SQL (whitespace, case and trailing ';' do not matter,
+#     string literals do) plus params and the result options;
+#   - while the file is unchanged, a hit costs one `PRAGMA data_version` on a dedicated
+#     connection (the value moves whenever another connection commits);
+#   - after commits, the entries that read a table whose change counter moved
+#     (table_versions, bumped by writers with bump_table_version) are dropped. When no
+#     counter moved, the commit came from a writer that does not keep them, and every
+#     entry is dropped; without that table any commit invalidates every entry;
+#   - entries are evicted least-recently-used past QUERY_CACHE_SIZE entries or
+#     QUERY_CACHE_MAX_BYTES of results; queries using random()/now are not cached.
+#
+#   QUERY_CACHE_SIZE        max cached results, 0 disables the cache (256)
+#   QUERY_CACHE_MAX_BYTES   max total size of cached results (16777216)
+
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from company_db import ReadOnlyConnectionPool, get_company_db, result_options
+
+load_dotenv()
+
+VERSIONS_TABLE = "table_versions"
+
+_QUOTED = re.compile(r"('(?:''|[^'])*'|\"(?:\"\"|[^\"])*\")")
+_VOLATILE_FUNCTIONS = {"random", "randomblob", "changes", "total_changes", "last_insert_rowid"}
+_VOLATILE_SQL = re.compile(r"'now'|\bcurrent_(date|time|timestamp)\b", re.IGNORECASE)
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and case outside string literals, drop trailing ';'."""
+    parts = _QUOTED.split(sql.strip().rstrip(";").strip())
+    # odd indexes are the quoted literals captured by the split
+    return "".join(
+        part if i % 2 else " ".join(part.split()).lower()
+        for i, part in enumerate(parts)
+    )
+
+def bump_table_version(conn: sqlite3.Connection, *tables: str) -> None:
+    """Record that tables changed; call in the writer's transaction before commit."""
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} "
+        "(name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+    conn.executemany(
+        f"INSERT INTO {VERSIONS_TABLE} (name, version) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+        [(table.lower(),) for table in tables],
+    )
+
+class _Entry:
+    __slots__ = ("value", "tables")
+
+    def __init__(self, value: str, tables: Tuple[str, ...]):
+        self.value = value
+        self.tables = tables
+
+class QueryResultCache:
+    """LRU cache of query_json() results, invalidated by commits to the tables they read."""
+
+    def __init__(
+        self,
+        pool: ReadOnlyConnectionPool,
+        max_entries: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.pool = pool
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.uncacheable = 0
+
+        self._entries = OrderedDict()  # key -> _Entry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # data_version only moves for commits made by *other* connections, so one
+        # connection is kept aside just to watch it
+        self._watcher = pool._connect()
+        self._seen_data_version = self._data_version()
+        self._seen_versions = self._table_versions()
+
+    # ############### Validation ###############
+    def _data_version(self) -> int:
+        return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def _table_versions(self) -> Optional[Dict[str, int]]:
+        try:
+            return dict(self._watcher.execute(f"SELECT name, version FROM {VERSIONS_TABLE}"))
+        except sqlite3.OperationalError:
+            return None  # writers do not keep change counters
+
+    def _sync(self) -> int:
+        """Drop the entries that commits since the last check may have made stale."""
+        data_version = self._data_version()
+        if data_version == self._seen_data_version:
+            return data_version
+
+        versions = self._table_versions()
+        if versions is None or versions == self._seen_versions:
+            # a writer that does not bump table_versions committed: any table may have changed
+            stale = list(self._entries)
+        else:
+            seen = self._seen_versions or {}
+            changed = {table for table in set(versions) | set(seen) if versions.get(table, 0) != seen.get(table, 0)}
+            stale = [key for key, entry in self._entries.items() if changed.intersection(entry.tables)]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        self._seen_data_version = data_version
+        self._seen_versions = versions
+        return data_version
+
+    # ############### Queries ###############
+    def query_json(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        *,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        columnar: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        on_execute: Optional[Callable[[str, Sequence[Any]], None]] = None,
+    ) -> str:
+        """Same result as pool.query_json(), served from the cache when still valid.
+
+        on_execute(sql, params) is called after the query actually ran, never on a hit.
+        """
+        options = result_options(max_rows, max_bytes, columnar)
+        key = (normalize_sql(sql), tuple(params), options)
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            data_version = self._seen_data_version
+
+        tables = set()
+        volatile = []
+
+        def authorizer(action, arg1, arg2, db_name, trigger):
+            if action == sqlite3.SQLITE_READ and arg1 and not arg1.startswith("sqlite_"):
+                tables.add(arg1.lower())
+            elif action == sqlite3.SQLITE_FUNCTION and arg2 and arg2.lower() in _VOLATILE_FUNCTIONS:
+                volatile.append(arg2)
+            return sqlite3.SQLITE_OK
+
+        max_rows, max_bytes, columnar = options
+        value = self.pool.query_json(
+            sql, params, max_rows=max_rows, max_bytes=max_bytes, columnar=columnar,
+            timeout=timeout, authorizer=authorizer,
+        )
+        if on_execute is not None:
+            on_execute(sql, params)
+
+        with self._lock:
+            if volatile or _VOLATILE_SQL.search(key[0]):
+                self.uncacheable += 1
+            elif self.max_entries > 0 and self._sync() == data_version:
+                # a commit that landed while the query ran may or may not be in the
+                # result, so that result is not cached
+                self._store(key, _Entry(value, tuple(sorted(tables))))
+        return value
+
+    def _lookup(self, key) -> Optional[str]:
+        self._sync()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def _store(self, key, entry: _Entry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if len(entry.value) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += len(entry.value)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "uncacheable": self.uncacheable,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_query_cache(path: Optional[str] = None) -> QueryResultCache:
+    """Process-wide result cache in front of get_company_db(path)."""
+    pool = get_company_db(path)
+    with _caches_lock:
+        cache = _caches.get(pool.path)
+        if cache is None:
+            cache = QueryResultCache(
+                pool,
+                max_entries=int(os.getenv("QUERY_CACHE_SIZE", "256")),
+                max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            )
+            _caches[pool.path] = cache
+        return cache
@@ -0,0 +1,235 @@
+# Retry policy and circuit breaker for nodes that call Bedrock
+# is_throttling / is_retryable
+# bedrock_retry_policy / count_node_retry
+# CircuitOpenError / CircuitBreaker / get_circuit_breaker
+# resilience_metrics
+#
+# botocore already retries a few times inside one call (see bedrock_client.py). This
+# module adds the layer above it:
+#   - bedrock_retry_policy() returns LangGraph RetryPolicy objects for add_node(). A node
+#     that raises a throttling error is re-run with jittered exponential backoff, other
+#     transient errors get a shorter schedule, fatal errors (validation, access denied,
+#     open circuit) are raised at once. The retry_on predicates are pure: LangGraph may
+#     evaluate them without retrying (e.g. on the last attempt), so nodes that use the
+#     policy call count_node_retry() first, which counts the run if it is a retry.
+#   - CircuitBreaker, one per model id, fails fast with CircuitOpenError after
+#     BEDROCK_BREAKER_THRESHOLD consecutive transient failures, then lets a single probe
+#     call through after BEDROCK_BREAKER_RESET seconds.
+#   - resilience_metrics() reports node retries, Bedrock failures by kind (counted once,
+#     by the breaker the call went through), rejected calls and how long each circuit has
+#     been open.
+#
+#   BEDROCK_RETRY_ATTEMPTS       node attempts on throttling (5)
+#   BEDROCK_RETRY_INITIAL        first backoff in seconds (1.0)
+#   BEDROCK_RETRY_MAX_INTERVAL   backoff cap in seconds (20)
+#   BEDROCK_BREAKER_THRESHOLD    consecutive failures that open the circuit (5)
+#   BEDROCK_BREAKER_RESET        seconds the circuit stays open before a probe (30)
+
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, List
+
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
+from dotenv import load_dotenv
+from langgraph.runtime import get_runtime
+from langgraph.types import RetryPolicy
+
+load_dotenv()
+
+THROTTLING_CODES = {
+    "throttlingexception",
+    "toomanyrequestsexception",
+    "servicequotaexceededexception",
+}
+TRANSIENT_CODES = {
+    "serviceunavailableexception",
+    "internalserverexception",
+    "modelnotreadyexception",
+    "modeltimeoutexception",
+}
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+def _count(name: str, amount: int = 1) -> None:
+    with _counters_lock:
+        _counters[name] += amount
+
+# ############### Error classification ###############
+def error_code(exc: BaseException) -> str:
+    """Bedrock error code, lower-cased (stream events use camelCase names)."""
+    if isinstance(exc, ClientError):
+        return str(exc.response.get("Error", {}).get("Code", "")).lower()
+    return ""
+
+def is_throttling(exc: BaseException) -> bool:
+    return error_code(exc) in THROTTLING_CODES
+
+def is_retryable(exc: BaseException) -> bool:
+    """Throttling and transient service/network errors; never an open circuit."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (ConnectionError, ReadTimeoutError)):
+        return True
+    return error_code(exc) in THROTTLING_CODES | TRANSIENT_CODES
+
+def _count_failure(exc: BaseException) -> None:
+    if is_throttling(exc):
+        _count("throttled")
+    elif is_retryable(exc):
+        _count("transient_errors")
+    else:
+        _count("fatal_errors")
+
+def _retry_on_throttling(exc: Exception) -> bool:
+    return is_throttling(exc)
+
+def _retry_on_transient(exc: Exception) -> bool:
+    return is_retryable(exc)
+
+def bedrock_retry_policy(max_attempts: int = None) -> List[RetryPolicy]:
+    """Node retry policies: long backoff for throttling, short for other transient errors."""
+    attempts = max_attempts or int(os.getenv("BEDROCK_RETRY_ATTEMPTS", "5"))
+    initial = float(os.getenv("BEDROCK_RETRY_INITIAL", "1.0"))
+    max_interval = float(os.getenv("BEDROCK_RETRY_MAX_INTERVAL", "20"))
+    # LangGraph uses the first policy whose retry_on matches
+    return [
+        RetryPolicy(
+            initial_interval=initial,
+            backoff_factor=2.0,
+            max_interval=max_interval,
+            max_attempts=attempts,
+            jitter=True,
+            retry_on=_retry_on_throttling,
+        ),
+        RetryPolicy(
+            initial_interval=initial / 2,
+            backoff_factor=2.0,
+            max_interval=max_interval / 4,
+            max_attempts=min(attempts, 3),
+            jitter=True,
+            retry_on=_retry_on_transient,
+        ),
+    ]
+
+def count_node_retry() -> None:
+    """Count this node run as a retry if it follows a failed attempt (no-op outside a graph)."""
+    try:
+        attempt = get_runtime().execution_info.node_attempt
+    except (RuntimeError, AttributeError):
+        return
+    if attempt > 1:
+        _count("retries")
+
+# ############### Circuit breaker ###############
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Bedrock while a model's circuit is open."""
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` transient failures -> half-open probe -> closed."""
+
+    def __init__(self, name: str, threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.open_seconds = 0.0  # total time spent open, excluding the current period
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run fn through the breaker; raises CircuitOpenError while open."""
+        self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            _count_failure(exc)
+            self._after_call(ok=not is_retryable(exc))
+            raise
+        self._after_call(ok=True)
+        return result
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit for '{self.name}' is open")
+                self.state = "half-open"
+            if self.state == "half-open":
+                # one probe at a time, everyone else keeps failing fast
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"circuit for '{self.name}' is half-open")
+                self._probe_in_flight = True
+
+    def _after_call(self, ok: bool) -> None:
+        # fatal errors (bad request, access denied) say nothing about Bedrock's health
+        with self._lock:
+            probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if ok:
+                self.failures = 0
+                if self.state != "closed":
+                    self.open_seconds += time.monotonic() - self.opened_at
+                    self.state = "closed"
+                    self.opened_at = None
+                return
+            self.failures += 1
+            if probe or self.failures >= self.threshold:
+                if self.state == "closed":
+                    self.times_opened += 1
+                    self.opened_at = time.monotonic()
+                else:
+                    # failed probe: the current open period continues
+                    self.open_seconds += time.monotonic() - self.opened_at
+                    self.opened_at = time.monotonic()
+                self.state = "open"
+
+    def stats(self) -> dict:
+        with self._lock:
+            current = time.monotonic() - self.opened_at if self.opened_at is not None else 0.0
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+                "open_seconds": round(self.open_seconds + current, 3),
+            }
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(model_id: str) -> CircuitBreaker:
+    """Process-wide breaker for model_id."""
+    with _breakers_lock:
+        breaker = _breakers.get(model_id)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                model_id,
+                threshold=int(os.getenv("BEDROCK_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("BEDROCK_BREAKER_RESET", "30")),
+            )
+            _breakers[model_id] = breaker
+        return breaker
+
+def resilience_metrics() -> dict:
+    """Retry counters plus per-model circuit stats."""
+    with _counters_lock:
+        counters = dict(_counters)
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        "retries": counters.get("retries", 0),
+        "throttled": counters.get("throttled", 0),
+        "transient_errors": counters.get("transient_errors", 0),
+        "fatal_errors": counters.get("fatal_errors", 0),
+        "circuits": {breaker.name: breaker.stats() for breaker in breakers},
+    }
@@ -0,0 +1,662 @@
+# Durable SQLite checkpointer
+# SqliteCheckpointSaver
+# make_checkpointer
+#
+# Drop-in replacement for InMemorySaver backed by a local SQLite file in WAL mode, so
+# state survives restarts, several worker processes can share one file, and a crashed
+# run can resume from its last checkpoint (invoke(None, config) with the same thread_id).
+#
+# Storage layout follows InMemorySaver:
+#   checkpoints   one row per superstep (without channel values)
+#   blobs         one row per (channel, version), written only for channels that changed,
+#                 so untouched channels are never rewritten
+#   writes        pending writes per task; DeltaChannel channels (e.g. MessageHistory in
+#                 message_history.py) are rebuilt from these, so appending a message
+#                 stores only that message
+#
+# Each put()/put_writes() is one transaction. With max_checkpoints_per_thread set, older
+# checkpoints are pruned in batches: whenever a thread holds a multiple of prune_every
+# checkpoints over the limit, it is cut back to the newest max_checkpoints_per_thread,
+# so the work of a prune is spread over prune_every steps. A DeltaChannel value of the
+# oldest kept checkpoint is rebuilt from its ancestors' writes, so the ancestors back to
+# the channel's last stored value are kept too. Only when that chain is longer than
+# max_delta_chain and delta_reducers has the channel's reducer is the value rebuilt and
+# stored as a snapshot at the cut, letting the ancestors go.
+#
+# Snapshots are written as langgraph's _DeltaSnapshot, a private type of
+# langgraph-checkpoint (4.x) that the DeltaChannel API is built on. If it is missing,
+# no snapshots are written and retention keeps the ancestors instead.
+#
+#   CHECKPOINTER              sqlite (default) or memory
+#   CHECKPOINT_DB             SQLite file (checkpoints.db)
+#   CHECKPOINT_MAX_PER_THREAD retention per thread/namespace, 0 = keep all (50)
+#   CHECKPOINT_PRUNE_EVERY    checkpoints over the limit between two prunes (50)
+#
+# make_checkpointer() registers append_messages for "messages", the MessageHistory field
+# of the agents in this directory.
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from typing import Any, Callable, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    DeltaChannelHistory,
+    PendingWrite,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+try:  # private API, see the header
+    from langgraph.checkpoint.serde.types import _DeltaSnapshot
+except ImportError:
+    _DeltaSnapshot = None
+
+load_dotenv()
+
+PRUNE_EVERY = 50  # default batch size of retention
+MAX_DELTA_CHAIN = 50  # default ancestors kept for a delta channel before it is snapshotted
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver that stores checkpoints, channel blobs and writes in SQLite."""
+
+    def __init__(
+        self,
+        path: str = "checkpoints.db",
+        *,
+        max_checkpoints_per_thread: Optional[int] = None,
+        prune_every: int = PRUNE_EVERY,
+        delta_reducers: Optional[Mapping[str, Callable]] = None,
+        max_delta_chain: int = MAX_DELTA_CHAIN,
+        serde=None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.prune_every = max(prune_every, 1)
+        self.delta_reducers = dict(delta_reducers or {})  # DeltaChannel name -> its reducer
+        self.max_delta_chain = max_delta_chain
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> "SqliteCheckpointSaver":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ############### Reads ###############
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        if not versions:
+            return {}
+        # Match (channel, version) pairs through a VALUES table instead of one query per channel.
+        pairs = [(k, str(v)) for k, v in versions.items()]
+        values_sql = ",".join(["(?, ?)"] * len(pairs))
+        rows = self.conn.execute(
+            f"""
+            WITH wanted(channel, version) AS (VALUES {values_sql})
+            SELECT b.channel, b.type, b.blob FROM blobs b
+            JOIN wanted w ON b.channel = w.channel AND b.version = w.version
+            WHERE b.thread_id = ? AND b.checkpoint_ns = ?
+            """,
+            [x for pair in pairs for x in pair] + [thread_id, checkpoint_ns],
+        ).fetchall()
+        return {
+            channel: self.serde.loads_typed((type_, blob))
+            for channel, type_, blob in rows
+            if type_ != "empty"
+        }
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+        rows = self.conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda r: writes_sort_key(r[5], r[0], r[1]))
+        return rows
+
+    def _make_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint_: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        writes = self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint_,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint_["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_b)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((w_type, value)))
+                for task_id, _, channel, w_type, value, _ in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the latest one for the thread."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._make_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, optionally filtered by thread, metadata and id."""
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        sql = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                yield self._make_tuple(thread_id, checkpoint_ns, tuple(row))
+
+    def _parent_chain(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[str]:
+        """Ancestor checkpoint ids of checkpoint_id, nearest first (excluding itself)."""
+        rows = self.conn.execute(
+            """
+            WITH RECURSIVE chain(checkpoint_id, parent_checkpoint_id, depth) AS (
+                SELECT checkpoint_id, parent_checkpoint_id, 0 FROM checkpoints
+                WHERE thread_id = ?1 AND checkpoint_ns = ?2 AND checkpoint_id = ?3
+                UNION ALL
+                SELECT c.checkpoint_id, c.parent_checkpoint_id, chain.depth + 1 FROM checkpoints c
+                JOIN chain ON c.checkpoint_id = chain.parent_checkpoint_id
+                WHERE c.thread_id = ?1 AND c.checkpoint_ns = ?2
+            )
+            SELECT checkpoint_id FROM chain WHERE depth > 0 ORDER BY depth
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def _channel_versions(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> dict:
+        row = self.conn.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchone()
+        return self.serde.loads_typed(row).get("channel_versions", {}) if row is not None else {}
+
+    def _stored_blob_types(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, with_blobs: bool = True
+    ) -> dict[str, tuple]:
+        """channel -> (type, blob) stored at the versions recorded in checkpoint_id (blob None unless with_blobs)."""
+        versions = self._channel_versions(thread_id, checkpoint_ns, checkpoint_id)
+        if not versions:
+            return {}
+        pairs = [(k, str(v)) for k, v in versions.items()]
+        values_sql = ",".join(["(?, ?)"] * len(pairs))
+        rows = self.conn.execute(
+            f"""
+            WITH wanted(channel, version) AS (VALUES {values_sql})
+            SELECT b.channel, b.type, {"b.blob" if with_blobs else "NULL"} FROM blobs b
+            JOIN wanted w ON b.channel = w.channel AND b.version = w.version
+            WHERE b.thread_id = ? AND b.checkpoint_ns = ?
+            """,
+            [x for pair in pairs for x in pair] + [thread_id, checkpoint_ns],
+        ).fetchall()
+        return {channel: (type_, blob) for channel, type_, blob in rows}
+
+    def get_delta_channel_history(
+        self, *, config: RunnableConfig, channels: Sequence[str]
+    ) -> Mapping[str, DeltaChannelHistory]:
+        """Walk the parent chain once (recursive CTE) collecting writes and seeds per channel."""
+        if not channels:
+            return {}
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        collected_by_ch: dict[str, list[PendingWrite]] = {c: [] for c in channels}
+        seed_by_ch: dict[str, Any] = {}
+        remaining = set(channels)
+
+        with self._lock:
+            checkpoint_id = get_checkpoint_id(config)
+            if checkpoint_id is None:
+                row = self.conn.execute(
+                    "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+                checkpoint_id = row[0] if row else None
+            chain = self._parent_chain(thread_id, checkpoint_ns, checkpoint_id) if checkpoint_id else []
+
+            for cp_id in chain:
+                if not remaining:
+                    break
+                stored = self._stored_blob_types(thread_id, checkpoint_ns, cp_id)
+                terminated_here = {
+                    ch for ch in remaining if ch in stored and stored[ch][0] != "empty"
+                }
+                for task_id, _, ch, w_type, value, _ in reversed(
+                    self._load_writes(thread_id, checkpoint_ns, cp_id)
+                ):
+                    if ch in remaining:
+                        collected_by_ch[ch].append((task_id, ch, self.serde.loads_typed((w_type, value))))
+                for ch in terminated_here:
+                    seed_by_ch[ch] = self.serde.loads_typed(stored[ch])
+                    remaining.discard(ch)
+
+        result: dict[str, DeltaChannelHistory] = {}
+        for ch in channels:
+            entry: DeltaChannelHistory = {"writes": list(reversed(collected_by_ch[ch]))}
+            if ch in seed_by_ch:
+                entry["seed"] = seed_by_ch[ch]
+            result[ch] = entry
+        return result
+
+    # ############### Writes ###############
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store one superstep: changed channel blobs plus the checkpoint row, in one transaction."""
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        blob_rows = []
+        for k, v in new_versions.items():
+            type_, blob = self.serde.dumps_typed(values[k]) if k in values else ("empty", None)
+            blob_rows.append((thread_id, checkpoint_ns, k, str(v), type_, blob))
+        checkpoint_type, checkpoint_b = self.serde.dumps_typed(c)
+        metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),  # parent
+                        checkpoint_type,
+                        checkpoint_b,
+                        metadata_type,
+                        metadata_b,
+                    ),
+                )
+                if self.max_checkpoints_per_thread:
+                    self._maybe_apply_retention(thread_id, checkpoint_ns)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store a task's pending writes in one transaction."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        regular, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, blob = self.serde.dumps_typed(value)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, blob, task_path)
+            # regular writes are never overwritten, special ones (errors, interrupts...) are
+            (regular if write_idx >= 0 else special).append(row)
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", regular)
+                self.conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints, blobs and writes of a thread."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("checkpoints", "blobs", "writes"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    # ############### Retention ###############
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """keep_latest keeps the latest checkpoint (and what it depends on), delete drops the thread."""
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                self.delete_thread(thread_id)
+                continue
+            with self._lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    namespaces = self.conn.execute(
+                        "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                    ).fetchall()
+                    for (checkpoint_ns,) in namespaces:
+                        self._apply_retention(thread_id, checkpoint_ns, 1, max_delta_chain=0)
+                    self.conn.execute("COMMIT")
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+
+    def _maybe_apply_retention(self, thread_id: str, checkpoint_ns: str) -> None:
+        # each put adds one checkpoint, so this runs once every prune_every puts
+        keep = self.max_checkpoints_per_thread
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        if count > keep and (count - keep) % self.prune_every == 0:
+            self._apply_retention(thread_id, checkpoint_ns, keep)
+
+    def _apply_retention(
+        self, thread_id: str, checkpoint_ns: str, keep: int, max_delta_chain: Optional[int] = None
+    ) -> None:
+        """Delete all but the newest `keep` checkpoints (caller holds the lock and a transaction).
+
+        DeltaChannel values of the kept checkpoints are rebuilt from ancestor writes down to
+        the nearest stored value, so those ancestors are kept as well. A channel in
+        delta_reducers whose chain is longer than max_delta_chain gets a snapshot at the
+        oldest kept checkpoint instead.
+        """
+        max_delta_chain = self.max_delta_chain if max_delta_chain is None else max_delta_chain
+        ids = [
+            r[0]
+            for r in self.conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC",
+                (thread_id, checkpoint_ns),
+            ).fetchall()
+        ]
+        if len(ids) <= keep:
+            return
+
+        kept = ids[:keep]
+        oldest_kept = ids[keep - 1]
+        stored = self._stored_blob_types(thread_id, checkpoint_ns, oldest_kept, with_blobs=False)
+        # channels whose value at the oldest kept checkpoint is not stored (delta channels);
+        # LangGraph's own channels (__start__, branch:to:...) are never deltas, just empty
+        pending = {
+            ch for ch, (type_, _) in stored.items()
+            if type_ == "empty" and not ch.startswith(("__", "branch:"))
+        }
+        # ancestors each delta channel needs: back to the one holding its stored value
+        chain = self._parent_chain(thread_id, checkpoint_ns, oldest_kept)
+        depth = dict.fromkeys(pending, len(chain))
+        for distance, cp_id in enumerate(chain, 1):
+            if not pending:
+                break
+            stored = self._stored_blob_types(thread_id, checkpoint_ns, cp_id, with_blobs=False)
+            resolved = {ch for ch in pending if ch in stored and stored[ch][0] != "empty"}
+            for ch in resolved:
+                depth[ch] = distance
+            pending -= resolved
+
+        snapshots = {
+            ch for ch, distance in depth.items()
+            if distance > max_delta_chain and ch in self.delta_reducers and _DeltaSnapshot is not None
+        }
+        if snapshots:
+            self._write_snapshots(thread_id, checkpoint_ns, oldest_kept, snapshots)
+        kept += chain[:max((distance for ch, distance in depth.items() if ch not in snapshots), default=0)]
+
+        kept_ids = set(kept)
+        doomed = [cp_id for cp_id in ids if cp_id not in kept_ids]
+        if not doomed:
+            return
+
+        # a blob can only go stale if a deleted checkpoint used it and no kept one does
+        def versions(cp_ids: List[str]) -> set:
+            return {
+                (channel, str(version))
+                for cp_id in cp_ids
+                for channel, version in self._channel_versions(thread_id, checkpoint_ns, cp_id).items()
+            }
+
+        stale = versions(doomed) - versions(kept)
+        self.conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, checkpoint_ns, cp_id) for cp_id in doomed],
+        )
+        self.conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, checkpoint_ns, cp_id) for cp_id in doomed],
+        )
+        self.conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in stale],
+        )
+
+    def _write_snapshots(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, channels: set) -> None:
+        """Store the rebuilt value of delta channels at checkpoint_id as _DeltaSnapshot blobs."""
+        from langgraph.channels import DeltaChannel
+
+        versions = self._channel_versions(thread_id, checkpoint_ns, checkpoint_id)
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+        history = self.get_delta_channel_history(config=config, channels=sorted(channels))
+
+        rows = []
+        for ch in channels:
+            channel = DeltaChannel(self.delta_reducers[ch])
+            seed = history[ch].get("seed")
+            channel.value = seed.value if isinstance(seed, _DeltaSnapshot) else (seed if seed is not None else channel.typ())
+            channel.replay_writes(history[ch]["writes"])
+            value = channel.value
+            if isinstance(value, Sequence) and not isinstance(value, list):
+                value = list(value)  # e.g. a MessageLog view: store the messages themselves
+            # the blob is shared by later checkpoints at the same version, which hold the same value
+            type_, blob = self.serde.dumps_typed(_DeltaSnapshot(value))
+            rows.append((thread_id, checkpoint_ns, ch, str(versions[ch]), type_, blob))
+        self.conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    # ############### Async API (runs the sync calls off the event loop) ###############
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+    async def aget_delta_channel_history(
+        self, *, config: RunnableConfig, channels: Sequence[str]
+    ) -> Mapping[str, DeltaChannelHistory]:
+        return await asyncio.to_thread(lambda: self.get_delta_channel_history(config=config, channels=channels))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # same sortable "<counter>.<random>" versions as InMemorySaver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+def make_checkpointer():
+    """Build the checkpointer selected by CHECKPOINTER (sqlite by default, or memory)."""
+    if os.getenv("CHECKPOINTER", "sqlite") == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        return InMemorySaver()
+    from message_history import SNAPSHOT_FREQUENCY, append_messages
+
+    return SqliteCheckpointSaver(
+        os.getenv("CHECKPOINT_DB", "checkpoints.db"),
+        max_checkpoints_per_thread=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "50")) or None,
+        prune_every=int(os.getenv("CHECKPOINT_PRUNE_EVERY", str(PRUNE_EVERY))),
+        delta_reducers={"messages": append_messages},
+        max_delta_chain=SNAPSHOT_FREQUENCY,
+    )
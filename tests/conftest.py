@@ -0,0 +1,36 @@
+# The modules live flat at the repository root; tests import them from there and must
+# never reach AWS (LLM calls go to fake_bedrock) or the shared company.db.
+
+import os
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+@pytest.fixture
+def company_db_path(tmp_path):
+    """A fresh mock company database in a temporary directory."""
+    from db_sqllite_mock import create_mock_database
+
+    path = str(tmp_path / "company.db")
+    create_mock_database(path)
+    return path
+
+@pytest.fixture(autouse=True)
+def _offline(monkeypatch):
+    # opt-in caches and logs stay off unless a test turns them on
+    for name in ("LLM_CACHE_PATH", "INSTRUMENTATION_JSONL", "INDEX_ADVISOR_DB"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", os.getenv("AWS_ACCESS_KEY_ID", "testing"))
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", os.getenv("AWS_SECRET_ACCESS_KEY", "testing"))
+
+@pytest.fixture
+def fake():
+    """A zero-latency FakeBedrock that bedrock_client points at for the test."""
+    from fake_bedrock import fake_bedrock
+
+    with fake_bedrock(latency="const:0", token_latency="const:0") as server:
+        yield server
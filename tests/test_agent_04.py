@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import agent_04
+from agent_04 import SubTaskState, build_complex_graph, complex_graph_config, merge_subtasks
+
+NAMES = [f"subtask{i}" for i in range(10)]
+
+class Tracker:
+    """Counts subtasks running at once and records the order they finish in."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.finished = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def finish(self, name: str) -> None:
+        with self._lock:
+            self.running -= 1
+            self.finished.append(name)
+
+def _delay(state: SubTaskState) -> float:
+    return 0.01 * (len(NAMES) - state["index"])  # later subtasks finish first
+
+def _done(state: SubTaskState) -> dict:
+    return {"subtasks": [SubTaskState(subtask_name=state["subtask_name"], index=state["index"], result={"n": state["index"]})]}
+
+@pytest.fixture
+def tracker(monkeypatch):
+    monkeypatch.setattr(agent_04, "SUBTASK_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(agent_04, "plan_node", lambda state: {"subtask_names": NAMES, "messages": []})
+    return Tracker()
+
+def _check(result: dict, tracker: Tracker) -> None:
+    assert [st["subtask_name"] for st in result["subtasks"]] == NAMES
+    assert [st["result"]["n"] for st in result["subtasks"]] == list(range(len(NAMES)))
+    assert result["overall_summary"] == "Summary: " + ", ".join(NAMES)
+    assert tracker.finished != NAMES  # they really finished out of order
+    assert 1 < tracker.peak <= 3
+
+def test_subtasks_are_merged_in_plan_order_and_capped(tracker, monkeypatch):
+    def subtask(state: SubTaskState) -> dict:
+        tracker.start()
+        time.sleep(_delay(state))
+        tracker.finish(state["subtask_name"])
+        return _done(state)
+
+    monkeypatch.setattr(agent_04, "subtask_node", subtask)
+    result = build_complex_graph().invoke({"messages": []}, complex_graph_config())
+    _check(result, tracker)
+
+def test_async_subtasks_are_merged_in_plan_order_and_capped(tracker, monkeypatch):
+    async def subtask(state: SubTaskState) -> dict:
+        tracker.start()
+        await asyncio.sleep(_delay(state))
+        tracker.finish(state["subtask_name"])
+        return _done(state)
+
+    monkeypatch.setattr(agent_04, "subtask_node", subtask)
+    result = asyncio.run(build_complex_graph().ainvoke({"messages": []}, complex_graph_config()))
+    _check(result, tracker)
+
+def test_merge_subtasks_orders_by_index():
+    done = [SubTaskState(subtask_name=name, index=i, result={}) for i, name in enumerate(NAMES[:4])]
+    assert merge_subtasks([done[2]], [done[3], done[0], done[1]]) == done
+    assert merge_subtasks([], []) == []
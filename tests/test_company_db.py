@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from cancellation import Deadline, deadline_scope
+from company_db import PoolExhaustedError, QueryTimeoutError, ReadOnlyConnectionPool, encode_rows
+
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+    "SELECT COUNT(*) FROM n WHERE i < 100000000"
+)
+
+@pytest.fixture
+def pool(company_db_path):
+    pool = ReadOnlyConnectionPool(company_db_path, size=2, pool_wait=0.1)
+    yield pool
+    pool.close()
+
+def test_query_returns_columns_and_rows(pool):
+    columns, rows = pool.query("SELECT name FROM employees WHERE id = ?", (1,))
+    assert columns == ["name"] and rows == [("Alice Johnson",)]
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool._opened == 1
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM employees",
+    "UPDATE employees SET salary = 0",
+    "CREATE TABLE t (x)",
+    "PRAGMA query_only=OFF; DELETE FROM employees",
+])
+def test_writes_are_rejected(pool, sql):
+    with pytest.raises((sqlite3.OperationalError, sqlite3.ProgrammingError)):
+        with pool.connection() as conn:
+            conn.executescript(sql)
+    assert pool.query("SELECT COUNT(*) FROM employees")[1] == [(28,)]
+
+def _hold_all(pool, release: threading.Event) -> list:
+    holding = threading.Barrier(pool.size + 1)
+
+    def hold():
+        with pool.connection():
+            holding.wait(5)
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(pool.size)]
+    for thread in threads:
+        thread.start()
+    holding.wait(5)
+    return threads
+
+def test_exhausted_pool_raises_after_pool_wait(pool):
+    release = threading.Event()
+    threads = _hold_all(pool, release)
+    try:
+        started = time.monotonic()
+        with pytest.raises(PoolExhaustedError, match="2 connections"):
+            pool.query("SELECT 1")
+        assert 0.1 <= time.monotonic() - started < 1
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert pool.query("SELECT 1")[1] == [(1,)]
+
+def test_exhausted_pool_wait_stops_at_the_tool_deadline(company_db_path):
+    pool = ReadOnlyConnectionPool(company_db_path, size=1, pool_wait=30)
+    release = threading.Event()
+    threads = _hold_all(pool, release)
+    try:
+        started = time.monotonic()
+        with deadline_scope(Deadline(0.1)), pytest.raises(PoolExhaustedError):
+            pool.query("SELECT 1")
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+        pool.close()
+
+def test_a_waiting_caller_gets_the_released_connection(pool):
+    release = threading.Event()
+    threads = _hold_all(pool, release)
+    threading.Timer(0.02, release.set).start()
+    try:
+        assert pool.query("SELECT 1")[1] == [(1,)]
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+def test_runaway_query_is_interrupted(pool):
+    started = time.monotonic()
+    with pytest.raises(QueryTimeoutError):
+        pool.query(SLOW_QUERY, timeout=0.1)
+    assert time.monotonic() - started < 1
+    assert pool.query("SELECT 1")[1] == [(1,)]  # the connection is usable again
+
+def test_tool_deadline_interrupts_the_query(pool):
+    with deadline_scope(Deadline(0.1)), pytest.raises(QueryTimeoutError):
+        pool.query(SLOW_QUERY, timeout=0)
+
+EMPLOYEES = "SELECT id, name, department, salary FROM employees ORDER BY id"
+
+def test_query_json_under_budget_is_complete(pool):
+    result = json.loads(pool.query_json(EMPLOYEES, max_rows=100, max_bytes=1 << 20, columnar=False))
+    assert (result["count"], result["returned"], result["truncated"]) == (28, 28, False)
+    assert "note" not in result and "count_is_lower_bound" not in result
+    assert list(result["results"][0]) == ["id", "name", "department", "salary"]
+    assert result["results"][0]["name"] == "Alice Johnson"
+
+def test_query_json_truncates_at_max_rows(pool):
+    result = json.loads(pool.query_json(EMPLOYEES, max_rows=5, max_bytes=1 << 20, columnar=False))
+    assert (result["count"], result["returned"], result["truncated"]) == (28, 5, True)
+    assert [row["id"] for row in result["results"]] == [1, 2, 3, 4, 5]
+    assert result["note"].startswith("showing the first 5 of 28 rows;")
+
+def test_query_json_truncates_at_max_bytes(pool):
+    full = json.loads(pool.query_json(EMPLOYEES, max_rows=100, max_bytes=1 << 20, columnar=False))["results"]
+    result = json.loads(pool.query_json(EMPLOYEES, max_rows=100, max_bytes=300, columnar=False))
+    returned = result["returned"]
+    assert 0 < returned < 28 and result["truncated"]
+    assert result["results"] == full[:returned]
+    encoded = [json.dumps(row, separators=(",", ":")) for row in result["results"]]
+    assert sum(len(text) + 1 for text in encoded) <= 300
+    assert sum(len(text) + 1 for text in encoded) + len(json.dumps(full[returned], separators=(",", ":"))) + 1 > 300
+    assert f"first {returned} of 28 rows" in result["note"]
+
+def test_query_json_columnar_has_the_same_rows(pool):
+    rows = json.loads(pool.query_json(EMPLOYEES, max_rows=5, max_bytes=1 << 20, columnar=False))
+    columnar = json.loads(pool.query_json(EMPLOYEES, max_rows=5, max_bytes=1 << 20, columnar=True))
+    assert columnar["columns"] == ["id", "name", "department", "salary"]
+    assert [dict(zip(columnar["columns"], row)) for row in columnar["rows"]] == rows["results"]
+    assert columnar["truncated"] and columnar["note"] == rows["note"]
+
+def test_query_json_stops_counting_at_the_count_limit(pool, monkeypatch):
+    monkeypatch.setenv("QUERY_COUNT_LIMIT", "10")
+    result = json.loads(pool.query_json(EMPLOYEES, max_rows=2, max_bytes=1 << 20, columnar=False))
+    assert (result["count"], result["returned"], result["count_is_lower_bound"]) == (10, 2, True)
+    assert "first 2 of 10+ rows" in result["note"]
+
+def test_encode_rows_only_counts_rows_past_the_budget():
+    consumed = []
+
+    def rows():
+        for i in range(1000):
+            consumed.append(i)
+            yield (i, "x" * 10)
+
+    encoded, count = encode_rows(rows(), ["i", "s"], max_rows=3, max_bytes=1 << 20, count_limit=50)
+    assert [json.loads(text)["i"] for text in encoded] == [0, 1, 2]
+    assert count == 50 and len(consumed) == 50
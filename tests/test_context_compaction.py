@@ -0,0 +1,70 @@
+from typing import TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.graph import END, START, StateGraph
+
+from context_compaction import (
+    SUMMARY_ID,
+    SUMMARY_PREFIX,
+    CompactionConfig,
+    extractive_summarizer,
+    make_compaction_node,
+)
+from message_history import MessageHistory
+
+CONFIG = CompactionConfig(keep_last=2, max_tokens=100, summary_max_tokens=120, unit="chars")
+
+class LoopState(TypedDict):
+    messages: MessageHistory
+
+def _loop(config: CompactionConfig, passes: int, summarizer=None) -> list:
+    """Append one long AIMessage per pass, compacting before each one."""
+    graph = StateGraph(LoopState)
+    graph.add_node("compact", make_compaction_node(config, summarizer))
+    graph.add_node("work", lambda state: {"messages": [AIMessage(f"attempt {len(state['messages'])} " + "x" * 60)]})
+    graph.add_edge(START, "compact")
+    graph.add_edge("compact", "work")
+    graph.add_edge("work", END)
+    app = graph.compile()
+    messages = [HumanMessage("task")]
+    for _ in range(passes):
+        messages = list(app.invoke({"messages": messages})["messages"])
+    return messages
+
+def test_under_budget_history_is_left_alone():
+    node = make_compaction_node(CONFIG)
+    assert node({"messages": [HumanMessage("a"), AIMessage("b"), HumanMessage("c")]}) == {}
+
+def test_old_messages_are_folded_into_one_summary():
+    messages = _loop(CONFIG, 6)
+    assert messages[0].id == SUMMARY_ID
+    assert isinstance(messages[0], SystemMessage)
+    assert sum(m.id == SUMMARY_ID for m in messages) == 1
+    # summary + keep_last + the message appended after compacting
+    assert len(messages) == CONFIG.keep_last + 2
+    assert messages[0].content.startswith(SUMMARY_PREFIX + "- ")
+
+def test_summary_and_state_stay_bounded():
+    messages = _loop(CONFIG, 40)
+    summary = messages[0].content[len(SUMMARY_PREFIX):]
+    assert len(summary) <= CONFIG.summary_chars()
+    assert len(messages) == CONFIG.keep_last + 2
+    # the oldest excerpts are dropped first
+    assert "task" not in summary
+
+def test_summarizer_sees_the_previous_summary_and_only_new_messages():
+    seen = []
+
+    def summarizer(previous, messages, max_chars):
+        seen.append((previous, [m.content[:9] for m in messages]))
+        return f"summary {len(seen)}"
+
+    _loop(CONFIG, 4, summarizer)
+    assert [previous for previous, _ in seen] == [""] + [f"summary {i}" for i in range(1, len(seen))]
+    folded = [content for _, batch in seen for content in batch]
+    assert len(folded) == len(set(folded))
+
+def test_extractive_summarizer_clips_long_messages():
+    summary = extractive_summarizer("", [HumanMessage("word " * 200)], 10_000)
+    assert summary.startswith("- human: word")
+    assert summary.endswith("...")
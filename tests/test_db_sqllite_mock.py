@@ -0,0 +1,57 @@
+import pathlib
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from db_sqllite_mock import create_mock_database, create_synthetic_database
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+def _rows(path) -> list:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT * FROM employees ORDER BY id").fetchall()
+
+def _journal_mode(path) -> str:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+def test_same_seed_gives_the_same_rows(tmp_path):
+    first, second, other = (str(tmp_path / name) for name in ("a.db", "b.db", "c.db"))
+    assert create_synthetic_database(500, seed=7, path=first) == 500
+    create_synthetic_database(500, seed=7, path=second, chunk_size=64)
+    create_synthetic_database(500, seed=8, path=other)
+    assert _rows(first) == _rows(second)
+    assert _rows(first) != _rows(other)
+    assert [row[0] for row in _rows(first)] == list(range(1, 501))
+
+def test_database_is_left_in_wal_mode(tmp_path):
+    path = str(tmp_path / "company.db")
+    create_synthetic_database(100, path=path)
+    assert _journal_mode(path) == "wal"
+
+def test_load_works_while_a_reader_has_the_file_open(tmp_path):
+    path = str(tmp_path / "company.db")
+    create_mock_database(path)
+    reader = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        reader.execute("SELECT COUNT(*) FROM employees").fetchone()
+        assert create_synthetic_database(1000, path=path, chunk_size=100) == 1000
+        assert reader.execute("SELECT COUNT(*) FROM employees").fetchone() == (1000,)
+    finally:
+        reader.close()
+    assert _journal_mode(path) == "wal"
+
+@pytest.mark.parametrize("args, expected", [(["--rows", "250", "--seed", "3"], 250), ([], 28)])
+def test_cli(tmp_path, args, expected):
+    path = str(tmp_path / "company.db")
+    result = subprocess.run(
+        [sys.executable, "db_sqllite_mock.py", "--db", path, *args],
+        cwd=ROOT, capture_output=True, text=True, timeout=60, check=True,
+    )
+    assert len(_rows(path)) == expected
+    assert (f"Generated {expected} employees" if args else "Mock database created") in result.stdout
+    if args:
+        create_synthetic_database(250, seed=3, path=str(tmp_path / "same.db"))
+        assert _rows(path) == _rows(tmp_path / "same.db")
@@ -0,0 +1,89 @@
+import json
+import random
+
+import pytest
+from botocore.exceptions import ClientError
+
+from bedrock_client import DEFAULT_MODEL_ID, get_bedrock_client, get_chat_model
+from fake_bedrock import FakeBedrock, Latency, fake_bedrock
+
+TOOLS = {"tools": [{"toolSpec": {
+    "name": "query_database",
+    "description": "Run SQL.",
+    "inputSchema": {"json": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}},
+}}]}
+
+def _user(text: str) -> list:
+    return [{"role": "user", "content": [{"text": text}]}]
+
+def _text(response: dict) -> str:
+    return "".join(block.get("text", "") for block in response["output"]["message"]["content"])
+
+def test_converse_echoes_the_prompt(fake):
+    response = get_bedrock_client().converse(modelId=DEFAULT_MODEL_ID, messages=_user("ping"))
+    assert _text(response) == "This is a fake response to: ping"
+    assert response["stopReason"] == "end_turn"
+    assert response["usage"]["inputTokens"] > 0 and "latencyMs" in response["metrics"]
+
+def test_stream_reassembles_to_the_same_response(fake):
+    client = get_bedrock_client()
+    expected = client.converse(modelId=DEFAULT_MODEL_ID, messages=_user("stream me please"))
+    events = list(client.converse_stream(modelId=DEFAULT_MODEL_ID, messages=_user("stream me please"))["stream"])
+    deltas = [event["contentBlockDelta"]["delta"]["text"] for event in events if "contentBlockDelta" in event]
+    assert len(deltas) > 1
+    assert "".join(deltas) == _text(expected)
+    assert events[-1]["metadata"]["usage"] == expected["usage"]
+    assert fake.stats()["streamed"] == 1
+
+def test_generic_responder_calls_the_tool_then_answers(fake):
+    client = get_bedrock_client()
+    messages = _user("what is the average salary?")
+    first = client.converse(modelId=DEFAULT_MODEL_ID, messages=messages, toolConfig=TOOLS)
+    assert first["stopReason"] == "tool_use"
+    tool_use = first["output"]["message"]["content"][0]["toolUse"]
+    assert tool_use["name"] == "query_database" and isinstance(tool_use["input"]["query"], str)
+    messages += [first["output"]["message"], {"role": "user", "content": [{"toolResult": {
+        "toolUseId": tool_use["toolUseId"], "content": [{"text": "82000"}]}}]}]
+    second = client.converse(modelId=DEFAULT_MODEL_ID, messages=messages, toolConfig=TOOLS)
+    assert _text(second) == "Here is the result: 82000"
+
+def test_script_rules_match_on_text_and_turn(tmp_path):
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps([
+        {"match": "salary", "turn": 0, "tool_use": {"name": "query_database", "input": {"query": "SELECT 1"}}},
+        {"match": "", "text": "scripted answer"},
+    ]))
+    with fake_bedrock(latency="const:0", token_latency="const:0", script=str(script)) as server:
+        client = get_bedrock_client()
+        first = client.converse(modelId=DEFAULT_MODEL_ID, messages=_user("salary?"), toolConfig=TOOLS)
+        assert first["output"]["message"]["content"][0]["toolUse"]["input"] == {"query": "SELECT 1"}
+        assert _text(client.converse(modelId=DEFAULT_MODEL_ID, messages=_user("hello"))) == "scripted answer"
+        assert server.stats()["scripted"] == 2
+
+def test_recordings_are_replayed(tmp_path):
+    recordings = tmp_path / "recordings.jsonl"
+    body = {"messages": _user("recorded?")}
+    response = {"output": {"message": {"role": "assistant", "content": [{"text": "from the recording"}]}},
+                "stopReason": "end_turn", "usage": {"inputTokens": 3, "outputTokens": 4, "totalTokens": 7}}
+    key = FakeBedrock.request_key(DEFAULT_MODEL_ID, body)
+    recordings.write_text(json.dumps({"key": key, "model_id": DEFAULT_MODEL_ID, "response": response}) + "\n")
+    with fake_bedrock(latency="const:0", token_latency="const:0", recordings=str(recordings)) as server:
+        assert _text(get_bedrock_client().converse(modelId=DEFAULT_MODEL_ID, **body)) == "from the recording"
+        assert server.stats()["replayed"] == 1
+
+def test_throttled_requests_raise_throttling_exception(monkeypatch):
+    monkeypatch.setenv("BEDROCK_MAX_ATTEMPTS", "1")
+    with fake_bedrock(latency="const:0", token_latency="const:0", throttle_rate=1.0) as server:
+        with pytest.raises(ClientError) as raised:
+            get_bedrock_client().converse(modelId=DEFAULT_MODEL_ID, messages=_user("hi"))
+        assert raised.value.response["Error"]["Code"] == "ThrottlingException"
+        assert server.stats()["throttled"] == 1
+
+def test_latency_draws_are_reproducible():
+    latency = Latency("lognormal:300,0.5")
+    draws = lambda seed: [latency.sample(rng) for rng in [random.Random(seed)] for _ in range(3)]
+    assert draws("0:key:0") == draws("0:key:0") != draws("0:key:1")
+    assert Latency("const:50").sample(random.Random(1)) == pytest.approx(0.05)
+
+def test_chat_model_talks_to_the_fake(fake):
+    assert get_chat_model().invoke("hello").content == "This is a fake response to: hello"
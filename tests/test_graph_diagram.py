@@ -0,0 +1,74 @@
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+import graph_diagram
+from graph_diagram import diagram_format, render_diagram, topology_hash
+
+class _State(TypedDict):
+    value: int
+
+def _app(*edges, conditional=False):
+    graph = StateGraph(_State)
+    for name in ("a", "b", "c"):
+        graph.add_node(name, lambda state: {})
+    graph.add_edge(START, "a")
+    for source, target in edges:
+        if conditional:
+            graph.add_conditional_edges(source, lambda state, target=target: target, [target])
+        else:
+            graph.add_edge(source, target)
+    graph.add_edge("c", END)
+    return graph.compile()
+
+@pytest.fixture
+def renders(monkeypatch, tmp_path):
+    """Fresh memory and disk caches; returns the formats actually rendered."""
+    calls = []
+    render = graph_diagram._render
+
+    def counting(app, fmt):
+        calls.append(fmt)
+        return render(app, fmt)
+
+    monkeypatch.setattr(graph_diagram, "_memory_cache", {})
+    monkeypatch.setattr(graph_diagram, "_render", counting)
+    monkeypatch.setenv("DIAGRAM_CACHE_DIR", str(tmp_path / "cache"))
+    return calls
+
+def test_unchanged_graph_hits_memory_then_disk(renders, tmp_path, monkeypatch):
+    first = render_diagram(_app(("a", "b"), ("b", "c")), "mermaid")
+    # a graph rebuilt with the same topology is a hit
+    assert render_diagram(_app(("a", "b"), ("b", "c")), "mermaid") == first
+    assert renders == ["mermaid"]
+
+    monkeypatch.setattr(graph_diagram, "_memory_cache", {})  # a new process
+    assert render_diagram(_app(("a", "b"), ("b", "c")), "mermaid") == first
+    assert renders == ["mermaid"]
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == [f"{topology_hash(_app(('a', 'b'), ('b', 'c')))}.mmd"]
+
+def test_changed_edge_misses(renders, tmp_path):
+    render_diagram(_app(("a", "b"), ("b", "c")), "mermaid")
+    changed = render_diagram(_app(("a", "c"), ("b", "c")), "mermaid")
+    conditional = render_diagram(_app(("a", "b"), ("b", "c"), conditional=True), "mermaid")
+    assert renders == ["mermaid"] * 3
+    assert "a --> c" in changed and "-.->" in conditional
+    assert len(list((tmp_path / "cache").iterdir())) == 3
+
+def test_formats_are_cached_separately(renders):
+    app = _app(("a", "b"), ("b", "c"))
+    assert "graph" in render_diagram(app, "mermaid")
+    assert "__start__" in render_diagram(app, "ascii")
+    render_diagram(app, "ascii")
+    assert renders == ["mermaid", "ascii"]
+
+def test_unknown_format_is_rejected(renders):
+    with pytest.raises(ValueError, match="unknown diagram format"):
+        render_diagram(_app(("a", "b"), ("b", "c")), "svg")
+    assert renders == []
+
+def test_diagram_format_from_argv():
+    assert diagram_format([]) is None
+    assert diagram_format(["--diagram"]) == "ascii"
+    assert diagram_format(["x", "--diagram=mermaid"]) == "mermaid"
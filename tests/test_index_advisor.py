@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from company_db import ReadOnlyConnectionPool
+from index_advisor import IndexAdvisor, table_aliases
+
+@pytest.fixture
+def advisor(company_db_path, tmp_path):
+    return IndexAdvisor(ReadOnlyConnectionPool(company_db_path), workload_path=str(tmp_path / "workload.db"))
+
+def test_table_aliases():
+    assert table_aliases("select e.name from employees e join employees as m on e.id = m.id") == {
+        "e": "employees", "m": "employees",
+    }
+    assert table_aliases("select name from employees where salary > 1") == {}
+
+def test_full_scan_through_alias_is_attributed_to_the_table(advisor):
+    advisor.observe("SELECT e.name FROM employees e WHERE e.department = 'HR'")
+    assert advisor.report()["full_scans_per_table"] == {"employees": 1}
+    assert advisor.recommend()[0]["columns"][0] == "department"
+
+def test_prefix_candidates_are_merged_into_the_longer_one(advisor):
+    advisor.observe("SELECT department, AVG(salary) FROM employees GROUP BY department, salary")
+    advisor.observe("SELECT name FROM employees WHERE department = 'HR' AND salary > 10")
+    recommendations = advisor.recommend()
+    columns = [tuple(r["columns"]) for r in recommendations]
+    for short in columns:
+        assert not any(long != short and long[: len(short)] == short for long in columns)
+    assert sum(r["queries"] for r in recommendations) == 2
+
+def test_candidates_covered_by_an_existing_index_are_skipped(advisor, company_db_path):
+    advisor.observe("SELECT name FROM employees WHERE department = 'HR'")
+    conn = sqlite3.connect(company_db_path)
+    conn.execute("CREATE INDEX idx_department ON employees (department, name)")
+    conn.commit()
+    conn.close()
+    assert advisor.recommend() == []
+
+def test_counts_are_batched_until_flush(advisor):
+    for _ in range(3):
+        advisor.observe("SELECT name FROM employees WHERE department = 'HR'")
+    assert advisor._conn.execute("SELECT COUNT(*) FROM workload").fetchone()[0] == 0
+    advisor.flush()
+    assert advisor._conn.execute("SELECT count FROM workload").fetchone()[0] == 3
+
+def test_cache_hits_are_not_observed(company_db_path):
+    from query_cache import QueryResultCache
+
+    cache = QueryResultCache(ReadOnlyConnectionPool(company_db_path))
+    executed = []
+    for _ in range(3):
+        cache.query_json("SELECT COUNT(*) FROM employees", on_execute=lambda sql, params: executed.append(sql))
+    assert len(executed) == 1
+
+def test_advisor_is_opt_in(monkeypatch):
+    from index_advisor import get_index_advisor
+
+    monkeypatch.delenv("INDEX_ADVISOR_DB", raising=False)
+    assert get_index_advisor() is None
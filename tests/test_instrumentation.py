@@ -0,0 +1,130 @@
+import json
+from typing import TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+from langgraph.types import RetryPolicy
+
+import instrumentation
+from bedrock_client import DEFAULT_MODEL_ID, get_bedrock_client, get_chat_model
+from instrumentation import GraphInstrumentation, Histogram, get_instrumentation, record_converse
+
+@tool
+def double(x: int) -> int:
+    """Double a number."""
+    return 2 * x
+
+def _graph():
+    flaky_calls = []
+
+    def ask(state: MessagesState) -> dict:
+        return {"messages": [get_chat_model().invoke(state["messages"])]}
+
+    def call_tool(state: MessagesState) -> dict:
+        return {"messages": [AIMessage("", tool_calls=[{"name": "double", "args": {"x": 2}, "id": "c1"}])]}
+
+    def flaky(state: MessagesState) -> dict:
+        flaky_calls.append(1)
+        if len(flaky_calls) == 1:
+            raise ValueError("first run fails")
+        return {}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("ask", ask)
+    graph.add_node("call_tool", call_tool)
+    graph.add_node("tools", ToolNode([double]))
+    graph.add_node("flaky", flaky, retry_policy=RetryPolicy(initial_interval=0.001, jitter=False, retry_on=ValueError))
+    graph.add_edge(START, "ask")
+    graph.add_edge("ask", "call_tool")
+    graph.add_edge("call_tool", "tools")
+    graph.add_edge("tools", "flaky")
+    graph.add_edge("flaky", END)
+    return graph.compile()
+
+@pytest.fixture
+def run(fake):
+    handler = GraphInstrumentation()
+    _graph().invoke(
+        {"messages": [HumanMessage("hello")]},
+        {"callbacks": [handler], "configurable": {"thread_id": "t1"}},
+    )
+    return handler
+
+def test_llm_calls_and_tokens_are_attributed_to_their_node(run):
+    ask = run.node_summary()["ask"]
+    assert ask["runs"] == 1 and ask["llm_calls"] == 1
+    assert ask["input_tokens"] > 0 and ask["output_tokens"] > 0
+    assert ask["llm_latency_seconds"] >= 0 and ask["wall_p95"] >= ask["wall_p50"] > 0
+    assert "llm_calls" not in run.node_summary()["call_tool"]
+
+def test_tool_calls_are_attributed_to_the_tool_node(run):
+    tools = run.node_summary()["tools"]
+    assert tools["tool_calls"] == 1 and tools["tool_errors"] == 0
+
+def test_retries_and_errors_are_counted(run):
+    flaky = run.node_summary()["flaky"]
+    assert flaky["runs"] == 2 and flaky["errors"] == 1 and flaky["retries"] == 1
+
+def test_thread_summary_matches_a_single_run(run):
+    assert run.thread_summary("t1")["ask"]["llm_calls"] == 1
+    assert run.thread_summary("unknown") == {}
+
+def test_prometheus_text(run):
+    text = run.prometheus_text()
+    assert '# TYPE langgraph_node_runs_total counter' in text
+    assert 'langgraph_node_retries_total{node="flaky"} 1' in text
+    assert f'langgraph_llm_tokens_total{{node="ask",model="{DEFAULT_MODEL_ID}",type="input"}}' in text
+    assert 'langgraph_node_duration_seconds_bucket{node="ask",le="+Inf"} 1' in text
+    assert "thread" not in text
+    openmetrics = run.prometheus_text(openmetrics=True)
+    assert "# TYPE langgraph_node_runs counter" in openmetrics and openmetrics.endswith("# EOF\n")
+
+def test_cache_hit_rate_from_converse_usage():
+    handler = GraphInstrumentation()
+    usage = {"inputTokens": 100, "outputTokens": 5, "cacheReadInputTokens": 300, "cacheWriteInputTokens": 0}
+    handler.record_llm("agent", "t", "m", 0.1, 0.05, usage)
+    summary = handler.node_summary()["agent"]
+    assert summary["input_tokens"] == 400 and summary["cache_read_tokens"] == 300
+    assert summary["cache_hit_rate"] == 0.75
+
+def test_thread_totals_are_bounded():
+    handler = GraphInstrumentation(max_threads=2)
+    for thread_id in ("a", "b", "c"):
+        handler.record_llm("n", thread_id, "m", 0.1, None, None)
+    assert handler.thread_summary("a") == {}
+    assert handler.thread_summary("c")["n"]["llm_calls"] == 1
+    assert handler.node_summary()["n"]["llm_calls"] == 3
+
+def test_record_converse_inside_a_node(fake, monkeypatch, tmp_path):
+    log = tmp_path / "events.jsonl"
+    monkeypatch.setattr(instrumentation, "_instrumentation", GraphInstrumentation(jsonl_path=str(log)))
+
+    class State(TypedDict):
+        text: str
+
+    def converse(state: State) -> dict:
+        response = get_bedrock_client().converse(
+            modelId=DEFAULT_MODEL_ID, messages=[{"role": "user", "content": [{"text": state["text"]}]}],
+        )
+        record_converse(response, 0.01, DEFAULT_MODEL_ID)
+        return {"text": response["output"]["message"]["content"][0]["text"]}
+
+    graph = StateGraph(State)
+    graph.add_node("converse", converse)
+    graph.add_edge(START, "converse")
+    graph.add_edge("converse", END)
+    graph.compile().invoke({"text": "hi"}, {"configurable": {"thread_id": "raw"}})
+
+    assert get_instrumentation().thread_summary("raw")["converse"]["llm_calls"] == 1
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert events[0]["event"] == "llm" and events[0]["node"] == "converse"
+
+def test_histogram_quantiles_interpolate_within_a_bucket():
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == pytest.approx(4)
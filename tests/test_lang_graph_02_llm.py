@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+import lang_graph_02_llm
+from fake_bedrock import fake_bedrock
+from lang_graph_02_llm import ask_llm_async, ask_llm_stream, ask_llm_stream_async, set_llm_concurrency
+
+def _throttled() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "ConverseStream")
+
+@pytest.fixture
+def slow_stream():
+    """A FakeBedrock streaming 12-char chunks every 40ms."""
+    with fake_bedrock(latency="const:0", token_latency="const:40") as server:
+        yield server
+
+def test_stream_timeout_stops_deltas_and_closes_the_stream(slow_stream, monkeypatch):
+    results = []
+    converse_stream = lang_graph_02_llm.converse_stream
+
+    def recording(*args):
+        results.append(converse_stream(*args))
+        return results[-1]
+
+    monkeypatch.setattr(lang_graph_02_llm, "converse_stream", recording)
+
+    async def run():
+        deltas = []
+        text, stats = await ask_llm_stream_async("tell me a long story " * 20, deltas.append, timeout=0.5)
+        delivered = len(deltas)
+        await asyncio.sleep(0.5)
+        return text, delivered, deltas
+
+    text, delivered, deltas = asyncio.run(run())
+    assert text == "Error from LLM"
+    assert 0 < delivered == len(deltas)  # nothing arrives after the timeout
+    # the worker stopped reading instead of streaming the whole answer
+    assert results and results[0][1]["cancelled"]
+    assert "".join(deltas) == results[0][0][:len("".join(deltas))]
+
+def test_stream_errors_before_the_first_delta_are_retried(monkeypatch):
+    def converse_stream(user_message, on_delta, cancelled=None):
+        raise _throttled()
+
+    monkeypatch.setattr(lang_graph_02_llm, "converse_stream", converse_stream)
+    with pytest.raises(ClientError):
+        ask_llm_stream("hi", print)
+    with pytest.raises(ClientError):
+        asyncio.run(ask_llm_stream_async("hi", print))
+
+def test_stream_errors_after_a_delta_are_not_retried(monkeypatch):
+    def converse_stream(user_message, on_delta, cancelled=None):
+        on_delta("partial")
+        raise _throttled()
+
+    monkeypatch.setattr(lang_graph_02_llm, "converse_stream", converse_stream)
+    deltas = []
+    assert ask_llm_stream("hi", deltas.append) == ("Error from LLM", {})
+    assert asyncio.run(ask_llm_stream_async("hi", deltas.append)) == ("Error from LLM", {})
+    assert deltas == ["partial", "partial"]
+
+@pytest.fixture
+def one_slot():
+    limit = lang_graph_02_llm.LLM_MAX_CONCURRENCY
+    set_llm_concurrency(1)
+    yield
+    set_llm_concurrency(limit)
+
+def test_timed_out_call_keeps_its_slot_until_the_thread_returns(one_slot, monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def converse(user_message):
+        started.append((user_message, time.monotonic()))
+        if user_message == "hung":
+            release.wait(5)
+        return f"answer to {user_message}"
+
+    monkeypatch.setattr(lang_graph_02_llm, "converse", converse)
+
+    async def run():
+        begin = time.monotonic()
+        threading.Timer(0.3, release.set).start()
+        results = await asyncio.gather(ask_llm_async("hung", timeout=0.1), ask_llm_async("next", timeout=0.1))
+        return begin, results
+
+    begin, results = asyncio.run(run())
+    # "next" waits for the hung thread, then gets its full timeout once it starts
+    assert results == ["Error from LLM", "answer to next"]
+    assert [name for name, _ in started] == ["hung", "next"]
+    assert started[1][1] - begin >= 0.3
@@ -0,0 +1,85 @@
+import gc
+import time
+import weakref
+
+import pytest
+
+import llm_cache
+from bedrock_client import get_chat_model
+from llm_cache import LLMResponseCache
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.db")
+
+def test_key_covers_model_messages_config_and_tools():
+    messages = [{"role": "user", "content": [{"text": "hi"}]}]
+    key = LLMResponseCache.make_key("m", messages, {"temperature": 0})
+    assert key == LLMResponseCache.make_key("m", messages, {"temperature": 0})
+    assert key != LLMResponseCache.make_key("other", messages, {"temperature": 0})
+    assert key != LLMResponseCache.make_key("m", messages, {"temperature": 1})
+    assert key != LLMResponseCache.make_key("m", messages, {"temperature": 0}, tools=[{"name": "t"}])
+
+def test_disk_tier_survives_a_restart(cache_path):
+    LLMResponseCache(cache_path).put("k", {"text": "answer"})
+    reopened = LLMResponseCache(cache_path)
+    assert reopened.get("k") == {"text": "answer"}
+    assert reopened.get("k") == {"text": "answer"}
+    assert reopened.get("missing") is None
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_expired_entries_are_misses(cache_path):
+    cache = LLMResponseCache(cache_path, ttl=0.05)
+    cache.put("k", "v")
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert LLMResponseCache(cache_path).get("k") is None
+
+def test_tiers_evict_least_recently_used(cache_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "EVICT_EVERY", 1)
+    cache = LLMResponseCache(cache_path, memory_size=2, disk_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    time.sleep(0.01)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache._memory.clear()
+    assert cache.get("a") == 1  # a disk hit refreshes accessed_at
+    cache.put("c", 3)
+    assert cache.stats()["memory_entries"] == 2 and cache.stats()["disk_entries"] == 2
+    cache._memory.clear()
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+def test_chat_model_is_served_from_the_cache(fake, cache_path):
+    cache = LLMResponseCache(cache_path)
+    first = get_chat_model(cache=cache).invoke("hello")
+    second = get_chat_model(cache=cache).invoke("hello")
+    assert second.content == first.content
+    assert fake.stats()["requests"] == 1
+    # a new process reads the answer back from disk
+    assert get_chat_model(cache=LLMResponseCache(cache_path)).invoke("hello").content == first.content
+    assert fake.stats()["requests"] == 1
+    get_chat_model(cache=cache).invoke("something else")
+    assert fake.stats()["requests"] == 2
+
+def test_converse_uses_the_cache_from_the_environment(fake, cache_path, monkeypatch):
+    from lang_graph_02_llm import converse, converse_stream
+
+    monkeypatch.setenv("LLM_CACHE_PATH", cache_path)
+    monkeypatch.setattr(llm_cache, "_default_cache", None)
+    answer = converse("cache me")
+    assert converse("cache me") == answer
+    deltas = []
+    text, stats = converse_stream("cache me", deltas.append)
+    assert text == answer and deltas == [answer] and stats["cache_hit"]
+    assert fake.stats()["requests"] == 1
+
+def test_chat_models_do_not_keep_a_callers_cache_alive(fake, cache_path):
+    cache = LLMResponseCache(cache_path)
+    get_chat_model(cache=cache).invoke("hello")
+    assert get_chat_model() is get_chat_model()  # the default model is still shared
+    ref = weakref.ref(cache)
+    del cache
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,73 @@
+import operator
+from typing import Annotated, Sequence, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from message_history import SNAPSHOT_FREQUENCY, MessageHistory, MessageLog, append_messages
+
+def test_appending_to_the_newest_view_shares_the_buffer():
+    first = MessageLog([1, 2])
+    second = first.append_all([3])
+    third = second + [4, 5]
+    assert third.items is first.items
+    assert list(first) == [1, 2]
+    assert list(second) == [1, 2, 3]
+    assert third == [1, 2, 3, 4, 5]
+
+def test_appending_to_an_older_view_forks_the_buffer():
+    base = MessageLog([1])
+    left = base.append_all([2])
+    right = base.append_all(["b"])
+    assert right.items is not left.items
+    assert (list(left), list(right), list(base)) == ([1, 2], [1, "b"], [1])
+
+def test_indexing_and_slicing_stay_within_the_view():
+    log = MessageLog([1, 2, 3]).append_all([4])
+    view = MessageLog(log.items, 2)
+    assert view[-1] == 2
+    assert view[:] == [1, 2]
+    with pytest.raises(IndexError):
+        view[2]
+
+def test_reducer_matches_operator_add_per_write():
+    writes = [[HumanMessage("a", id="1")], AIMessage("b", id="2"), [HumanMessage("c", id="3")]]
+    expected = []
+    for write in writes:
+        expected = operator.add(expected, write if isinstance(write, list) else [write])
+    assert append_messages([], writes) == expected
+    assert append_messages(append_messages([], writes[:1]), writes[1:]) == expected
+
+def test_remove_message_drops_one_or_all():
+    log = append_messages([], [[HumanMessage("a", id="1"), AIMessage("b", id="2")]])
+    assert [m.id for m in append_messages(log, [RemoveMessage(id="1")])] == ["2"]
+    cleared = append_messages(log, [[RemoveMessage(id=REMOVE_ALL_MESSAGES), HumanMessage("s", id="s")]])
+    assert [m.id for m in cleared] == ["s"]
+
+class DeltaState(TypedDict):
+    messages: MessageHistory
+
+class AddState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], operator.add]
+
+def _echo(state) -> dict:
+    return {"messages": [AIMessage(f"echo {len(state['messages'])}")]}
+
+def _run(state_type, turns: int) -> list:
+    graph = StateGraph(state_type)
+    graph.add_node("echo", _echo)
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    app = graph.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t"}}
+    for turn in range(turns):
+        app.invoke({"messages": [HumanMessage(f"turn {turn}", id=f"h{turn}")]}, config)
+    return [m.content for m in app.get_state(config).values["messages"]]
+
+def test_checkpointed_history_matches_operator_add():
+    # past a snapshot, so both the snapshot and the replayed deltas are exercised
+    turns = SNAPSHOT_FREQUENCY // 2 + 3
+    assert _run(DeltaState, turns) == _run(AddState, turns)
@@ -0,0 +1,73 @@
+import pytest
+from langchain_core.tools import tool
+
+from prompt_cache import cached_system_prompt
+
+NOVA = "amazon.nova-pro-v1:0"
+CLAUDE = "anthropic.claude-3-5-haiku-20241022-v1:0"
+LONG = "Answer from the tool results only. " * 200  # ~1.7K tokens
+SHORT = "Answer from the tool results only."
+
+@tool
+def lookup(name: str) -> str:
+    """Look a name up."""
+    return name
+
+def test_short_prefix_gets_no_checkpoint():
+    assert cached_system_prompt(SHORT, [lookup], NOVA).content == SHORT
+    assert cached_system_prompt(SHORT, [lookup], CLAUDE).content == SHORT
+
+def test_long_prefix_gets_a_checkpoint_in_the_model_format():
+    assert cached_system_prompt(LONG, model_id=NOVA).content[-1] == {"cachePoint": {"type": "default"}}
+    assert cached_system_prompt(LONG, model_id=CLAUDE).content[-1]["cache_control"] == {"type": "ephemeral"}
+
+def test_unsupported_model_and_opt_out(monkeypatch):
+    assert cached_system_prompt(LONG, model_id="meta.llama3-70b-instruct-v1:0").content == LONG
+    monkeypatch.setenv("PROMPT_CACHE", "off")
+    assert cached_system_prompt(LONG, model_id=NOVA).content == LONG
+
+def _converse(system):
+    from bedrock_client import get_bedrock_client
+
+    return get_bedrock_client().converse(
+        modelId=NOVA, system=system, messages=[{"role": "user", "content": [{"text": "hi"}]}],
+    )["usage"]
+
+def test_fake_bedrock_reads_the_cached_prefix_on_the_second_call(fake):
+    system = [{"text": LONG}, {"cachePoint": {"type": "default"}}]
+    first, second = _converse(system), _converse(system)
+    assert first["cacheWriteInputTokens"] > 1024 and first.get("cacheReadInputTokens", 0) == 0
+    assert second["cacheReadInputTokens"] == first["cacheWriteInputTokens"]
+    assert second["inputTokens"] == first["inputTokens"]
+
+def test_fake_bedrock_does_not_cache_below_the_minimum(fake):
+    usage = _converse([{"text": SHORT}, {"cachePoint": {"type": "default"}}])
+    assert "cacheReadInputTokens" not in usage and "cacheWriteInputTokens" not in usage
+
+def test_agent_reports_cache_hits_per_node(fake):
+    from instrumentation import GraphInstrumentation
+    from tools_03 import build_agent
+
+    handler = GraphInstrumentation()
+    agent = build_agent([lookup], instructions=LONG)
+    agent.invoke({"messages": [{"role": "user", "content": "lookup alice"}]}, {"callbacks": [handler]})
+    totals = handler.node_summary()["agent"]
+    assert totals["llm_calls"] == 2
+    assert totals["cache_creation_tokens"] > 0 and totals["cache_read_tokens"] == totals["cache_creation_tokens"]
+    assert 0 < totals["cache_hit_rate"] < 1
+
+@pytest.mark.parametrize("bind", [False, True])
+def test_build_agent_uses_the_checkpoint_format_of_its_model(bind, monkeypatch):
+    import tools_03
+    from bedrock_client import get_chat_model
+
+    prompts = []
+
+    def recording(*args):
+        prompts.append(cached_system_prompt(*args))
+        return prompts[-1]
+
+    monkeypatch.setattr(tools_03, "cached_system_prompt", recording)
+    model = get_chat_model(CLAUDE)
+    tools_03.build_agent([lookup], model=model.bind_tools([lookup]) if bind else model, instructions=LONG)
+    assert prompts[0].content[-1]["cache_control"] == {"type": "ephemeral"}
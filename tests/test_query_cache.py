@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from company_db import ReadOnlyConnectionPool
+from query_cache import QueryResultCache, bump_table_version, normalize_sql
+
+AVG_HR = "SELECT AVG(salary) FROM employees WHERE department = 'HR'"
+
+@pytest.fixture
+def cache(company_db_path):
+    return QueryResultCache(ReadOnlyConnectionPool(company_db_path))
+
+@pytest.fixture
+def writer(company_db_path):
+    conn = sqlite3.connect(company_db_path)
+    yield conn
+    conn.close()
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("select  *\nFROM t WHERE a = 'Hr';") == normalize_sql("SELECT * FROM t where a = 'Hr'")
+    assert normalize_sql("SELECT 'A'") != normalize_sql("SELECT 'a'")
+
+def test_repeat_is_served_from_cache(cache):
+    first = cache.query_json(AVG_HR)
+    assert cache.query_json(" select avg(salary) from employees where department = 'HR';") == first
+    assert cache.stats()["hits"] == 1
+
+def test_commit_without_counters_invalidates(cache, writer):
+    before = cache.query_json(AVG_HR)
+    writer.execute("UPDATE employees SET salary = salary * 100 WHERE department = 'HR'")
+    writer.commit()
+    assert cache.query_json(AVG_HR) != before
+    assert cache.stats()["invalidations"] == 1
+
+def test_commit_without_counter_bump_invalidates_once_counters_exist(cache, writer):
+    bump_table_version(writer, "departments")  # counters exist from now on
+    writer.commit()
+    before = cache.query_json(AVG_HR)
+    writer.execute("UPDATE employees SET salary = salary * 100 WHERE department = 'HR'")
+    writer.commit()
+    assert cache.query_json(AVG_HR) != before
+
+def test_bumped_counter_invalidates_only_readers_of_that_table(cache, writer):
+    writer.execute("CREATE TABLE projects (name TEXT)")
+    bump_table_version(writer, "projects")
+    writer.commit()
+    before = cache.query_json(AVG_HR)
+    cache.query_json("SELECT COUNT(*) FROM projects")
+
+    writer.execute("INSERT INTO projects VALUES ('apollo')")
+    bump_table_version(writer, "projects")
+    writer.commit()
+    assert cache.query_json(AVG_HR) == before
+    assert '"COUNT(*)":1' in cache.query_json("SELECT COUNT(*) FROM projects")
+    assert cache.stats()["invalidations"] == 1
+
+    writer.execute("UPDATE employees SET salary = salary * 100 WHERE department = 'HR'")
+    bump_table_version(writer, "employees")
+    writer.commit()
+    assert cache.query_json(AVG_HR) != before
+
+def test_volatile_queries_are_not_cached(cache):
+    cache.query_json("SELECT random() FROM employees LIMIT 1")
+    cache.query_json("SELECT random() FROM employees LIMIT 1")
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["uncacheable"] == 2
+
+def test_lru_eviction(company_db_path):
+    cache = QueryResultCache(ReadOnlyConnectionPool(company_db_path), max_entries=2)
+    for department in ("HR", "Engineering", "Sales"):
+        cache.query_json("SELECT COUNT(*) FROM employees WHERE department = ?", (department,))
+    assert cache.stats()["entries"] == 2
+    cache.query_json("SELECT COUNT(*) FROM employees WHERE department = ?", ("HR",))
+    assert cache.stats()["hits"] == 0
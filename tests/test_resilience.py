@@ -0,0 +1,133 @@
+import time
+from typing import TypedDict
+
+import pytest
+from botocore.exceptions import ClientError
+from langgraph.graph import END, START, StateGraph
+
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    _retry_on_throttling,
+    _retry_on_transient,
+    bedrock_retry_policy,
+    count_node_retry,
+    is_retryable,
+    is_throttling,
+    resilience_metrics,
+)
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Converse")
+
+def _failing(*errors):
+    """Raises the given errors in turn, then returns "ok"."""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+
+    return fn, calls
+
+def test_error_classification():
+    assert is_throttling(_client_error("ThrottlingException"))
+    assert is_retryable(_client_error("ServiceUnavailableException"))
+    assert not is_retryable(_client_error("ValidationException"))
+    assert not is_retryable(CircuitOpenError("open"))
+
+def test_circuit_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("m", threshold=2, reset_timeout=60)
+    fn, calls = _failing(*[_client_error("ThrottlingException")] * 5)
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            breaker.call(fn)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(fn)
+    assert len(calls) == 2
+    assert breaker.stats()["state"] == "open"
+    assert breaker.stats()["rejected_calls"] == 1
+
+def test_fatal_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker("m", threshold=1, reset_timeout=60)
+    fn, _ = _failing(_client_error("ValidationException"))
+    with pytest.raises(ClientError):
+        breaker.call(fn)
+    assert breaker.stats()["state"] == "closed"
+
+def test_probe_after_reset_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("m", threshold=1, reset_timeout=0.05)
+    fn, _ = _failing(_client_error("ThrottlingException"), _client_error("ThrottlingException"))
+    with pytest.raises(ClientError):
+        breaker.call(fn)
+    time.sleep(0.06)
+    with pytest.raises(ClientError):
+        breaker.call(fn)  # failed probe
+    assert breaker.stats()["state"] == "open"
+    time.sleep(0.06)
+    assert breaker.call(fn) == "ok"
+    stats = breaker.stats()
+    assert stats["state"] == "closed"
+    assert stats["times_opened"] == 1
+    assert stats["open_seconds"] >= 0.1
+
+class _State(TypedDict):
+    result: str
+
+def _graph(fn, **policy_options):
+    breaker = CircuitBreaker("m", threshold=100)
+
+    def call(state: _State) -> dict:
+        count_node_retry()
+        return {"result": breaker.call(fn)}
+
+    graph = StateGraph(_State)
+    graph.add_node("call", call, retry_policy=bedrock_retry_policy(**policy_options))
+    graph.add_edge(START, "call")
+    graph.add_edge("call", END)
+    return graph.compile()
+
+def _counters() -> dict:
+    return {name: value for name, value in resilience_metrics().items() if name != "circuits"}
+
+def _added(before: dict) -> dict:
+    return {name: value - before[name] for name, value in _counters().items() if value != before[name]}
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setenv("BEDROCK_RETRY_INITIAL", "0.01")
+    monkeypatch.setenv("BEDROCK_RETRY_MAX_INTERVAL", "0.04")
+
+def test_throttled_node_is_retried(fast_backoff):
+    fn, calls = _failing(*[_client_error("ThrottlingException")] * 3)
+    before = _counters()
+    assert _graph(fn).invoke({"result": ""}) == {"result": "ok"}
+    assert len(calls) == 4
+    assert _added(before) == {"retries": 3, "throttled": 3}
+
+def test_transient_errors_get_a_shorter_schedule(fast_backoff):
+    fn, calls = _failing(*[_client_error("ServiceUnavailableException")] * 5)
+    before = _counters()
+    with pytest.raises(ClientError):
+        _graph(fn).invoke({"result": ""})
+    assert len(calls) == 3
+    # the last failure is not retried
+    assert _added(before) == {"retries": 2, "transient_errors": 3}
+
+def test_fatal_errors_are_not_retried(fast_backoff):
+    fn, calls = _failing(_client_error("AccessDeniedException"))
+    before = _counters()
+    with pytest.raises(ClientError):
+        _graph(fn).invoke({"result": ""})
+    assert len(calls) == 1
+    assert _added(before) == {"fatal_errors": 1}
+
+def test_retry_predicates_do_not_count():
+    before = _counters()
+    for _ in range(3):
+        assert _retry_on_throttling(_client_error("ThrottlingException"))
+        assert not _retry_on_transient(_client_error("ValidationException"))
+    assert _added(before) == {}
@@ -0,0 +1,136 @@
+from typing import TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.types import _DeltaSnapshot
+from langgraph.graph import END, START, StateGraph
+
+from message_history import MessageHistory, append_messages
+from sqlite_checkpointer import SqliteCheckpointSaver
+
+class ChatState(TypedDict):
+    messages: MessageHistory
+    turns: int
+
+def _reply(state: ChatState) -> dict:
+    return {"messages": [AIMessage(f"reply {state['turns']}")], "turns": state["turns"] + 1}
+
+def _build(checkpointer):
+    graph = StateGraph(ChatState)
+    graph.add_node("reply", _reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=checkpointer)
+
+def _chat(app, thread_id: str, turns: int) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    state = None
+    for turn in range(turns):
+        state = app.invoke({"messages": [HumanMessage(f"hello {turn}")], "turns": turn}, config)
+    return state
+
+def _checkpoints(saver, thread_id: str) -> int:
+    return saver.conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+def test_state_survives_a_new_saver_on_the_same_file(db_path):
+    with SqliteCheckpointSaver(db_path) as saver:
+        _chat(_build(saver), "t1", 3)
+    with SqliteCheckpointSaver(db_path) as saver:
+        state = _build(saver).get_state({"configurable": {"thread_id": "t1"}}).values
+    assert [m.content for m in state["messages"]][-2:] == ["hello 2", "reply 2"]
+    assert len(state["messages"]) == 6
+
+def test_interrupted_run_resumes_from_the_last_checkpoint(db_path):
+    calls = []
+
+    def flaky(state: ChatState) -> dict:
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("worker died")
+        return {"messages": [AIMessage("recovered")], "turns": state["turns"] + 1}
+
+    graph = StateGraph(ChatState)
+    graph.add_node("reply", _reply)
+    graph.add_node("flaky", flaky)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", "flaky")
+    graph.add_edge("flaky", END)
+    config = {"configurable": {"thread_id": "t1"}}
+
+    with SqliteCheckpointSaver(db_path) as saver:
+        with pytest.raises(RuntimeError):
+            graph.compile(checkpointer=saver).invoke({"messages": [HumanMessage("hi")], "turns": 0}, config)
+    with SqliteCheckpointSaver(db_path) as saver:
+        state = graph.compile(checkpointer=saver).invoke(None, config)
+    assert [m.content for m in state["messages"]] == ["hi", "reply 0", "recovered"]
+
+def _snapshots(saver, thread_id: str) -> int:
+    return sum(
+        isinstance(saver.serde.loads_typed((type_, blob)), _DeltaSnapshot)
+        for type_, blob in saver.conn.execute(
+            "SELECT type, blob FROM blobs WHERE thread_id = ? AND channel = 'messages' AND type != 'empty'", (thread_id,)
+        )
+    )
+
+def test_retention_snapshots_delta_channels_and_keeps_the_limit(db_path):
+    with SqliteCheckpointSaver(
+        db_path, max_checkpoints_per_thread=3, prune_every=1,
+        delta_reducers={"messages": append_messages}, max_delta_chain=0,
+    ) as saver:
+        app = _build(saver)
+        state = _chat(app, "t1", 10)
+        assert _checkpoints(saver, "t1") == 3
+        assert len(state["messages"]) == 20
+
+    with SqliteCheckpointSaver(db_path) as saver:
+        state = _build(saver).get_state({"configurable": {"thread_id": "t1"}}).values
+    assert [m.content for m in state["messages"]] == [
+        text for turn in range(10) for text in (f"hello {turn}", f"reply {turn}")
+    ]
+
+def test_retention_without_reducer_keeps_ancestors(db_path):
+    with SqliteCheckpointSaver(db_path, max_checkpoints_per_thread=3) as saver:
+        state = _chat(_build(saver), "t1", 10)
+        assert _checkpoints(saver, "t1") > 3
+        assert len(state["messages"]) == 20
+
+def test_retention_runs_in_batches(db_path):
+    counts = []
+    with SqliteCheckpointSaver(
+        db_path, max_checkpoints_per_thread=3, prune_every=5,
+        delta_reducers={"messages": append_messages}, max_delta_chain=0,
+    ) as saver:
+        app = _build(saver)
+        for turn in range(10):
+            state = app.invoke(
+                {"messages": [HumanMessage(f"hello {turn}")], "turns": turn}, {"configurable": {"thread_id": "t1"}}
+            )
+            counts.append(_checkpoints(saver, "t1"))
+        assert len(state["messages"]) == 20
+    # cut back to 3 whenever a put leaves the thread 5 over the limit
+    assert max(counts) < 3 + 5
+    assert counts[:4] == [3, 6, 4, 7]
+
+def test_short_delta_chains_are_kept_instead_of_snapshotted(db_path):
+    with SqliteCheckpointSaver(
+        db_path, max_checkpoints_per_thread=3, prune_every=1, delta_reducers={"messages": append_messages},
+    ) as saver:
+        state = _chat(_build(saver), "t1", 10)
+        assert _checkpoints(saver, "t1") > 3
+        assert _snapshots(saver, "t1") == 0
+        assert len(state["messages"]) == 20
+
+def test_prune_keep_latest_and_delete(db_path):
+    with SqliteCheckpointSaver(db_path, delta_reducers={"messages": append_messages}) as saver:
+        app = _build(saver)
+        _chat(app, "t1", 4)
+        _chat(app, "t2", 2)
+        saver.prune(["t1"])
+        assert _checkpoints(saver, "t1") == 1
+        assert len(app.get_state({"configurable": {"thread_id": "t1"}}).values["messages"]) == 8
+        saver.prune(["t2"], strategy="delete")
+        assert _checkpoints(saver, "t2") == 0
@@ -0,0 +1,66 @@
+import pathlib
+
+import pytest
+
+from text_analysis import analyze_file, analyze_text, iter_file_chunks
+
+SAMPLES = [
+    "",
+    " ",
+    "Hello World",
+    "  leading and trailing  ",
+    "tabs\tand\nnew\r\nlines\x0bvertical\x1cseparators",
+    "Ünïcödé ÀÉÎÕÜ straße İstanbul ΣΊΣΥΦΟΣ ǅungla",
+    "no break em　ideographic​zero-width",
+    "emoji 👩‍💻 and combining é é and a lone \ud800 surrogate",
+    "日本語のテキスト 中文 한국어",
+]
+
+def _original(text: str) -> dict:
+    """analyze_string before it was rewritten as a single-pass analyzer."""
+    return {
+        'length': len(text),
+        'word_count': len(text.split()),
+        'vowel_count': sum(char in 'aeiou' for char in text.lower()),
+        'consonant_count': sum(bool(char.isalpha() and char not in 'aeiou') for char in text.lower()),
+        'uppercase_count': sum(bool(char.isupper()) for char in text),
+        'lowercase_count': sum(bool(char.islower()) for char in text),
+    }
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_the_original_implementation(text):
+    assert analyze_text(text) == _original(text)
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 7])
+def test_chunk_boundaries_inside_words_and_spaces(monkeypatch, chunk_chars):
+    monkeypatch.setenv("TEXT_CHUNK_CHARS", str(chunk_chars))
+    for text in SAMPLES:
+        assert analyze_text(text) == _original(text), text
+
+def test_iterable_of_chunks_including_empty_ones():
+    text = " ".join(SAMPLES)
+    chunks = ["", text[:5], "", text[5:6], text[6:40], "", text[40:]]
+    assert analyze_text(iter(chunks)) == _original(text)
+    assert analyze_text([]) == _original("")
+
+def _write(path: pathlib.Path, text: str) -> pathlib.Path:
+    path.write_bytes(text.encode("utf-8"))
+    return path
+
+@pytest.mark.parametrize("offset", range(8188, 8194))
+@pytest.mark.parametrize("char", ["é", "€", "👩"])
+def test_file_with_multibyte_characters_across_read_buffers(tmp_path, offset, char):
+    # io reads 8192 bytes at a time: put the character's bytes across that boundary
+    text = "a" * offset + char + " word" * 3 + char * 5
+    path = _write(tmp_path / "doc.txt", text)
+    assert analyze_file(path) == _original(text)
+    assert analyze_text(path) == _original(text)
+
+def test_file_chunks_keep_line_endings(tmp_path):
+    text = "first line\r\nsecond\rthird\n" * 50
+    path = _write(tmp_path / "doc.txt", text)
+    assert "".join(iter_file_chunks(path, chunk_chars=7)) == text
+    assert analyze_file(path) == _original(text)
+
+def test_empty_file(tmp_path):
+    assert analyze_file(_write(tmp_path / "empty.txt", "")) == _original("")
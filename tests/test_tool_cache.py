@@ -0,0 +1,109 @@
+import pytest
+from langchain_core.tools import tool
+
+from tool_cache import ToolResultCache, _key, cached_tool, tool_cache_stats
+
+def _counting_tool(**options):
+    calls = []
+
+    @cached_tool(**options)
+    @tool("scale")
+    def scale(value: float, unit: str) -> str:
+        """Scale a value."""
+        calls.append((value, unit))
+        return f"{value * 2} {unit.lower()}"
+
+    return scale, calls
+
+def test_repeat_call_is_served_from_cache():
+    scale, calls = _counting_tool(casefold=("unit",))
+    assert scale.invoke({"value": 2, "unit": "KG"}) == scale.invoke({"unit": "kg", "value": 2.0})
+    assert len(calls) == 1
+
+def test_floats_are_distinct_by_default():
+    scale, calls = _counting_tool()
+    scale.invoke({"value": 2.0, "unit": "kg"})
+    scale.invoke({"value": 2.0000000001, "unit": "kg"})
+    assert len(calls) == 2
+
+def test_float_rounding_is_opt_in_and_only_affects_the_key():
+    scale, calls = _counting_tool(float_digits=10)
+    scale.invoke({"value": 2.0000000001, "unit": "kg"})
+    scale.invoke({"value": 2.0, "unit": "kg"})
+    assert calls == [(2.0000000001, "kg")]
+
+def test_tool_receives_the_original_arguments():
+    scale, calls = _counting_tool(casefold=("unit",))
+    assert scale.invoke({"value": 123456.7890123, "unit": "KG"}) == f"{123456.7890123 * 2} kg"
+    assert calls == [(123456.7890123, "KG")]
+
+@pytest.mark.parametrize("name, args", [
+    ("advanced_calculator", {"operation": "add", "x": 1234567.891234, "y": 0.000123456}),
+    ("advanced_calculator", {"operation": "Divide", "x": 1.0, "y": 3.0}),
+    ("calculate_area_rectangle", {"length": 123456.7890123, "width": 2.0}),
+    ("temperature_converter", {"temperature": 12345678901.5, "from_unit": "Celsius", "to_unit": "kelvin"}),
+    ("string_analyzer", {"text": "Hello, World! 123"}),
+])
+def test_cached_and_uncached_results_are_identical(name, args):
+    import tools_02
+
+    cached = {t.name: t for t in (
+        tools_02.advanced_calculator, tools_02.calculate_area_rectangle,
+        tools_02.convert_temperature, tools_02.analyze_string,
+    )}[name]
+    uncached = tool(name, args_schema=cached.args_schema)(cached.func.__wrapped__)
+    expected = uncached.invoke(args)
+    assert cached.invoke(args) == expected  # miss
+    assert cached.invoke(args) == expected  # hit
+
+def test_keys_are_fixed_size_hashes():
+    assert len(_key({"text": "x" * 1_000_000})) == 64
+
+def test_exceptions_are_not_cached():
+    calls = []
+
+    @cached_tool
+    @tool
+    def flaky(x: int) -> int:
+        """Fails the first time."""
+        calls.append(x)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return x
+
+    with pytest.raises(RuntimeError):
+        flaky.invoke({"x": 1})
+    assert flaky.invoke({"x": 1}) == 1
+
+def test_mutable_results_are_copied():
+    @cached_tool
+    @tool
+    def listing(n: int) -> list:
+        """A fresh list."""
+        return list(range(n))
+
+    listing.invoke({"n": 3}).append(99)
+    assert listing.invoke({"n": 3}) == [0, 1, 2]
+
+def test_ttl_and_lru(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("tool_cache.time.monotonic", lambda: now[0])
+    cache = ToolResultCache(max_entries=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") == (False, None) and cache.stats()["evictions"] == 1
+    now[0] = 11
+    assert cache.get("b") == (False, None) and cache.stats()["expired"] == 1
+
+def test_same_tool_name_in_two_modules_is_reported_separately():
+    import tools_01
+    import tools_02
+
+    before = tool_cache_stats()
+    tools_01.add_numbers.invoke({"a": 1, "b": 2})
+    after = tool_cache_stats()
+    assert after["tools_01.add_numbers"]["misses"] + after["tools_01.add_numbers"]["hits"] == (
+        before["tools_01.add_numbers"]["misses"] + before["tools_01.add_numbers"]["hits"] + 1
+    )
+    assert after["tools_02.add_numbers"] == before["tools_02.add_numbers"]
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from cancellation import Deadline, current_deadline
+from tool_executor import (
+    ConcurrencyLimiter,
+    ConcurrencyTimeoutError,
+    concurrency,
+    make_tool_node,
+    parse_concurrency,
+    tool_metrics,
+    tool_timeout,
+)
+
+def test_parse_concurrency():
+    assert parse_concurrency("parallel", "t") == []
+    assert parse_concurrency("serial,db:company=4", "t") == [("resource:db:company", 4), ("tool:t", 1)]
+    assert parse_concurrency("max=2,db:company", "t") == [("resource:db:company", 1), ("tool:t", 2)]
+
+def test_hold_gives_up_when_the_deadline_passes():
+    limiter = ConcurrencyLimiter()
+    limits = [("resource:x", 1)]
+    holding, release = threading.Event(), threading.Event()
+
+    def holder():
+        with limiter.hold(limits):
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait(5)
+    started = time.monotonic()
+    with pytest.raises(ConcurrencyTimeoutError):
+        with limiter.hold(limits, Deadline(0.1)):
+            pass
+    assert time.monotonic() - started < 1
+    release.set()
+    thread.join()
+    with limiter.hold(limits, Deadline(0.1)):
+        pass  # the abandoned wait did not keep a permit
+
+def test_ahold_gives_up_when_the_deadline_passes():
+    limiter = ConcurrencyLimiter()
+    limits = [("resource:x", 1)]
+
+    async def scenario():
+        async with limiter.ahold(limits):
+            with pytest.raises(ConcurrencyTimeoutError):
+                async with limiter.ahold(limits, Deadline(0.05)):
+                    pass
+        async with limiter.ahold(limits, Deadline(0.05)):
+            pass
+
+    asyncio.run(scenario())
+
+def _graph(node):
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", node)
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    return graph.compile()
+
+def _calls(*names):
+    return AIMessage("", tool_calls=[{"name": name, "args": {}, "id": f"call_{i}"} for i, name in enumerate(names)])
+
+def _serial_tool(seconds):
+    @tool_timeout(0.3)
+    @concurrency("serial")
+    @tool
+    def slow() -> str:
+        """Sleeps, stopping early when its deadline is cancelled."""
+        deadline = current_deadline()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end and not deadline.expired():
+            time.sleep(0.01)
+        return "done"
+
+    return slow
+
+def test_queued_call_times_out_instead_of_waiting_for_its_turn():
+    node = make_tool_node([_serial_tool(1.0)], limiter=ConcurrencyLimiter())
+    started = time.monotonic()
+    result = _graph(node).invoke({"messages": [_calls("slow", "slow")]})
+    assert time.monotonic() - started < 0.9
+    errors = [json.loads(m.content) for m in result["messages"][1:]]
+    assert len(errors) == 2 and all(e["error"] == "timeout" for e in errors)
+
+def test_async_queued_call_times_out():
+    node = make_tool_node([_serial_tool(1.0)], limiter=ConcurrencyLimiter())
+    result = asyncio.run(_graph(node).ainvoke({"messages": [_calls("slow", "slow")]}))
+    assert [json.loads(m.content)["error"] for m in result["messages"][1:]] == ["timeout", "timeout"]
+
+def test_parallel_calls_overlap():
+    @concurrency("parallel")
+    @tool
+    def nap() -> str:
+        """Sleeps briefly."""
+        time.sleep(0.2)
+        return "ok"
+
+    node = make_tool_node([nap], limiter=ConcurrencyLimiter())
+    started = time.monotonic()
+    result = _graph(node).invoke({"messages": [_calls("nap", "nap", "nap")]})
+    assert time.monotonic() - started < 0.5
+    assert [m.content for m in result["messages"][1:]] == ["ok", "ok", "ok"]
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    import tool_executor
+
+    monkeypatch.setenv("TOOL_WORKERS", "2")
+    monkeypatch.setattr(tool_executor, "_tool_pool", None)
+    monkeypatch.setattr(tool_executor, "_tool_slots", None)
+
+def test_hung_calls_keep_their_worker_and_new_calls_fail_fast(small_pool):
+    release = threading.Event()
+    runs = []
+
+    @tool_timeout(0.1)
+    @concurrency("db:hung=2")
+    @tool
+    def hang() -> str:
+        """Ignores its deadline until released."""
+        release.wait(5)
+        return "late"
+
+    @tool_timeout(1.0)
+    @concurrency("db:hung=2")
+    @tool
+    def quick() -> str:
+        """Returns at once."""
+        runs.append(1)
+        return "ok"
+
+    limiter = ConcurrencyLimiter()
+    app = _graph(make_tool_node([hang, quick], limiter=limiter))
+    try:
+        result = app.invoke({"messages": [_calls("hang", "hang")]})
+        assert [json.loads(m.content)["error"] for m in result["messages"][1:]] == ["timeout", "timeout"]
+        assert tool_metrics()["still_running_after_timeout"] >= 2
+
+        # both workers (and both permits of db:hung) are still taken by the hung threads
+        started = time.monotonic()
+        result = app.invoke({"messages": [_calls("quick")]})
+        assert json.loads(result["messages"][-1].content)["error"] == "saturated"
+        assert time.monotonic() - started < 0.5 and runs == []
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 5
+    while tool_metrics()["still_running_after_timeout"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # the workers and the limits come back once the threads return
+    result = app.invoke({"messages": [_calls("quick", "quick")]})
+    assert [m.content for m in result["messages"][1:]] == ["ok", "ok"]
@@ -0,0 +1,89 @@
+import json
+import math
+
+import pytest
+
+from tools_02 import (
+    advanced_calculator,
+    advanced_calculator_batch,
+    analyze_document,
+    analyze_string,
+    convert_temperature,
+    convert_temperature_batch,
+)
+
+NAN = float("nan")
+INF = float("inf")
+
+def _scalar_temperature(temperature: float, from_unit: str, to_unit: str) -> float:
+    text = convert_temperature.invoke({"temperature": temperature, "from_unit": from_unit, "to_unit": to_unit})
+    return float(text.split(" = ")[1].split("°")[0])
+
+def _scalar_calculation(operation: str, x: float, y: float):
+    text = advanced_calculator.invoke({"operation": operation, "x": x, "y": y})
+    return text if text.startswith("Error") else float(text.rsplit(" = ", 1)[1])
+
+@pytest.mark.parametrize("units", [
+    ("celsius", "fahrenheit"), ("fahrenheit", "kelvin"), ("kelvin", "celsius"), ("Celsius", "celsius"),
+])
+def test_temperature_batch_matches_the_scalar_tool(units):
+    temperatures = [-40.0, 0.0, 36.6, 100.0, 2.675, -273.15, 1e308, NAN, INF, -INF]
+    output = convert_temperature_batch.invoke({"temperatures": temperatures, "from_unit": units[0], "to_unit": units[1]})
+    payload = json.loads(output)
+    not_finite = {error["index"] for error in payload.get("errors", [])}
+    for i, temperature in enumerate(temperatures):
+        expected = _scalar_temperature(temperature, *units)
+        if math.isfinite(expected):
+            assert payload["results"][i] == expected, temperature
+        else:
+            assert payload["results"][i] is None and i in not_finite, temperature
+    assert not_finite == {i for i, value in enumerate(payload["results"]) if value is None}
+
+def test_calculator_batch_matches_the_scalar_tool():
+    calculations = [
+        ("add", 0.1, 0.2), ("subtract", 1.0, 3.5), ("multiply", 1e200, 1e200), ("divide", 1.0, 3.0),
+        ("DIVIDE", 7.0, 0.0), ("divide", NAN, 0.0), ("add", NAN, 1.0), ("multiply", INF, 0.0),
+        ("subtract", INF, 1.0), ("power", 2.0, 3.0),
+    ]
+    output = advanced_calculator_batch.invoke(
+        {"calculations": [{"operation": op, "x": x, "y": y} for op, x, y in calculations]}
+    )
+    payload = json.loads(output)
+    errors = {error["index"]: error["error"] for error in payload["errors"]}
+    for i, calculation in enumerate(calculations):
+        expected = _scalar_calculation(*calculation)
+        if isinstance(expected, str):
+            assert payload["results"][i] is None and expected == f"Error: {errors[i]}", calculation
+        elif math.isfinite(expected):
+            assert payload["results"][i] == expected and i not in errors, calculation
+        else:
+            assert payload["results"][i] is None and errors[i] == "Result is not a finite number", calculation
+
+def test_batch_output_is_strict_json():
+    output = advanced_calculator_batch.invoke({"calculations": [{"operation": "add", "x": NAN, "y": 1}]})
+    assert "NaN" not in output
+    json.loads(output, parse_constant=lambda name: pytest.fail(f"non-standard JSON constant {name}"))
+
+@pytest.fixture
+def document_root(tmp_path, monkeypatch):
+    root = tmp_path / "docs"
+    (root / "sub").mkdir(parents=True)
+    (root / "sub" / "report.txt").write_text("Quarterly Report\nRevenue grew.", encoding="utf-8")
+    (tmp_path / "secret.txt").write_text("outside the root", encoding="utf-8")
+    monkeypatch.setenv("DOCUMENT_ROOT", str(root))
+    return root
+
+def test_document_under_the_root_is_analyzed(document_root):
+    stats = analyze_document.invoke({"path": "sub/report.txt"})
+    assert stats == analyze_string.invoke({"text": "Quarterly Report\nRevenue grew."})
+
+@pytest.mark.parametrize("path", ["../secret.txt", "sub/../../secret.txt", "sub", "missing.txt"])
+def test_documents_outside_the_root_are_refused(document_root, path):
+    assert "error" in analyze_document.invoke({"path": path})
+
+def test_absolute_paths_outside_the_root_are_refused(document_root):
+    assert "error" in analyze_document.invoke({"path": str(document_root.parent / "secret.txt")})
+
+def test_symlinks_out_of_the_root_are_refused(document_root):
+    (document_root / "link.txt").symlink_to(document_root.parent / "secret.txt")
+    assert "error" in analyze_document.invoke({"path": "link.txt"})
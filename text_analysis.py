@@ -0,0 +1,118 @@
+# Single-pass text statistics for large documents
+# analyze_text
+# analyze_file
+# iter_file_chunks
+#
+# analyze_string (tools_02.py) used to walk the text six times (len, split, four
+# generator sums calling lower() again and again) and needed the whole text in memory.
+# analyze_text() gives the same numbers in one pass per chunk:
+#   - a chunk is turned into an array of code points (one byte each for ASCII text)
+#     and counted with numpy.bincount, so every statistic except the word count comes
+#     from a histogram of the distinct characters; each distinct character is classified
+#     once (what lower() turns it into, isupper, islower, isspace);
+#   - words are counted as non-space characters following a space (or the start),
+#     with the state carried from one chunk to the next;
+#   - text can be a str, a path (pathlib.Path) or any iterable of str chunks, so a
+#     multi-megabyte upload streams through in TEXT_CHUNK_CHARS pieces (a long str
+#     is sliced the same way, to bound the temporary arrays).
+# The results match the old per-character definitions exactly: vowels and consonants
+# are counted in text.lower(), words are what str.split() returns.
+#
+#   TEXT_CHUNK_CHARS   characters per chunk (1048576)
+
+import functools
+import os
+import pathlib
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VOWELS = "aeiou"
+STAT_KEYS = (
+    "length", "word_count", "vowel_count", "consonant_count", "uppercase_count", "lowercase_count",
+)
+
+# ASCII classification as lookup tables, indexed by byte value
+_ASCII = [chr(code) for code in range(128)]
+_ASCII_SPACE = np.array([char.isspace() for char in _ASCII] + [False] * 128)
+
+@functools.lru_cache(maxsize=65536)
+def _classify(code: int) -> Tuple[int, int, int, int]:
+    """(vowels, consonants) in the character's lower() form, isupper, islower."""
+    char = chr(code)
+    lowered = char.lower()  # may be longer than one character, e.g. 'İ' -> 'i̇'
+    vowels = sum(c in VOWELS for c in lowered)
+    consonants = sum(c.isalpha() and c not in VOWELS for c in lowered)
+    return vowels, consonants, int(char.isupper()), int(char.islower())
+
+def _code_points(chunk: str) -> np.ndarray:
+    if chunk.isascii():
+        return np.frombuffer(chunk.encode("ascii"), dtype=np.uint8)
+    # surrogatepass: lone surrogates are still one character each, as in len()
+    return np.frombuffer(chunk.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+def _space_mask(codes: np.ndarray, distinct: np.ndarray) -> np.ndarray:
+    if codes.dtype == np.uint8:
+        return _ASCII_SPACE[codes]
+    spaces = [code for code in distinct.tolist() if chr(code).isspace()]
+    return np.isin(codes, spaces)
+
+def _analyze_chunks(chunks: Iterable[str]) -> dict:
+    totals = np.zeros(4, dtype=np.int64)  # vowels, consonants, upper, lower
+    length = 0
+    words = 0
+    after_space = True  # the start of the text counts as a word boundary
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        codes = _code_points(chunk)
+        counts = np.bincount(codes)
+        distinct = np.flatnonzero(counts)
+        table = np.array([_classify(code) for code in distinct.tolist()], dtype=np.int64)
+        totals += counts[distinct] @ table
+
+        space = _space_mask(codes, distinct)
+        starts = ~space
+        starts[1:] &= space[:-1]
+        starts[0] &= after_space
+        words += int(np.count_nonzero(starts))
+        after_space = bool(space[-1])
+        length += len(codes)
+
+    vowels, consonants, upper, lower = (int(value) for value in totals)
+    return dict(zip(STAT_KEYS, (length, words, vowels, consonants, upper, lower)))
+
+def _chunk_chars() -> int:
+    return int(os.getenv("TEXT_CHUNK_CHARS", str(1 << 20)))
+
+def iter_file_chunks(path: Union[str, os.PathLike], chunk_chars: Optional[int] = None, encoding: str = "utf-8") -> Iterator[str]:
+    """Read a text file in chunks of chunk_chars characters (TEXT_CHUNK_CHARS)."""
+    chunk_chars = chunk_chars or _chunk_chars()
+    # newline="": line endings are counted as they are in the file
+    with open(path, encoding=encoding, newline="") as file:
+        while True:
+            chunk = file.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+def analyze_file(path: Union[str, os.PathLike], encoding: str = "utf-8") -> dict:
+    """Statistics of a text file, read in constant memory."""
+    return _analyze_chunks(iter_file_chunks(path, encoding=encoding))
+
+def analyze_text(text: Union[str, os.PathLike, Iterable[str]]) -> dict:
+    """Length, word, vowel, consonant, uppercase and lowercase counts of a text.
+
+    text is the text itself (str), a file to read (pathlib.Path) or an iterable of
+    str chunks.
+    """
+    if isinstance(text, str):
+        size = _chunk_chars()
+        return _analyze_chunks(text[start:start + size] for start in range(0, len(text), size))
+    if isinstance(text, os.PathLike):
+        return analyze_file(pathlib.Path(text))
+    return _analyze_chunks(text)
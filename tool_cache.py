@@ -0,0 +1,198 @@
+# Memoization for pure tools
+# cached_tool
+# ToolResultCache
+# tool_cache_stats
+#
+# Many tools are pure functions of their arguments (calculators, unit conversion, string
+# statistics) and the model often repeats the exact same call, within one conversation
+# and across them. @cached_tool(...) on top of @tool (or on a plain function) serves
+# repeats from a per-tool LRU cache with a TTL:
+#   - arguments are validated by the tool's own schema first (so "5" and 5 are the
+#     same call for an int argument), then normalized for the key only: arguments
+#     listed in casefold= are case folded and, with float_digits=N, floats are rounded
+#     to N significant digits (None, the default, keeps every float distinct). The tool
+#     always receives the original arguments, so only declare a normalization the
+#     tool's result does not depend on (e.g. a unit it lower-cases itself);
+#   - the key is a SHA-256 of the arguments, so large inputs are not kept in the cache;
+#   - exceptions are not cached, and only the arguments in the tool's schema are part
+#     of the key (callbacks and the run config are not);
+#   - only use it for tools whose result depends on nothing but their arguments.
+# tool_cache_stats() lists the caches by the decorated function's module and name, so
+# tools with the same name in different modules are reported separately.
+#
+#     @cached_tool(casefold=("from_unit", "to_unit"))
+#     @tool("temperature_converter", parse_docstring=True)
+#     def convert_temperature(temperature: float, from_unit: str, to_unit: str) -> str: ...
+#
+#   TOOL_CACHE_SIZE   max cached results per tool, 0 disables caching (1024)
+#   TOOL_CACHE_TTL    seconds a result stays valid, 0 = never expires (3600)
+
+import copy
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+from dotenv import load_dotenv
+from langchain_core.tools import BaseTool, tool
+
+load_dotenv()
+
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+class ToolResultCache:
+    """Thread-safe LRU cache with a TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple:
+        """(True, value) for a live entry, else (False, None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+_caches = {}  # "module.qualname" of the tool function -> ToolResultCache
+_caches_lock = threading.Lock()
+
+def tool_cache_stats() -> Dict[str, dict]:
+    """Cache stats of every @cached_tool, by "module.qualname" of its function."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+def _normalize(value: Any, casefold: bool, float_digits: Optional[int]) -> Any:
+    if casefold and isinstance(value, str):
+        return value.casefold()
+    if float_digits is not None and isinstance(value, float):
+        return float(f"{value:.{float_digits}g}")
+    return value
+
+def _key(arguments: Dict[str, Any]) -> str:
+    # sort_keys makes argument order irrelevant; floats are written with repr precision
+    payload = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cached_tool(
+    func_or_tool: Union[BaseTool, Callable, None] = None,
+    *,
+    casefold: Sequence[str] = (),
+    float_digits: Optional[int] = None,
+    max_entries: Optional[int] = None,
+    ttl: Optional[float] = None,
+):
+    """Decorator memoizing a pure tool on its validated arguments (normalized for the key only)."""
+
+    def decorate(target: Union[BaseTool, Callable]) -> BaseTool:
+        result_tool = target if isinstance(target, BaseTool) else tool(target)
+        unknown = set(casefold) - set(result_tool.args)
+        if unknown:
+            raise ValueError(f"{result_tool.name}: casefold names unknown arguments {sorted(unknown)}")
+
+        cache = ToolResultCache(
+            max_entries=int(os.getenv("TOOL_CACHE_SIZE", "1024")) if max_entries is None else max_entries,
+            ttl=float(os.getenv("TOOL_CACHE_TTL", "3600")) if ttl is None else ttl,
+        )
+        schema_args = set(result_tool.args)
+
+        def key_of(args: tuple, kwargs: Dict[str, Any]) -> str:
+            # the arguments were already validated by the tool's args_schema (BaseTool._parse_input)
+            normalized = {
+                name: _normalize(value, name in casefold, float_digits)
+                for name, value in kwargs.items()
+                if name in schema_args
+            }
+            return _key({"*args": args, **normalized})
+
+        def recall(value: Any) -> Any:
+            # callers may mutate a dict/list result, never hand out the cached object
+            return value if isinstance(value, _IMMUTABLE) else copy.deepcopy(value)
+
+        func = getattr(result_tool, "func", None)
+        if func is not None:
+            @functools.wraps(func)
+            def run(*args, **kwargs):
+                key = key_of(args, kwargs)
+                found, value = cache.get(key)
+                if not found:
+                    value = func(*args, **kwargs)
+                    cache.put(key, value)
+                return recall(value)
+
+            result_tool.func = run
+
+        coroutine = getattr(result_tool, "coroutine", None)
+        if coroutine is not None:
+            @functools.wraps(coroutine)
+            async def arun(*args, **kwargs):
+                key = key_of(args, kwargs)
+                found, value = cache.get(key)
+                if not found:
+                    value = await coroutine(*args, **kwargs)
+                    cache.put(key, value)
+                return recall(value)
+
+            result_tool.coroutine = arun
+
+        if func is None and coroutine is None:
+            raise TypeError(f"{result_tool.name}: @cached_tool needs a function-based tool")
+        wrapped = func or coroutine
+        with _caches_lock:
+            _caches[f"{wrapped.__module__}.{wrapped.__qualname__}"] = cache
+        result_tool.metadata = {**(result_tool.metadata or {}), "cached": True}
+        return result_tool
+
+    if func_or_tool is not None:
+        return decorate(func_or_tool)
+    return decorate
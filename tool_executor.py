@@ -0,0 +1,365 @@
+# Tool execution with per-tool concurrency classes and deadlines
+# concurrency / tool_timeout
+# ConcurrencyLimiter / ConcurrencyTimeoutError
+# make_tool_node
+# tool_metrics
+#
+# When the model asks for several tools in one turn, LangGraph runs the calls at the
+# same time (one task per call, on threads for invoke and on the event loop for
+# ainvoke). That is what we want for slow, independent tools, but not for tools that
+# write to the same resource. Each tool declares a concurrency class:
+#     "parallel"         no limit (default, TOOL_DEFAULT_CONCURRENCY)
+#     "serial"           one call of this tool at a time
+#     "max=N"            at most N calls of this tool at a time
+#     "db:company"       exclusive resource key: one call at a time across every tool
+#                        declaring the same key ("db:company=4" allows 4)
+# Classes combine with commas, e.g. "max=4,db:company". make_tool_node() builds a
+# ToolNode that holds the matching limits around each call, so independent calls
+# overlap while conflicting ones queue up.
+#
+#     @concurrency("db:company")
+#     @tool
+#     def update_salary(...): ...
+#
+#     agent = create_react_agent(model=llm_aws, tools=make_tool_node([slow_calculation, update_salary]))
+#
+# Every call also has a deadline: @tool_timeout(seconds), else TOOL_TIMEOUT (30s, 0 = none).
+# It covers queueing for a limit and running the tool: a call still queued when it passes
+# stops waiting and gives up its turn. When it passes:
+#   - the model gets a structured error ToolMessage ({"error": "timeout", ...}) at once;
+#   - the deadline is cancelled: a SQLite query through company_db.py is interrupted,
+#     async tools are cancelled, other code can poll cancellation.current_deadline();
+#   - sync tools run on their own pool (TOOL_WORKERS), so a call that cannot be stopped
+#     keeps running there without holding the graph's worker. Its worker and its limits
+#     stay taken until the thread actually returns;
+#   - the timeout is counted in tool_metrics().
+# A call only goes to the pool once a worker is free (waiting for one counts against its
+# deadline), so it never queues inside the pool. When every worker is still busy with
+# calls that timed out, new calls are rejected at once with {"error": "saturated", ...}.
+#
+# langchain_core and langgraph are imported on first use, not when this module is imported.
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from cancellation import Deadline, deadline_scope
+
+if TYPE_CHECKING:
+    from langchain_core.messages import ToolMessage
+    from langchain_core.tools import BaseTool
+    from langgraph.prebuilt import ToolNode
+
+load_dotenv()
+
+def concurrency(spec: str):
+    """Decorator declaring a tool's concurrency class (stored in tool.metadata)."""
+
+    def decorate(tool: "BaseTool") -> "BaseTool":
+        tool.metadata = {**(tool.metadata or {}), "concurrency": spec}
+        return tool
+
+    return decorate
+
+def tool_timeout(seconds: float):
+    """Decorator giving a tool its own deadline in seconds (0 = no deadline)."""
+
+    def decorate(tool: "BaseTool") -> "BaseTool":
+        tool.metadata = {**(tool.metadata or {}), "timeout": seconds}
+        return tool
+
+    return decorate
+
+def parse_concurrency(spec: Optional[str], tool_name: str) -> List[Tuple[str, int]]:
+    """Turn a concurrency class into (limit key, max concurrent calls) pairs."""
+    limits = {}
+    for item in (spec or "parallel").split(","):
+        item = item.strip()
+        if not item or item == "parallel":
+            continue
+        if item == "serial":
+            limits[f"tool:{tool_name}"] = 1
+        elif item.startswith("max="):
+            limits[f"tool:{tool_name}"] = int(item[len("max="):])
+        else:
+            key, _, count = item.partition("=")
+            limits[f"resource:{key}"] = int(count) if count else 1
+    return sorted(limits.items())  # one global order, so two tools can never deadlock
+
+class ConcurrencyTimeoutError(TimeoutError):
+    """Raised when a call's deadline passes while it waits for a concurrency limit."""
+
+class ConcurrencyLimiter:
+    """Named semaphores shared by every ToolNode in the process."""
+
+    def __init__(self):
+        self._semaphores = {}  # key -> threading.BoundedSemaphore
+        # asyncio primitives are bound to an event loop, so keep one set per loop
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.waited_seconds = {}  # key -> total time calls spent queued
+
+    def _size(self, key: str, count: int) -> int:
+        # the first declaration of a key fixes its size
+        return self._sizes.setdefault(key, count)
+
+    def _semaphore(self, key: str, count: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = self._semaphores[key] = threading.BoundedSemaphore(self._size(key, count))
+            return semaphore
+
+    def _async_semaphore(self, key: str, count: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(key)
+            if semaphore is None:
+                semaphore = semaphores[key] = asyncio.Semaphore(self._size(key, count))
+            return semaphore
+
+    def _record_wait(self, key: str, started: float) -> None:
+        with self._lock:
+            self.waited_seconds[key] = self.waited_seconds.get(key, 0.0) + time.perf_counter() - started
+
+    @contextmanager
+    def hold(self, limits: Sequence[Tuple[str, int]], deadline: Optional[Deadline] = None):
+        """Hold every limit (blocking the thread) for the duration of the block.
+
+        With a deadline, waiting stops when it passes (ConcurrencyTimeoutError).
+        """
+        acquired = []
+        try:
+            for key, count in limits:
+                semaphore = self._semaphore(key, count)
+                started = time.perf_counter()
+                if deadline is None:
+                    semaphore.acquire()
+                elif deadline.cancelled or not semaphore.acquire(timeout=deadline.remaining()):
+                    self._record_wait(key, started)
+                    raise ConcurrencyTimeoutError(f"deadline passed waiting for {key}")
+                acquired.append(semaphore)
+                self._record_wait(key, started)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+    @asynccontextmanager
+    async def ahold(self, limits: Sequence[Tuple[str, int]], deadline: Optional[Deadline] = None):
+        """Async version of hold(): waits without blocking the event loop."""
+        acquired = []
+        try:
+            for key, count in limits:
+                semaphore = self._async_semaphore(key, count)
+                started = time.perf_counter()
+                if deadline is None:
+                    await semaphore.acquire()
+                else:
+                    try:
+                        if deadline.cancelled:
+                            raise asyncio.TimeoutError
+                        await asyncio.wait_for(semaphore.acquire(), timeout=deadline.remaining())
+                    except asyncio.TimeoutError:
+                        self._record_wait(key, started)
+                        raise ConcurrencyTimeoutError(f"deadline passed waiting for {key}") from None
+                acquired.append(semaphore)
+                self._record_wait(key, started)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+_limiter = ConcurrencyLimiter()
+
+def tool_limits(tool: Optional["BaseTool"], tool_name: str) -> List[Tuple[str, int]]:
+    """Limits for a tool call, from the tool's declared class or the default."""
+    spec = ((tool.metadata or {}).get("concurrency") if tool is not None else None)
+    if spec is None:
+        spec = os.getenv("TOOL_DEFAULT_CONCURRENCY", "parallel")
+    return parse_concurrency(spec, tool_name)
+
+def tool_deadline_seconds(tool: Optional["BaseTool"]) -> float:
+    """Deadline for a tool call, from the tool's declaration or TOOL_TIMEOUT."""
+    seconds = (tool.metadata or {}).get("timeout") if tool is not None else None
+    if seconds is None:
+        seconds = float(os.getenv("TOOL_TIMEOUT", "30"))
+    return seconds
+
+# ############### Metrics ###############
+_metrics = Counter()
+_timeouts = Counter()
+_metrics_lock = threading.Lock()
+
+def _count(name: str, tool_name: Optional[str] = None) -> None:
+    with _metrics_lock:
+        _metrics[name] += 1
+        if tool_name is not None:
+            _timeouts[tool_name] += 1
+
+def tool_metrics() -> dict:
+    """Call/timeout counters and time spent queued per concurrency key."""
+    with _metrics_lock:
+        metrics = {
+            "calls": _metrics["calls"],
+            "timeouts": _metrics["timeouts"],
+            "timeouts_by_tool": dict(_timeouts),
+            "saturated": _metrics["saturated"],
+            "still_running_after_timeout": _metrics["abandoned"] - _metrics["abandoned_finished"],
+        }
+    with _limiter._lock:
+        metrics["waited_seconds"] = {key: round(value, 3) for key, value in _limiter.waited_seconds.items()}
+    return metrics
+
+def _error_message(request, content: dict) -> "ToolMessage":
+    from langchain_core.messages import ToolMessage
+
+    return ToolMessage(
+        content=json.dumps(content),
+        name=request.tool_call["name"],
+        tool_call_id=request.tool_call["id"],
+        status="error",
+    )
+
+def timeout_message(request, seconds: float) -> "ToolMessage":
+    """Error result the model sees when a tool misses its deadline."""
+    name = request.tool_call["name"]
+    return _error_message(request, {
+        "error": "timeout",
+        "tool": name,
+        "timeout_seconds": seconds,
+        "message": f"'{name}' did not finish within {seconds}s and was cancelled. "
+                   "Try a narrower request or a different approach.",
+    })
+
+def saturated_message(request) -> "ToolMessage":
+    """Error result the model sees when no tool worker is free to run the call."""
+    name = request.tool_call["name"]
+    return _error_message(request, {
+        "error": "saturated",
+        "tool": name,
+        "message": f"'{name}' was not run: every tool worker is busy with earlier calls that "
+                   "did not finish in time. Try again later.",
+    })
+
+def _timed_out(request, result, deadline: Deadline):
+    # a tool that stopped itself at the deadline (e.g. an interrupted query) reports the
+    # timeout the same way as one that was abandoned
+    from langchain_core.messages import ToolMessage
+
+    if isinstance(result, ToolMessage) and result.status == "error" and deadline.expired():
+        _count("timeouts", request.tool_call["name"])
+        return timeout_message(request, deadline.seconds)
+    return result
+
+# ############### Tool node ###############
+_tool_pool = None
+_tool_slots = None  # one permit per pool worker, held until the tool's thread returns
+_tool_workers = 0
+_tool_pool_lock = threading.Lock()
+
+def _get_tool_pool() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _tool_pool, _tool_slots, _tool_workers
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_workers = int(os.getenv("TOOL_WORKERS", "32"))
+            _tool_pool = ThreadPoolExecutor(max_workers=_tool_workers, thread_name_prefix="tool")
+            _tool_slots = threading.BoundedSemaphore(_tool_workers)
+    return _tool_pool, _tool_slots
+
+def _abandoned_running() -> int:
+    with _metrics_lock:
+        return _metrics["abandoned"] - _metrics["abandoned_finished"]
+
+def _take_worker(slots: threading.BoundedSemaphore, deadline: Deadline) -> bool:
+    if slots.acquire(blocking=False):
+        return True
+    if _abandoned_running() >= _tool_workers:
+        # every worker is stuck on a call nobody waits for: fail fast instead of queueing
+        return False
+    return slots.acquire(timeout=deadline.remaining())
+
+def make_tool_node(tools: Sequence[Any], limiter: Optional[ConcurrencyLimiter] = None, **kwargs: Any) -> "ToolNode":
+    """ToolNode that applies each tool's concurrency class and deadline around its calls."""
+    from langgraph.prebuilt import ToolNode
+
+    limiter = limiter or _limiter
+
+    def wrap_tool_call(request, execute):
+        limits = tool_limits(request.tool, request.tool_call["name"])
+        seconds = tool_deadline_seconds(request.tool)
+        _count("calls")
+        if not seconds:
+            with limiter.hold(limits):
+                return execute(request)
+
+        deadline = Deadline(seconds)
+        pool, slots = _get_tool_pool()
+        if not _take_worker(slots, deadline):
+            _count("saturated")
+            return saturated_message(request)
+
+        def run():
+            try:
+                with deadline_scope(deadline), limiter.hold(limits, deadline):
+                    return execute(request)
+            except ConcurrencyTimeoutError:
+                # queued past the deadline: never ran, reported like any timeout
+                return timeout_message(request, seconds)
+            finally:
+                # the limits are released above and the worker here, only once the tool returns
+                slots.release()
+
+        # the copied context carries LangGraph's config (callbacks, stream writer) into the thread
+        try:
+            future = pool.submit(contextvars.copy_context().run, run)
+        except BaseException:
+            slots.release()
+            raise
+        try:
+            return _timed_out(request, future.result(timeout=deadline.remaining()), deadline)
+        except FutureTimeoutError:
+            deadline.cancel()
+            _count("timeouts", request.tool_call["name"])
+            _count("abandoned")
+            future.add_done_callback(lambda _: _count("abandoned_finished"))
+            return timeout_message(request, seconds)
+
+    async def awrap_tool_call(request, execute):
+        limits = tool_limits(request.tool, request.tool_call["name"])
+        seconds = tool_deadline_seconds(request.tool)
+        _count("calls")
+        if not seconds:
+            async with limiter.ahold(limits):
+                return await execute(request)
+
+        deadline = Deadline(seconds)
+
+        async def run():
+            try:
+                with deadline_scope(deadline):
+                    async with limiter.ahold(limits, deadline):
+                        return await execute(request)
+            except ConcurrencyTimeoutError:
+                return timeout_message(request, seconds)
+
+        try:
+            return _timed_out(request, await asyncio.wait_for(run(), timeout=seconds), deadline)
+        except asyncio.TimeoutError:
+            deadline.cancel()
+            _count("timeouts", request.tool_call["name"])
+            return timeout_message(request, seconds)
+
+    return ToolNode(tools, wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call, **kwargs)
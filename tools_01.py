@@ -4,36 +4,33 @@
 # add_numbers
 # multiply_numbers
 # query_database
+#
+# Importing this module only defines the tools and agent factories (build_*_agent);
+# the examples run with `python tools_01.py`.
 
 import json
 import os
 import pathlib
-import sqlite3
 from datetime import datetime
 
 from dotenv import load_dotenv
 from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
-from rich import print
-from db_sqllite_mock import create_mock_database
 
-import boto3
-from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
+from bedrock_client import get_chat_model
+from query_cache import get_query_cache
+from index_advisor import get_index_advisor
+from tool_executor import make_tool_node, tool_metrics
+from tool_cache import cached_tool, tool_cache_stats
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
+NOTES_DIR = pathlib.Path(__file__).parent.resolve() / 'notes'
 
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
+def build_agent(tools):
+    """ReAct agent on the shared, pooled Bedrock chat model (see bedrock_client.py)."""
+    from langgraph.prebuilt import create_react_agent
 
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
+    return create_react_agent(model=get_chat_model(), tools=tools)
 
 # ############### Example 1: Weather Tool with structured response ###############
 @tool
@@ -53,12 +50,8 @@ def get_weather(location: str) -> str:
     }
     return json.dumps(weather_data, indent=2)
 
-# Test Example 1: Weather query
-print('=== Example 1: Weather Tool ===')
-agent1 = create_react_agent(model=llm_aws, tools=[get_weather])
-result1 = agent1.invoke({'messages': [{'role': 'user', 'content': "What's the weather like in Tokyo?"}]})
-print(result1['messages'][-1].content)
-print()
+def build_weather_agent():
+    return build_agent([get_weather])
 
 # ############### Example 2: File Operations Tool - File system interactions ###############
 @tool
@@ -71,8 +64,8 @@ def save_note(filename: str, content: str) -> str:
         content: The text content to save
     """
     try:
-        filepath = f'notes/{filename}.txt'
-        os.makedirs('notes', exist_ok=True)
+        filepath = NOTES_DIR / f'{filename}.txt'
+        os.makedirs(NOTES_DIR, exist_ok=True)
 
         with open(filepath, 'w') as f:
             f.write(f'Note saved at {datetime.now()}\n')
@@ -83,21 +76,11 @@ def save_note(filename: str, content: str) -> str:
     except Exception as e:
         return f'Error saving note: {str(e)}'
 
-# Test Example 2: File operation
-print('=== Example 2: File Operations Tool - File system interactions ===')
-agent2 = create_react_agent(model=llm_aws, tools=[save_note])
-result2 = agent2.invoke({
-    'messages': [
-        {
-            'role': 'user',
-            'content': "Save a note called to file 'shopping_list' with my groceries: milk, eggs, bread, and cheese",
-        }
-    ]
-})
-print(result2['messages'][-1].content)
-print()
+def build_notes_agent():
+    return build_agent([save_note])
 
 # ############### Example 4: Math Tools - Chained calculations showing tool interoperability ###############
+@cached_tool
 @tool
 def add_numbers(a: float, b: float) -> float:
     """Add two numbers together.
@@ -108,6 +91,7 @@ def add_numbers(a: float, b: float) -> float:
     """
     return a + b + 2
 
+@cached_tool
 @tool
 def multiply_numbers(a: float, b: float) -> float:
     """Multiply two numbers together.
@@ -118,21 +102,18 @@ def multiply_numbers(a: float, b: float) -> float:
     """
     return a * b
 
-print('=== Example 4: Math Tools - Chained calculations showing tool interoperability ===')
-agent4 = create_react_agent(model=llm_aws, tools=[add_numbers, multiply_numbers])
-q = 'If I add 10 and 20, then multiply the result by 2, what do I get?'
-result6 = agent4.invoke({
-    'messages': [
-        {
-            'role': 'user',
-            'content': q,
-        }
-    ]
-})
-print(result6['messages'][-1].content)
-print()
+def build_math_agent():
+    return build_agent([add_numbers, multiply_numbers])
 
 # ############### Example 5: query_database ###############
+def _observe_query(sql_query, params):
+    advisor = get_index_advisor()
+    if advisor is not None:
+        try:
+            advisor.observe(sql_query, params)
+        except Exception as e:
+            print(f'index advisor: {e}')  # advice is best effort, the result is still good
+
 @tool
 def query_database(sql_query: str) -> str:
     """Execute a SQL query on the company database and return the results as JSON.
@@ -145,54 +126,92 @@ def query_database(sql_query: str) -> str:
         if not sql_query.strip().upper().startswith('SELECT'):
             return 'Error: Only SELECT queries are allowed for security reasons.'
 
-        conn = sqlite3.connect('company.db')
-        cursor = conn.cursor()
-
-        # Execute the query
-        cursor.execute(sql_query)
-
-        # Get column names
-        columns = [description[0] for description in cursor.description]
-
-        # Get results
-        results = cursor.fetchall()
-        conn.close()
-
-        # Format as list of dictionaries
-        formatted_results = [dict(zip(columns, row)) for row in results]
-
-        return json.dumps({'query': sql_query, 'results': formatted_results, 'count': len(formatted_results)}, indent=2)
+        # Execute the query on a pooled, read-only connection (see company_db.py).
+        # Rows are streamed and encoded as compact JSON up to QUERY_MAX_ROWS/QUERY_MAX_BYTES;
+        # 'count' is the full row count and 'truncated' marks a cut-off result.
+        # Repeated queries are answered from the result cache until their tables change (see query_cache.py).
+        # With INDEX_ADVISOR_DB set, queries that reach the database (not cache hits) are
+        # recorded for index advice (python index_advisor.py recommend).
+        return get_query_cache().query_json(sql_query, on_execute=_observe_query)
 
     except Exception as e:
         return f'Error executing query: {str(e)}'
 
-# Test Example 5: Database query tool
-print('=== Example 5: SQLite Database Query Tool - LLM-generated SQL queries with mock data ===')
-agent5 = create_react_agent(model=llm_aws, tools=[query_database])
-# Count number of employees
-result8 = agent5.invoke({
-    'messages': [{'role': 'user', 'content': 'count the number of employees in the company database'}]
-})
-print('=== Example 5: Count Employees - Database Query ===')
-print(result8['messages'][-1].content)
-print()
-
-result8 = agent5.invoke({
-    'messages': [
-        {'role': 'user', 'content': 'Find all employees in the Engineering department with a salary above 90000'}
-    ]
-})
-print(result8['messages'][-1].content)
-print()
-
-# Test complex database query
-print('=== Example 7: Complex Database Query - SQL Analysis ===')
-result9 = agent5.invoke({
-    'messages': [
-        {
-            'role': 'user',
-            'content': "What's the average salary in each department? Show the results sorted by average salary descending.",
-        }
-    ]
-})
-print(result9['messages'][-1].content)
\ No newline at end of file
+def build_database_agent():
+    # The tool node gives each call a deadline (TOOL_TIMEOUT); a query still running then is interrupted.
+    return build_agent(make_tool_node([query_database]))
+
+def main():
+    # Test Example 1: Weather query
+    print('=== Example 1: Weather Tool ===')
+    agent1 = build_weather_agent()
+    result1 = agent1.invoke({'messages': [{'role': 'user', 'content': "What's the weather like in Tokyo?"}]})
+    print(result1['messages'][-1].content)
+    print()
+
+    # Test Example 2: File operation
+    print('=== Example 2: File Operations Tool - File system interactions ===')
+    agent2 = build_notes_agent()
+    result2 = agent2.invoke({
+        'messages': [
+            {
+                'role': 'user',
+                'content': "Save a note called to file 'shopping_list' with my groceries: milk, eggs, bread, and cheese",
+            }
+        ]
+    })
+    print(result2['messages'][-1].content)
+    print()
+
+    print('=== Example 4: Math Tools - Chained calculations showing tool interoperability ===')
+    agent4 = build_math_agent()
+    q = 'If I add 10 and 20, then multiply the result by 2, what do I get?'
+    result6 = agent4.invoke({
+        'messages': [
+            {
+                'role': 'user',
+                'content': q,
+            }
+        ]
+    })
+    print(result6['messages'][-1].content)
+    print()
+
+    # Test Example 5: Database query tool
+    print('=== Example 5: SQLite Database Query Tool - LLM-generated SQL queries with mock data ===')
+    agent5 = build_database_agent()
+    # Count number of employees
+    result8 = agent5.invoke({
+        'messages': [{'role': 'user', 'content': 'count the number of employees in the company database'}]
+    })
+    print('=== Example 5: Count Employees - Database Query ===')
+    print(result8['messages'][-1].content)
+    print()
+
+    result8 = agent5.invoke({
+        'messages': [
+            {'role': 'user', 'content': 'Find all employees in the Engineering department with a salary above 90000'}
+        ]
+    })
+    print(result8['messages'][-1].content)
+    print()
+
+    # Test complex database query
+    print('=== Example 7: Complex Database Query - SQL Analysis ===')
+    result9 = agent5.invoke({
+        'messages': [
+            {
+                'role': 'user',
+                'content': "What's the average salary in each department? Show the results sorted by average salary descending.",
+            }
+        ]
+    })
+    print(result9['messages'][-1].content)
+    print('Query cache:', get_query_cache().stats())
+    print('Tool calls:', tool_metrics())
+    print('Tool cache:', tool_cache_stats())
+
+if __name__ == '__main__':
+    from rich import print  # only the demos print with rich
+
+    main()
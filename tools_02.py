@@ -3,66 +3,61 @@
 # multiply_numbers
 # calculate_area_rectangle
 # convert_temperature
+# analyze_string/analyze_document
 # advanced_calculator/create_person_profile
+# convert_temperature_batch/advanced_calculator_batch
+#
+# The pure tools are memoized with @cached_tool (see tool_cache.py).
+# Importing this module only defines the tools and agent factories (build_*_agent);
+# the examples run with `python tools_02.py`.
+
+import json
+import math
+import os
+import pathlib
+from typing import List
 
 from dotenv import load_dotenv
 from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
-from rich import print
 
-import boto3
 from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
+from bedrock_client import get_chat_model
+from tool_cache import cached_tool, tool_cache_stats
+from text_analysis import analyze_text
+from batch_math import calculate_many, convert_temperatures
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
-
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
+def build_agent(tools):
+    """ReAct agent on the shared, pooled Bedrock chat model (see bedrock_client.py)."""
+    from langgraph.prebuilt import create_react_agent
 
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
+    return create_react_agent(model=get_chat_model(), tools=tools)
 
 # ############### Example 1: add_numbers/multiply_numbers/calculate_area_rectangle ###############
 
+@cached_tool
 def add_numbers(a: int, b: int) -> int:
     """Add two numbers together."""
     return a + b
 
+@cached_tool
 def multiply_numbers(a: int, b: int) -> int:
     """Multiply two numbers together."""
     return a * b
 
+@cached_tool
 def calculate_area_rectangle(length: float, width: float) -> float:
     """Calculate the area of a rectangle."""
     return length * width
 
-simple_agent = create_react_agent(
-    model=llm_aws,
-    tools=[add_numbers, multiply_numbers, calculate_area_rectangle]
-)
-
-print("Testing simple function tools...")
-try:
-    response = simple_agent.invoke({
-        "messages": [{"role": "user", "content": "What is 15 + 27, and what is 8 * 6?"}]
-    })
-    print(f"Response: {response['messages'][-1].content}")
-except Exception as e:
-    print(f"Error: {e}")
-
-# Example 2: Using @tool Decorator for More Control
-print("\n\n2. Using @tool Decorator")
-print("-" * 30)
+def build_simple_agent():
+    return build_agent([add_numbers, multiply_numbers, calculate_area_rectangle])
 
 # ############### Example 2: convert_temperature ###############
 
+@cached_tool(casefold=("from_unit", "to_unit"))
 @tool("temperature_converter", parse_docstring=True)
 def convert_temperature(temperature: float, from_unit: str, to_unit: str) -> str:
     """Convert temperature between Celsius, Fahrenheit, and Kelvin.
@@ -93,36 +88,59 @@ def convert_temperature(temperature: float, from_unit: str, to_unit: str) -> str
     
     return f"{temperature}° {from_unit.title()} = {result:.2f}° {to_unit.title()}"
 
+@tool("temperature_converter_batch", parse_docstring=True)
+def convert_temperature_batch(temperatures: List[float], from_unit: str, to_unit: str) -> str:
+    """Convert many temperatures at once, in one call (use this for tables or lists of readings); results are in input order, null where not a finite number.
+
+    Args:
+        temperatures: The temperature values to convert
+        from_unit: Source unit (celsius, fahrenheit, kelvin)
+        to_unit: Target unit (celsius, fahrenheit, kelvin)
+    """
+    try:
+        results = convert_temperatures(temperatures, from_unit, to_unit)
+    except ValueError as e:
+        return f"Error: {e}"
+    # rounded like the single-value tool
+    payload = {
+        "from_unit": from_unit.lower(),
+        "to_unit": to_unit.lower(),
+        "results": [round(value, 2) for value in results.tolist()],
+    }
+    return _batch_json(payload, [])
+
+# JSON has no NaN/Infinity: non-finite results (overflow, NaN inputs) become null plus an error
+def _batch_json(payload: dict, errors: list) -> str:
+    results = payload["results"]
+    errors = list(errors)
+    for i, value in enumerate(results):
+        if value is not None and not math.isfinite(value):
+            results[i] = None
+            errors.append((i, "Result is not a finite number"))
+    if errors:
+        payload["errors"] = [{"index": i, "error": error} for i, error in sorted(errors)]
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False)
+
+@cached_tool
 @tool("string_analyzer")
 def analyze_string(text: str) -> dict:
     """Analyze a string and return various statistics about it."""
-    return {
-        'length': len(text),
-        'word_count': len(text.split()),
-        'vowel_count': sum(char in 'aeiou' for char in text.lower()),
-        'consonant_count': sum(bool(char.isalpha() and char not in 'aeiou') for char in text.lower()),
-        'uppercase_count': sum(bool(char.isupper()) for char in text),
-        'lowercase_count': sum(bool(char.islower()) for char in text),
-    }
+    # one pass over the text (see text_analysis.py)
+    return analyze_text(text)
+
+@tool("document_analyzer")
+def analyze_document(path: str) -> dict:
+    """Analyze an uploaded text document (a file path) and return the same statistics as string_analyzer."""
+    # documents are streamed in chunks; only files under DOCUMENT_ROOT (current directory) are readable
+    root = pathlib.Path(os.getenv("DOCUMENT_ROOT", ".")).resolve()
+    document = (root / path).resolve()
+    if not document.is_relative_to(root) or not document.is_file():
+        return {"error": f"no document '{path}' under {root}"}
+    return analyze_text(document)
 
 # Create agent with decorated tools
-decorated_agent = create_react_agent(
-    model=llm_aws,
-    tools=[convert_temperature, analyze_string]
-)
-
-print("Testing decorated tools...")
-try:
-    response = decorated_agent.invoke({
-        "messages": [{"role": "user", "content": "Convert 100 degrees Fahrenheit to Celsius and analyze the string 'Hello World'"}]
-    })
-    print(f"Response: {response['messages'][-1].content}")
-except Exception as e:
-    print(f"Error: {e}")
-
-# Example 3: Custom Input Schema with Pydantic
-print("\n\n3. Custom Input Schema with Pydantic")
-print("-" * 40)
+def build_decorated_agent():
+    return build_agent([convert_temperature, convert_temperature_batch, analyze_string, analyze_document])
 
 # ############### Example 2: advanced_calculator/create_person_profile ###############
 
@@ -132,6 +150,7 @@ class CalculatorInputSchema(BaseModel):
     x: float = Field(description="First number")
     y: float = Field(description="Second number")
 
+@cached_tool(casefold=("operation",))
 @tool("advanced_calculator", args_schema=CalculatorInputSchema)
 def advanced_calculator(operation: str, x: float, y: float) -> str:
     """Perform advanced calculator operations with proper error handling."""
@@ -152,6 +171,23 @@ def advanced_calculator(operation: str, x: float, y: float) -> str:
     
     return f"{x} {operation} {y} = {result}"
 
+class CalculatorBatchInputSchema(BaseModel):
+    """Input schema for batch calculator operations"""
+    calculations: List[CalculatorInputSchema] = Field(description="The (operation, x, y) calculations to perform")
+
+@tool("advanced_calculator_batch", args_schema=CalculatorBatchInputSchema)
+def advanced_calculator_batch(calculations: List[CalculatorInputSchema]) -> str:
+    """Perform many calculator operations in one call; results are in input order, null where an operation failed."""
+    try:
+        results, errors = calculate_many(
+            [c.operation for c in calculations], [c.x for c in calculations], [c.y for c in calculations]
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    failed = {i for i, _ in errors}
+    payload = {"results": [None if i in failed else value for i, value in enumerate(results.tolist())]}
+    return _batch_json(payload, errors)
+
 class PersonInputSchema(BaseModel):
     """Input schema for person information"""
     name: str = Field(description="Person's full name")
@@ -169,20 +205,55 @@ def create_person_profile(name: str, age: int, occupation: str) -> str:
     Profile ID: {hash(f"{name}{age}{occupation}") % 10000}
     """
 
-schema_agent = create_react_agent(
-    model=llm_aws,
-    tools=[advanced_calculator, create_person_profile]
-)
-
-print("Testing Pydantic schema tools...")
-try:
-    response = schema_agent.invoke({
-        "messages": [{"role": "user", "content": "Calculate 15.5 divided by 3.2 and create a profile for John Smith, age 30, software engineer"}]
-    })
-    print(f"Response: {response['messages'][-1].content}")
-except Exception as e:
-    print(f"Error: {e}")
-
-# Example 4: File and Data Processing Tools
-print("\n\n4. File and Data Processing Tools")
-print("-" * 40)
\ No newline at end of file
+def build_schema_agent():
+    return build_agent([advanced_calculator, advanced_calculator_batch, create_person_profile])
+
+def main():
+    simple_agent = build_simple_agent()
+    decorated_agent = build_decorated_agent()
+    schema_agent = build_schema_agent()
+
+    print("Testing simple function tools...")
+    try:
+        response = simple_agent.invoke({
+            "messages": [{"role": "user", "content": "What is 15 + 27, and what is 8 * 6?"}]
+        })
+        print(f"Response: {response['messages'][-1].content}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    # Example 2: Using @tool Decorator for More Control
+    print("\n\n2. Using @tool Decorator")
+    print("-" * 30)
+
+    print("Testing decorated tools...")
+    try:
+        response = decorated_agent.invoke({
+            "messages": [{"role": "user", "content": "Convert 100 degrees Fahrenheit to Celsius and analyze the string 'Hello World'"}]
+        })
+        print(f"Response: {response['messages'][-1].content}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    # Example 3: Custom Input Schema with Pydantic
+    print("\n\n3. Custom Input Schema with Pydantic")
+    print("-" * 40)
+
+    print("Testing Pydantic schema tools...")
+    try:
+        response = schema_agent.invoke({
+            "messages": [{"role": "user", "content": "Calculate 15.5 divided by 3.2 and create a profile for John Smith, age 30, software engineer"}]
+        })
+        print(f"Response: {response['messages'][-1].content}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    # Example 4: File and Data Processing Tools
+    print("\n\n4. File and Data Processing Tools")
+    print("-" * 40)
+    print("Tool cache:", tool_cache_stats())
+
+if __name__ == "__main__":
+    from rich import print  # only the demos print with rich
+
+    main()
@@ -2,36 +2,41 @@
 # greet_user_with_context
 # perform_secure_operation
 # slow_calculation/database_query
+#
+# Importing this module only defines the tools and agent factories (build_*_agent);
+# the examples run with `python tools_03.py`.
+#
+# build_agent(tools, instructions=...) sends long, static instructions with a Bedrock
+# cache checkpoint (see prompt_cache.py), so a tool loop pays for them once. The example
+# agents have no instructions and a tool prefix too short for Bedrock to cache.
 
-import os
 from typing import Annotated
-from langgraph.prebuilt import create_react_agent, InjectedState, ToolNode
+from langgraph.prebuilt import InjectedState
 from langgraph.prebuilt.chat_agent_executor import AgentState
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
-from langchain.chat_models import init_chat_model
 import time
 
-import boto3
 from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
+from bedrock_client import DEFAULT_MODEL_ID, get_chat_model
+from tool_executor import concurrency, make_tool_node, tool_timeout
+from tool_cache import cached_tool, tool_cache_stats
+from prompt_cache import cached_system_prompt
 
 load_dotenv()
 
-# Create a Bedrock Runtime client in the AWS Region you want to use.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
+def build_agent(tools, model=None, instructions=None):
+    """ReAct agent on the shared, pooled Bedrock chat model (see bedrock_client.py)."""
+    from langgraph.prebuilt import create_react_agent
 
-# Set the model ID, e.g., Amazon Nova Lite.
-model_id = "amazon.nova-pro-v1:0"
-
-llm_aws = ChatBedrock(
-    model=model_id,
-    region_name="us-east-1",
-    client=client,
-)
-
-print("\n1. Hiding Arguments Using State and Config")
-print("-" * 45)
+    model = model or get_chat_model()
+    prompt = None
+    if instructions:
+        tool_list = tools.tools_by_name.values() if hasattr(tools, "tools_by_name") else tools
+        # the checkpoint format and what it caches depend on the model (bind_tools() wraps it)
+        model_id = getattr(getattr(model, "bound", model), "model_id", None) or DEFAULT_MODEL_ID
+        prompt = cached_system_prompt(instructions, list(tool_list), model_id)
+    return create_react_agent(model=model, tools=tools, prompt=prompt)
 
 @tool("user_greeting")
 def greet_user_with_context(
@@ -78,35 +83,15 @@ def perform_secure_operation( operation: str, state: Annotated[AgentState, Injec
     return f" Successfully performed '{operation}' operation for authenticated {user_role}"
 
 # Create agent with hidden argument tools
-hidden_args_agent = create_react_agent(
-    model=llm_aws,
-    tools=[greet_user_with_context, perform_secure_operation]
-)
-
-print("Testing tools with hidden arguments...")
-prompt_msg = "Say hello to me and then perform a read operation"
-try:
-    # Note: We pass configuration that tools can access but LLM cannot control
-    response = hidden_args_agent.invoke(
-        {"messages": [{"role": "user", "content": prompt_msg}]},
-        config={
-            "configurable": {
-                "user_id": "eliezer",
-                "session_id": "id-12345",
-                "authenticated": True,
-                "user_role": "admin"
-            }
-        }
-    )
-    print(f"Response: {response['messages'][-1].content}")
-except Exception as e:
-    print(f"Error: {e}")
-
-    # Example 2: Disabling Parallel Tool Calling
-print("\n\n2. Disabling Parallel Tool Calling")
-print("-" * 40)
+def build_hidden_args_agent():
+    return build_agent([greet_user_with_context, perform_secure_operation])
 
 # ############### Example : slow_calculation/database_query ###############
+# Each tool declares a concurrency class (see tool_executor.py): calls from the same
+# turn run at the same time unless their classes conflict.
+@concurrency("parallel")
+@tool_timeout(5)  # the model gets a timeout error instead of waiting longer
+@cached_tool  # pure: a repeated call returns at once
 @tool("slow_calculation")
 def slow_calculation(number: int) -> str:
     """Perform a slow calculation that takes time."""
@@ -114,49 +99,20 @@ def slow_calculation(number: int) -> str:
     result = number ** 2 + number + 1
     return f"Slow calculation for {number}: {result} (took 1 second)"
 
+@concurrency("db:company")  # one call at a time on the company database
 @tool("database_query")
 def simulate_database_query(table: str) -> str:
     """Simulate a database query that should not run in parallel."""
     time.sleep(0.5)  # Simulate database latency
     return f"Database query result from table '{table}': Found 42 records"
 
-# Create agent with parallel tool calling disabled
-tools = [slow_calculation, simulate_database_query]
-sequential_agent = create_react_agent(
-    model=llm_aws.bind_tools(tools),  # Disable parallel execution
-    tools=tools
-)
-
-print("Testing sequential tool execution...")
-start_time = time.time()
-try:
-    response = sequential_agent.invoke({
-        "messages": [{"role": "user", "content": "Calculate the slow calculation for 5 and query the users table"}]
-    })
-    end_time = time.time()
-    print(f"Response: {response['messages'][-1].content}")
-    print(f"Total execution time: {end_time - start_time:.2f} seconds")
-except Exception as e:
-    print(f"Error: {e}")
-
-# ############### Example : slow_calculation/database_query ###############
-
-print("Testing sequential tool execution...")
-start_time = time.time()
-try:
-    response = sequential_agent.invoke({
-        "messages": [{"role": "user", "content": "Calculate the slow calculation for 5 and query the users table"}]
-    })
-    end_time = time.time()
-    print(f"Response: {response['messages'][-1].content}")
-    print(f"Total execution time: {end_time - start_time:.2f} seconds")
-except Exception as e:
-    print(f"Error: {e}")
+# Create agent whose tool node applies the concurrency classes:
+# slow_calculation and database_query overlap (~1s, not 1.5s), two database_query calls queue up.
+def build_sequential_agent():
+    tools = [slow_calculation, simulate_database_query]
+    return build_agent(make_tool_node(tools), model=get_chat_model().bind_tools(tools))
 
 # ############### Example : Return Direct Functionalityy ###############
-print("\n\n3. Return Direct Functionality")
-print("-" * 35)
-
 @tool(return_direct=True)
 def get_current_time() -> str:
     """Get the current time and date. This tool returns results directly."""
@@ -176,6 +132,7 @@ def generate_random_quote() -> str:
     return f"🌟 {random.choice(quotes)}"
 
 # Regular tool for comparison
+@cached_tool
 @tool()
 def regular_calculation(x: int, y: int) -> int:
     """Regular calculation tool that allows agent to continue processing."""
@@ -183,33 +140,10 @@ def regular_calculation(x: int, y: int) -> int:
     return x * y + 10
 
 # Create agent with return_direct tools
-direct_return_agent = create_react_agent(
-    model=llm_aws,
-    tools=[get_current_time, generate_random_quote, regular_calculation]
-)
-
-print("Testing return_direct tools...")
-try:
-    response = direct_return_agent.invoke({
-        "messages": [{"role": "user", "content": "What time is it?"}]
-    })
-    print(f"Direct return response: {response['messages'][-1].content}")
-    
-    print("\nTesting non-direct tool:")
-    response2 = direct_return_agent.invoke({
-        "messages": [{"role": "user", "content": "Calculate 7 times 3 plus 10"}]
-    })
-    print(f"Regular tool response: {response2['messages'][-1].content}")
-    
-except Exception as e:
-    print(f"Error: {e}")
-
+def build_direct_return_agent():
+    return build_agent([get_current_time, generate_random_quote, regular_calculation])
 
 # ############### Example : Force Tool Use ###############
-
-print("\n\n4. Force Tool Use")
-print("-" * 20)
-
 @tool(return_direct=True)
 def mandatory_greeting(user_name: str) -> str:
     """Mandatory greeting tool that must be used."""
@@ -221,23 +155,108 @@ def optional_calculation(a: int, b: int) -> int:
     return a + b
 
 # Create agent that forces use of specific tool
-forced_tools = [mandatory_greeting, optional_calculation]
-
-llm_forced = llm_aws.bind_tools(
-    forced_tools,
-    tool_choice={"tool": {"name": "mandatory_greeting"}}
-)
-
-forced_agent = create_react_agent(
-    model=llm_forced,
-    tools=forced_tools,
-)   
-
-print("Testing forced tool use...")
-try:
-    response = forced_agent.invoke({
-        "messages": [{"role": "user", "content": "Hi there, I'm Alice and I'd like to do some math"}]
-    })
-    print(f"Forced tool response: {response['messages'][-1].content}")
-except Exception as e:
-    print(f"Error: {e}")
\ No newline at end of file
+def build_forced_agent():
+    forced_tools = [mandatory_greeting, optional_calculation]
+
+    llm_forced = get_chat_model().bind_tools(
+        forced_tools,
+        tool_choice={"tool": {"name": "mandatory_greeting"}}
+    )
+
+    return build_agent(forced_tools, model=llm_forced)
+
+def main():
+    hidden_args_agent = build_hidden_args_agent()
+    sequential_agent = build_sequential_agent()
+    direct_return_agent = build_direct_return_agent()
+    forced_agent = build_forced_agent()
+
+    print("\n1. Hiding Arguments Using State and Config")
+    print("-" * 45)
+
+    print("Testing tools with hidden arguments...")
+    prompt_msg = "Say hello to me and then perform a read operation"
+    try:
+        # Note: We pass configuration that tools can access but LLM cannot control
+        response = hidden_args_agent.invoke(
+            {"messages": [{"role": "user", "content": prompt_msg}]},
+            config={
+                "configurable": {
+                    "user_id": "eliezer",
+                    "session_id": "id-12345",
+                    "authenticated": True,
+                    "user_role": "admin"
+                }
+            }
+        )
+        print(f"Response: {response['messages'][-1].content}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+        # Example 2: Disabling Parallel Tool Calling
+    print("\n\n2. Disabling Parallel Tool Calling")
+    print("-" * 40)
+
+    print("Testing sequential tool execution...")
+    start_time = time.time()
+    try:
+        response = sequential_agent.invoke({
+            "messages": [{"role": "user", "content": "Calculate the slow calculation for 5 and query the users table"}]
+        })
+        end_time = time.time()
+        print(f"Response: {response['messages'][-1].content}")
+        print(f"Total execution time: {end_time - start_time:.2f} seconds")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    # ############### Example : slow_calculation/database_query ###############
+
+    print("Testing sequential tool execution...")
+    start_time = time.time()
+    try:
+        response = sequential_agent.invoke({
+            "messages": [{"role": "user", "content": "Calculate the slow calculation for 5 and query the users table"}]
+        })
+        end_time = time.time()
+        print(f"Response: {response['messages'][-1].content}")
+        print(f"Total execution time: {end_time - start_time:.2f} seconds")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    print("\n\n3. Return Direct Functionality")
+    print("-" * 35)
+
+    print("Testing return_direct tools...")
+    try:
+        response = direct_return_agent.invoke({
+            "messages": [{"role": "user", "content": "What time is it?"}]
+        })
+        print(f"Direct return response: {response['messages'][-1].content}")
+
+        print("\nTesting non-direct tool:")
+        response2 = direct_return_agent.invoke({
+            "messages": [{"role": "user", "content": "Calculate 7 times 3 plus 10"}]
+        })
+        print(f"Regular tool response: {response2['messages'][-1].content}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+    print("\n\n4. Force Tool Use")
+    print("-" * 20)
+
+    print("Testing forced tool use...")
+    try:
+        response = forced_agent.invoke({
+            "messages": [{"role": "user", "content": "Hi there, I'm Alice and I'd like to do some math"}]
+        })
+        print(f"Forced tool response: {response['messages'][-1].content}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+    print("Tool cache:", tool_cache_stats())
+
+if __name__ == "__main__":
+    from rich import print  # only the demos print with rich
+
+    main()